@@ -0,0 +1,287 @@
+# k4midi/__main__.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+#
+# command line tool to work with K4 dumps without the GUI
+#
+#   python -m k4midi convert [-o DIR] [--to mid|syx] DUMP ...
+#   python -m k4midi extract [-o DIR] [--kind single,multi,effect] DUMP ...
+#   python -m k4midi assemble BASE OUTPUT [NR=]K4FILE ...
+#   python -m k4midi names [--kind single|multi] DUMP ...
+#   python -m k4midi scan [-j JOBS] [--json] [--names] PATH ...
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+
+from k4midi.k4dump import K4Dump, all_data_layout
+from k4midi.k4cache import K4Cache
+
+
+# the kinds of patches which can be extracted and assembled
+kinds = {'single': 'single_instruments',
+         'multi': 'multi_instruments',
+         'effect': 'effects'}
+
+# key, class and number of patches for every patch id
+patch_ids = {cls.id: (key, cls, count) for key, cls, count, name in all_data_layout}
+
+# matches the number in the names of the extracted files
+_file_nr = re.compile(r'^(single|multi|effect)_(\d+)')
+
+
+# quiet
+#
+# the library reports everything it does on stdout, only shown in
+# verbose mode
+def quiet(args):
+    if args.verbose:
+        return contextlib.nullcontext()
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def error(msg):
+    print(f'error: {msg}', file=sys.stderr)
+
+
+# load_dump
+#
+# reads a MIDI or sysex file, which must contain an all data dump
+def load_dump(args, filename):
+    with quiet(args):
+        dump = K4Dump(filename, lazy=True, cache=args.cache)
+    if dump.bank is None:
+        raise ValueError(f'{filename} contains no K4 all data dump')
+    return dump
+
+
+# file_name
+#
+# a file name made from a patch name
+def file_name(name):
+    name = re.sub(r'[^\w.+-]+', '_', name.strip())
+    return name.strip('_.')
+
+
+def output_name(args, filename, ext):
+    base = os.path.splitext(os.path.basename(filename))[0] + ext
+    if args.output is None:
+        return os.path.join(os.path.dirname(filename), base)
+    return os.path.join(args.output, base)
+
+
+def save_dump(dump, filename):
+    if filename.lower().endswith('.syx'):
+        dump.save_sysexfile(filename)
+    else:
+        dump.save_midifile(filename)
+
+
+# commands, every command returns the number of failed files
+
+def cmd_convert(args):
+    failed = 0
+    for filename in args.files:
+        try:
+            dump = load_dump(args, filename)
+            to = args.to
+            if to is None:
+                to = 'syx' if dump._is_midi else 'mid'
+            outname = output_name(args, filename, '.' + to)
+            if os.path.abspath(outname) == os.path.abspath(filename):
+                raise ValueError(f'{filename} would be overwritten')
+            with quiet(args):
+                save_dump(dump, outname)
+            print(f'{filename} -> {outname}')
+        except (OSError, ValueError, IndexError) as e:
+            error(e)
+            failed += 1
+
+    return failed
+
+
+def cmd_extract(args):
+    failed = 0
+    for filename in args.files:
+        try:
+            dump = load_dump(args, filename)
+            outdir = output_name(args, filename, '')
+            os.makedirs(outdir, exist_ok=True)
+
+            # the patches are created (and checked) while iterating
+            count = 0
+            with quiet(args):
+                for kind in args.kind:
+                    for nr, patch in enumerate(dump.data[kinds[kind]]):
+                        name = f'{kind}_{nr+1:02d}'
+                        if kind != 'effect':
+                            name += '_' + file_name(patch.name)
+                        patch.save(os.path.join(outdir, name + '.k4'))
+                        count += 1
+            print(f'{filename}: {count} patches -> {outdir}')
+        except (OSError, ValueError, IndexError) as e:
+            error(e)
+            failed += 1
+
+    return failed
+
+
+# patch_file
+#
+# splits [NR=]FILE, without NR the number is taken from the name of
+# an extracted file
+def patch_file(arg):
+    nr, sep, filename = arg.partition('=')
+    if not sep:
+        filename = arg
+        m = _file_nr.match(os.path.basename(filename))
+        if m is None:
+            raise ValueError(f'No patch number for {filename}, use NR={filename}')
+        nr = m.group(2)
+
+    if not nr.isdigit():
+        raise ValueError(f'Invalid patch number {nr} for {filename}')
+
+    return int(nr), filename
+
+
+def cmd_assemble(args):
+    try:
+        dump = load_dump(args, args.base)
+    except (OSError, ValueError, IndexError) as e:
+        error(e)
+        return 1
+
+    failed = 0
+    for arg in args.patches:
+        try:
+            nr, filename = patch_file(arg)
+            with open(filename, 'rb') as f:
+                id = f.read(1)
+            if len(id) == 0 or id[0] not in patch_ids:
+                raise ValueError(f'{filename} is not a K4 patch file')
+
+            key, cls, count = patch_ids[id[0]]
+            if (count is None) or (key not in kinds.values()):
+                raise ValueError(f'{filename}: {cls.__name__} patches cannot be assembled')
+            if not (1 <= nr <= count):
+                raise ValueError(f'{filename}: patch number {nr} not in 1..{count}')
+
+            with quiet(args):
+                ok = dump.data[key][nr-1].load(filename)
+            if not ok:
+                raise ValueError(f'{filename} cannot be loaded')
+            print(f'{filename} -> {key} nr. {nr}')
+        except (OSError, ValueError) as e:
+            error(e)
+            failed += 1
+
+    if failed and not args.force:
+        error(f'{args.output} not written')
+        return failed
+
+    with quiet(args):
+        save_dump(dump, args.output)
+    print(f'bank written to {args.output}')
+
+    return failed
+
+
+def cmd_names(args):
+    failed = 0
+    for filename in args.files:
+        try:
+            dump = load_dump(args, filename)
+            print(f'{filename}:')
+            for nr, name in enumerate(dump.names(kinds[args.kind])):
+                print(f'  {nr+1:2d} {name}')
+        except (OSError, ValueError, IndexError) as e:
+            error(e)
+            failed += 1
+
+    return failed
+
+
+def cmd_scan(args):
+    # the scanner needs numpy, the other commands do not
+    from k4midi.k4scan import scan, summary_line, Throughput
+
+    throughput = Throughput()
+    for summary in scan(args.paths, workers=args.jobs):
+        throughput.add(summary)
+        if args.json:
+            print(json.dumps(summary), flush=True)
+        else:
+            print(summary_line(summary), flush=True)
+            if args.names and 'single_names' in summary:
+                print('  ' + ', '.join(summary['single_names']))
+
+    print(throughput, file=sys.stderr)
+
+    return throughput.errors
+
+
+def kind_list(arg):
+    values = arg.split(',')
+    for v in values:
+        if v not in kinds:
+            raise argparse.ArgumentTypeError(f'invalid kind {v}')
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m k4midi',
+                                     description='Work with Kawai K4 dumps')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show the messages of the library')
+    parser.add_argument('--cache', nargs='?', const='', metavar='DIR',
+                        help='use a cache of the parsed dumps (default ~/.cache/k4midi)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('convert', help='convert MIDI files to sysex files and vice versa')
+    p.add_argument('-o', '--output', help='output directory')
+    p.add_argument('--to', choices=('mid', 'syx'), help='output format')
+    p.add_argument('files', nargs='+')
+    p.set_defaults(func=cmd_convert)
+
+    p = subparsers.add_parser('extract', help='save the patches of dumps to .k4 files')
+    p.add_argument('-o', '--output', help='output directory')
+    p.add_argument('--kind', type=kind_list, default=list(kinds),
+                   help='comma separated list of single, multi, effect')
+    p.add_argument('files', nargs='+')
+    p.set_defaults(func=cmd_extract)
+
+    p = subparsers.add_parser('assemble', help='replace patches of a dump by .k4 files')
+    p.add_argument('-f', '--force', action='store_true',
+                   help='write the bank even if patches failed')
+    p.add_argument('base', help='dump with the initial bank')
+    p.add_argument('output', help='.mid or .syx file')
+    p.add_argument('patches', nargs='+', metavar='[NR=]K4FILE')
+    p.set_defaults(func=cmd_assemble)
+
+    p = subparsers.add_parser('names', help='list the names of the instruments')
+    p.add_argument('--kind', choices=('single', 'multi'), default='single')
+    p.add_argument('files', nargs='+')
+    p.set_defaults(func=cmd_names)
+
+    p = subparsers.add_parser('scan', help='scan directories and zip archives for dumps')
+    p.add_argument('-j', '--jobs', type=int, help='number of processes')
+    p.add_argument('--json', action='store_true', help='one JSON object per file')
+    p.add_argument('--names', action='store_true', help='show the single names')
+    p.add_argument('paths', nargs='+')
+    p.set_defaults(func=cmd_scan)
+
+    args = parser.parse_args(argv)
+    if args.cache is not None:
+        args.cache = K4Cache(args.cache or None)
+
+    return 1 if args.func(args) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
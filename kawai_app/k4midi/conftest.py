@@ -0,0 +1,81 @@
+# conftest.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+#
+# fixtures of the tests, run in kawai_app with
+#
+#   python -m pytest k4midi/test_k4*.py
+
+import os
+import random
+import zipfile
+
+import pytest
+
+from k4midi.k4dump import all_data_layout, all_data_patches, dump_layout, layout_patches
+
+
+# the example dump of the repository
+example_zip = os.path.join(os.path.dirname(__file__), '..', '..', 'k4.zip')
+
+
+# k4_mid
+#
+# the path of a copy of the example dump k4.mid, the dump is one byte
+# short, the 0xf7 stands in place of the last checksum
+@pytest.fixture
+def k4_mid(tmp_path):
+    with zipfile.ZipFile(example_zip) as zf:
+        zf.extract('k4.mid', str(tmp_path))
+    return str(tmp_path / 'k4.mid')
+
+
+# bank
+#
+# the data block of an all data dump with random sysex data and correct
+# checksums, the same for every test
+@pytest.fixture
+def bank():
+    rnd = random.Random(4)
+    patches, size = layout_patches(all_data_layout)
+    data = bytearray(rnd.randrange(32, 127) for i in range(size))
+    for key, nr, cls, ofs, name in patches:
+        data[ofs+cls.size-1] = (sum(data[ofs:ofs+cls.size-1]) + 0xa5) & 0x7f
+    return data
+
+
+# all_data
+#
+# the complete all data dump message of bank (channel 1)
+@pytest.fixture
+def all_data(bank):
+    return b'\xf0\x40\x00\x22\x00\x04\x00\x00' + bytes(bank) + b'\xf7'
+
+
+# fake_port
+#
+# a FakePort which answers the requests with the patches of bank, mido
+# is needed by these tests only
+@pytest.fixture
+def fake_port(bank):
+    from k4midi.k4io import FakePort, all_data_dump, dump_functions, mido_message, \
+                            sysex_message
+
+    index = {(key, nr): (ofs, cls.size) for key, nr, cls, ofs, name in all_data_patches}
+
+    def respond(msg):
+        data = bytes(msg.bin())
+        function = dump_functions[data[3]]
+        if function == all_data_dump:
+            block = bank
+        else:
+            layout, first = dump_layout(function, data[6], data[7])
+            patches, size = layout_patches(layout)
+            block = b''
+            for key, nr, cls, ofs, name in patches:
+                ofs, size = index[key, None if nr is None else first + nr]
+                block += bank[ofs:ofs+size]
+        return [mido_message(sysex_message(data[2], function, data[6], data[7], block))]
+
+    return FakePort(respond)
@@ -0,0 +1,163 @@
+# k4async.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import asyncio
+
+from collections import namedtuple
+
+from k4midi.k4dump import K4Dump
+from k4midi.k4io import request_all, request_block, request_patch, reply_size, \
+                        dump_functions, wire_time, mido_message
+from k4midi.k4sysex import kawai_id, k4_id, header_size
+
+_debug = False
+
+
+# a K4 on a mido IO port and a MIDI channel (0-15), several devices
+# can share a port with different channels
+K4Device = namedtuple('K4Device', ['port', 'channel', 'name'], defaults=(None,))
+
+
+def device_name(device):
+    if device.name is not None:
+        return device.name
+    return f'{device.port.name}:{device.channel+1}'
+
+
+# K4Capture
+#
+# requests dumps from several K4s at the same time, one task per port
+# reads the incoming messages and hands the K4 messages to the waiting
+# request by port and channel
+#
+#   devices = [K4Device(port1, 0), K4Device(port1, 1), K4Device(port2, 0)]
+#   dumps = asyncio.run(capture_all(devices))
+class K4Capture(object):
+    def __init__(self, devices, timeout=2., retries=2, poll=0.001):
+        self._devices = list(devices)
+        self._timeout = timeout
+        self._retries = retries
+        self._poll = poll
+
+        self._ports = {}        # id(port) -> port
+        self._waiting = {}      # (id(port), channel, function) -> future
+        self._locks = {}        # (id(port), channel) -> lock
+        self._readers = []
+
+        for device in self._devices:
+            self._ports[id(device.port)] = device.port
+
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+
+    def start(self):
+        self._readers = [asyncio.ensure_future(self._read(port))
+                         for port in self._ports.values()]
+
+
+    async def stop(self):
+        for task in self._readers:
+            task.cancel()
+        await asyncio.gather(*self._readers, return_exceptions=True)
+        self._readers = []
+
+
+    # _read
+    #
+    # reads the messages of a port and routes the K4 messages
+    async def _read(self, port):
+        while True:
+            received = False
+            for msg in port.iter_pending():
+                received = True
+                if msg.type != 'sysex':
+                    continue
+                data = msg.data
+                if len(data) < header_size or data[0] != kawai_id or data[4] != k4_id:
+                    continue
+                future = self._waiting.pop((id(port), data[1], data[2]), None)
+                if future is not None and not future.done():
+                    future.set_result(bytes(data))
+                elif _debug:
+                    print(f'dropped message function={data[2]:x} channel={data[1]}')
+            if not received:
+                await asyncio.sleep(self._poll)
+
+
+    # devices_on_port
+    #
+    # the answers of all devices of a port share the cable
+    def devices_on_port(self, device):
+        return sum(1 for d in self._devices if d.port is device.port)
+
+
+    # request
+    #
+    # sends a request message to a device and returns the answer as
+    # a K4Dump, the answers carry no patch number, so the requests of
+    # one device are sent one after the other
+    async def request(self, device, data):
+        function = dump_functions[data[3]]
+        key = (id(device.port), device.channel, function)
+        timeout = wire_time(reply_size(data)) * self.devices_on_port(device) + self._timeout
+
+        lock = self._locks.get(key[:2])
+        if lock is None:
+            lock = self._locks[key[:2]] = asyncio.Lock()
+
+        loop = asyncio.get_running_loop()
+        async with lock:
+            for attempt in range(self._retries + 1):
+                future = loop.create_future()
+                self._waiting[key] = future
+                device.port.send(mido_message(data))
+                try:
+                    answer = await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    print(f'No answer from {device_name(device)} (attempt {attempt+1} of {self._retries+1})!')
+                    continue
+                finally:
+                    if self._waiting.get(key) is future:
+                        del self._waiting[key]
+                return K4Dump(b'\xf0' + answer + b'\xf7')
+
+        raise TimeoutError(f'No answer from {device_name(device)}')
+
+
+    async def fetch_all(self, device, cartridge=False):
+        return await self.request(device, request_all(device.channel, cartridge))
+
+
+    async def fetch_block(self, device, key, cartridge=False):
+        return await self.request(device, request_block(key, device.channel, cartridge))
+
+
+    async def fetch_patch(self, device, key, nr, cartridge=False):
+        return await self.request(device, request_patch(key, nr, device.channel, cartridge))
+
+
+    # capture
+    #
+    # requests the all data dumps of all devices at once, returns a
+    # dictionary name -> dump, devices without answer have the exception
+    # instead of the dump
+    async def capture(self, cartridge=False):
+        results = await asyncio.gather(*(self.fetch_all(device, cartridge)
+                                         for device in self._devices),
+                                       return_exceptions=True)
+        return {device_name(device): result
+                for device, result in zip(self._devices, results)}
+
+
+async def capture_all(devices, cartridge=False, **kwargs):
+    async with K4Capture(devices, **kwargs) as capture:
+        return await capture.capture(cartridge)
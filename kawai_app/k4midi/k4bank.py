@@ -0,0 +1,226 @@
+# k4bank.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import numpy as np
+
+from k4midi.k4dump import all_data_layout, all_data_size
+
+_debug = False
+
+
+# the patch class for each key of the results
+layout_classes = {key: cls for key, cls, count, name in all_data_layout}
+
+
+# bank_arrays
+#
+# returns the patches of the data block of an all data dump as NumPy
+# arrays with one row per patch (64x131, 64x77, 1x11, 61x11, 32x35),
+# the arrays are views, changes go directly into the data block
+def bank_arrays(bank):
+    if len(bank) != all_data_size:
+        raise ValueError(f'Wrong size of the data block ({len(bank)} != {all_data_size})')
+
+    data = np.frombuffer(bank, dtype=np.uint8)
+
+    arrays = {}
+    ofs = 0
+    for key, cls, count, name in all_data_layout:
+        if count is None:
+            count = 1
+        size = count * cls.size
+        arrays[key] = data[ofs:ofs+size].reshape(count, cls.size)
+        ofs += size
+
+    return arrays
+
+
+# checksums
+#
+# calculates the checksums of all rows of a patch array, works in the
+# same way as k4base.checksum
+def checksums(patches):
+    return (patches[:, :-1].sum(axis=1, dtype=np.int64) + 0xa5) & 0b1111111
+
+
+# verify_bank
+#
+# checks all checksums of the data block of a dump, returns for every
+# key of the results a boolean array which marks the bad patches
+def verify_bank(bank):
+    bad = {}
+    for key, patches in bank_arrays(bank).items():
+        bad[key] = checksums(patches) != patches[:, -1]
+        if _debug:
+            print(f'{key}: {np.count_nonzero(bad[key])} bad checksums')
+
+    return bad
+
+
+# repair_bank
+#
+# sets all checksums of the data block, returns the same masks as
+# verify_bank for the patches which had to be repaired
+def repair_bank(bank):
+    bad = {}
+    for key, patches in bank_arrays(bank).items():
+        sums = checksums(patches)
+        bad[key] = sums != patches[:, -1]
+        patches[:, -1] = sums
+
+    return bad
+
+
+def verify_checksums(dump):
+    return verify_bank(dump.bank)
+
+
+def repair_checksums(dump):
+    return repair_bank(dump.bank)
+
+
+# field_dtype
+#
+# the dtype of the structured array for the fields of a patch class,
+# the instrument names are in the column 'name' as the 10 raw bytes,
+# so an unchanged name is written back as it was (see array_names)
+def field_dtype(cls):
+    columns = [(field.name, np.int16) for field in cls.fields]
+    if isinstance(getattr(cls, 'name', None), property):
+        columns.insert(0, ('name', 'S10'))
+    return np.dtype(columns)
+
+
+def name_bytes(patches):
+    return np.ascontiguousarray(patches[:, :10]).view('S10').ravel()
+
+
+# array_names
+#
+# the names of a structured array for display
+def array_names(values):
+    return np.char.rstrip(np.char.decode(values['name'], 'ascii', 'replace'))
+
+
+# decode_array
+#
+# decodes all fields of the patches (one patch per row, see bank_arrays)
+# column by column into a structured array
+def decode_array(patches, cls):
+    dtype = field_dtype(cls)
+    values = np.zeros(len(patches), dtype=dtype)
+
+    if 'name' in dtype.names:
+        values['name'] = name_bytes(patches)
+
+    for field in cls.fields:
+        col = patches[:, field.ofs].astype(np.int16)
+        if field.high_ofs is None:
+            values[field.name] = ((col >> field.shift) & field.mask) + field.correct
+        else:
+            high = patches[:, field.high_ofs].astype(np.int16)
+            values[field.name] = ((high & 1) << 7) | (col & 0b1111111)
+
+    return values
+
+
+# encode_array
+#
+# writes the columns of a structured array back into the patches,
+# columns which are not fields are ignored. Only the patches which
+# have changed are written, their checksums are adjusted by the
+# difference like k4base.set_bytes does, so a bad checksum stays bad.
+# New names are given as bytes (ASCII) and filled up with spaces,
+# returns the mask of the changed patches
+def encode_array(patches, cls, values):
+    if len(values) != len(patches):
+        raise ValueError(f'Wrong number of patches ({len(values)} != {len(patches)})')
+
+    new = patches.copy()
+    columns = values.dtype.names
+    if 'name' in columns:
+        names = values['name'].astype('S10')
+        rows = names != name_bytes(patches)
+        if rows.any():
+            new[rows, :10] = np.char.ljust(names[rows], 10).view(np.uint8).reshape(-1, 10)
+
+    for field in cls.fields:
+        if field.name not in columns:
+            continue
+
+        val = values[field.name].astype(np.int16) - field.correct
+        if field.high_ofs is None:
+            keep = new[:, field.ofs] & (~(field.mask << field.shift) & 0xff)
+            new[:, field.ofs] = keep | ((val & field.mask) << field.shift).astype(np.uint8)
+        else:
+            new[:, field.ofs] = (val & 0b1111111).astype(np.uint8)
+            keep = new[:, field.high_ofs] & 0b11111110
+            new[:, field.high_ofs] = keep | ((val >> 7) & 1).astype(np.uint8)
+
+    rows = (new[:, :-1] != patches[:, :-1]).any(axis=1)
+    if rows.any():
+        old = patches[rows, :-1].sum(axis=1, dtype=np.int64)
+        diff = new[rows, :-1].sum(axis=1, dtype=np.int64) - old
+        patches[rows, :-1] = new[rows, :-1]
+        patches[rows, -1] = (patches[rows, -1] + diff) & 0b1111111
+
+    return rows
+
+
+# patch_array, write_patch_array
+#
+# structured array of all patches of one kind of a dump, e.g.
+#
+#   singles = patch_array(dump)
+#   np.flatnonzero((singles['s1_wave_select'] == 97) | (singles['s2_wave_select'] == 97))
+#
+# write_patch_array writes the changed array back into the dump and
+# returns the mask of the changed patches
+def patch_array(dump, key='single_instruments'):
+    cls = layout_classes[key]
+    return decode_array(bank_arrays(dump.bank)[key], cls)
+
+
+def write_patch_array(dump, values, key='single_instruments'):
+    cls = layout_classes[key]
+    return encode_array(bank_arrays(dump.bank)[key], cls, values)
+
+
+# field_vectors
+#
+# converts the structured array of patch_array into one vector per
+# patch, every field is scaled from its range low..high to 0..1, values
+# outside of the range (broken patches) are clipped
+def field_vectors(values, cls):
+    fields = [field for field in cls.fields if field.high > field.low]
+    low = np.array([field.low for field in fields], dtype=np.float32)
+    span = np.array([field.high - field.low for field in fields], dtype=np.float32)
+
+    m = np.empty((len(values), len(fields)), dtype=np.float32)
+    for nr, field in enumerate(fields):
+        m[:, nr] = values[field.name]
+    m -= low
+    m /= span
+    np.clip(m, 0., 1., out=m)
+    return m
+
+
+def patch_vectors(patches, cls):
+    return field_vectors(decode_array(patches, cls), cls)
+
+
+# nearest
+#
+# returns the indices and distances of the k vectors which are next
+# to the query vector, sorted by distance
+def nearest(vectors, query, k=10):
+    diff = vectors - query
+    dist = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+    k = min(k, len(dist))
+    if k == 0:
+        return np.zeros(0, dtype=np.intp), dist[:0]
+    idx = np.argpartition(dist, k-1)[:k]
+    idx = idx[np.argsort(dist[idx], kind='stable')]
+    return idx, dist[idx]
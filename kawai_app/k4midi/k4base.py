@@ -1,25 +1,205 @@
 # k4base.py
 #
 # written by: Oliver Cordes 2023-04-10
-# changed by: Oliver Cordes 2024-02-13
+# changed by: Oliver Cordes 2026-10-18
 
 
-import copy
+import contextlib
+
+from collections import namedtuple
 
 _debug = False
 
+# cross-check every incremental checksum change against a full
+# calculation of the checksum
+_debug_checksum = False
+
+
+# checksum
+#
+# calculates the checksum of a data block, the last byte is the
+# checksum itself and not included
+# chksum = sum(b[0]-b[n-2]) + hex A5 -> last 7 bits
+def checksum(data):
+    return (sum(data[:-1]) + 0xa5) & 0b1111111
+
+
+# set_byte, set_bytes
+#
+# write into a data block and adjust the checksum in the last byte by
+# the difference of the old and the new bytes, since the checksum is a
+# plain sum, the costs do not depend on the size of the data block
+def set_byte(data, ofs, value):
+    if _debug_checksum:
+        valid = checksum(data) == data[-1]
+
+    # store the byte first, an invalid value must not change the checksum
+    old = data[ofs]
+    data[ofs] = value
+    data[-1] = (data[-1] + value - old) & 0b1111111
+
+    if _debug_checksum:
+        cross_check_checksum(data, valid)
+
+
+def set_bytes(data, ofs, values):
+    if _debug_checksum:
+        valid = checksum(data) == data[-1]
+
+    end = ofs + len(values)
+    old = sum(data[ofs:end])
+    data[ofs:end] = values      # before the checksum, see set_byte
+    data[-1] = (data[-1] + sum(values) - old) & 0b1111111
+
+    if _debug_checksum:
+        cross_check_checksum(data, valid)
+
+
+def cross_check_checksum(data, valid):
+    full = checksum(data)
+    if not valid:
+        print(f'checksum was not valid before the change ({data[-1]:x} != {full:x})')
+    elif full != data[-1]:
+        print(f'incremental checksum {data[-1]:x} != {full:x}')
+
+
+# encode_name, decode_name
+#
+# the 10 bytes of a patch name, the K4 knows ASCII only, other
+# characters are replaced by '?', longer names are cut, only the
+# padding is removed from a name, leading spaces are part of it
+def encode_name(name):
+    return name.encode('ascii', 'replace')[:10].ljust(10)
+
+
+def decode_name(data):
+    return bytes(data[0:10]).decode('ascii', 'replace').rstrip()
+
+
+# Field
+#
+# description of a parameter of a patch, the properties of the patch
+# classes are generated from the list of fields in 'fields'
+#   name      name of the property
+#   ofs       offset of the byte in the data block
+#   shift     position of the lowest bit of the value in the byte
+#   mask      mask of the bits of the value after shifting
+#   correct   value which is added to the bits
+#   low, high range of the value (incl. the correction)
+#   group     group of the parameter, e.g. 'common', 'source1', 'dcf2'
+#   high_ofs  offset of the byte which holds bit 7 of the value in
+#             bit 0 (wave select), None for all other parameters
+Field = namedtuple('Field', ['name', 'ofs', 'shift', 'mask', 'correct',
+                             'low', 'high', 'group', 'high_ofs'],
+                   defaults=(None,))
+
+
+# name_setters
+#
+# the setters generated by func_template don't know the name of their
+# property, which is needed for the change notifications, so the names
+# are given to the setters when a class is defined
+def name_setters(cls):
+    for name, attr in vars(cls).items():
+        if isinstance(attr, property) and hasattr(attr.fset, 'field'):
+            attr.fset.field = name
+
+
+# field_properties
+#
+# generates the properties for the fields of a class and the
+# dictionary field_map to look up the fields by name
+def field_properties(cls):
+    fields = cls.__dict__.get('fields')
+    if fields is None:
+        return
+
+    for field in fields:
+        if field.high_ofs is None:
+            funcs = cls.func_template(field.ofs, shift=field.shift,
+                                      mask=field.mask, correct=field.correct)
+        else:
+            funcs = cls.split_template(field.ofs, field.high_ofs)
+        setattr(cls, field.name, property(*funcs))
+
+    cls.field_map = {field.name: field for field in fields}
+    cls.field_names = tuple(field.name for field in fields)
+    cls.codec = tuple((field.ofs, field.shift, field.mask, field.correct, field.high_ofs)
+                        for field in fields)
+
+
+# decode_fields
+#
+# decodes all fields of the codec of a class in one pass, base is the
+# offset of the fields in the data block, returns a tuple of the values
+# in the order of the fields
+def decode_fields(data, base, codec):
+    values = []
+    for ofs, shift, mask, correct, high_ofs in codec:
+        if high_ofs is None:
+            values.append(((data[base+ofs] >> shift) & mask) + correct)
+        else:
+            values.append(((data[base+high_ofs] & 1) << 7) | (data[base+ofs] & 0b1111111))
+    return tuple(values)
+
+
+# encode_fields
+#
+# sets all fields of obj which are in the dictionary values,
+# base is the offset of the fields in the data block
+def encode_fields(obj, base, values):
+    data = obj._data
+    for field in obj.fields:
+        if field.name not in values:
+            continue
+
+        val = values[field.name] - field.correct
+        ofs = base + field.ofs
+        if field.high_ofs is None:
+            d = data[ofs] & ~(field.mask << field.shift)
+            obj.write_byte(ofs, d | ((val & field.mask) << field.shift))
+        else:
+            high_ofs = base + field.high_ofs
+            obj.write_byte(ofs, val & 0b1111111)
+            obj.write_byte(high_ofs, (data[high_ofs] & ~1) | ((val >> 7) & 1))
+        obj.changed(field.name)
+
+
 class K4Base(object):
+    # no instance dictionaries, a library holds many patches, subclasses
+    # must define __slots__ as well
+    __slots__ = ('_data', '_batch', '_batch_update', '_observers')
+
     def __init__(self, data):
-        self._data = bytearray(data)
+        if isinstance(data, memoryview) and not data.readonly:
+            # writable view into the data block of a dump (or a
+            # mapped file), refer to the data instead of copying it
+            self._data = data
+        else:
+            self._data = bytearray(data)
+
+        self._batch = None          # changed fields inside of batch()
+        self._batch_update = False
+        self._observers = None
 
         # self.verify_checksum()
 
+
+    # the parameters of the patch
+    fields = ()
+    field_map = {}
+    field_names = ()
+    codec = ()
+
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        field_properties(cls)
+        name_setters(cls)
+
+
     def verify_checksum(self):
-        sum = 0
-        for i in self._data[:-1]:
-            sum += i
-        sum += 0xa5
-        sum &= 0b1111111
+        sum = checksum(self._data)
 
         if _debug:
             print(f'checksum check: {sum:x} == {self._data[-1]:x} = {sum == self._data[-1]}')
@@ -31,11 +211,7 @@ class K4Base(object):
     # updates the checksum field (last byte in dataarray)
     # chksum = sum(b[0]-b[129]) + hex A5 -> last 7 bits
     def update_checksum(self):
-        sum = 0
-        for i in self._data[:-1]:
-            sum += i
-        sum += 0xa5
-        sum &= 0b1111111
+        sum = checksum(self._data)
 
         if _debug:
             print(f'change checksum from {self._data[-1]:x} to {sum:x}')
@@ -49,6 +225,104 @@ class K4Base(object):
         pass
 
 
+    # write_byte, write_bytes
+    #
+    # write into the data block and keep the checksum up to date, inside
+    # of batch() the checksum is updated once at the end
+    def write_byte(self, ofs, value):
+        if self._batch is None:
+            set_byte(self._data, ofs, value)
+        else:
+            self._data[ofs] = value
+
+
+    def write_bytes(self, ofs, values):
+        if self._batch is None:
+            set_bytes(self._data, ofs, values)
+        else:
+            self._data[ofs:ofs+len(values)] = values
+
+
+    # observe
+    #
+    # registers a function which is called with the list of the names
+    # of the changed fields, 'data' stands for the whole data block,
+    # with batches set the function is only called at the end of a
+    # batch, e.g. for a view which shows the single changes itself
+    def observe(self, func, batches=False):
+        if self._observers is None:
+            self._observers = []
+        self._observers.append((func, batches))
+
+
+    # changed
+    #
+    # called after a field has changed, notifies the observers or
+    # collects the name inside of batch()
+    def changed(self, field):
+        if self._batch is not None:
+            if field not in self._batch:
+                self._batch.append(field)
+        elif self._observers is not None:
+            for func, batches in self._observers:
+                if not batches:
+                    func([field])
+
+
+    # batch
+    #
+    # context manager for a number of changes, checksum updates,
+    # update_data and the change notifications are deferred until the
+    # end, then the checksum is calculated once and the observers get
+    # one list of all changed fields
+    #
+    #   with ins.batch():
+    #       ins.volume = 80
+    #       ins.effect = 3
+    @contextlib.contextmanager
+    def batch(self):
+        if self._batch is not None:
+            # nested batch, the outer one does the work
+            yield self
+            return
+
+        self._batch = []
+        try:
+            yield self
+        finally:
+            fields = self._batch
+            self._batch = None
+
+            self.update_checksum()
+            if self._batch_update:
+                self._batch_update = False
+                self.update_data()
+
+            if fields and self._observers is not None:
+                for func, batches in self._observers:
+                    func(fields)
+
+
+    # to_tuple
+    #
+    # returns the values of all fields in the order of field_names
+    def to_tuple(self):
+        return decode_fields(self._data, 0, self.codec)
+
+
+    # to_dict, from_dict
+    #
+    # returns or sets the values of all fields at once, from_dict sets
+    # only the fields in the dictionary with one checksum update
+    def to_dict(self):
+        return dict(zip(self.field_names, self.to_tuple()))
+
+
+    def from_dict(self, values):
+        with self.batch():
+            encode_fields(self, 0, values)
+
+
     # most functions can be used by templates
     # which defines the offset, shift-right(read)
     # shift-left(set) and mask
@@ -72,9 +346,8 @@ class K4Base(object):
             if _debug:                
                 print(f'newval={d:0b} {d}')
             # set the new data
-            self._data[ofs] = d
-
-            self.update_checksum()
+            self.write_byte(ofs, d)
+            self.changed(set_f.field)
 
         def get_f(self):
             b = ((self._data[ofs] >> shift) & mask) + correct
@@ -83,6 +356,27 @@ class K4Base(object):
                 print(f'mask={mask}, shift={shift} correct={correct} -> {b} {b:0b}')
             return b
 
+        set_f.field = None      # set by name_setters
+        return get_f, set_f
+
+
+    # split_template
+    #
+    # template for the values with 8 bits, the lower 7 bits are
+    # stored at ofs and bit 7 in bit 0 of the byte at high_ofs
+    def split_template(ofs, high_ofs):
+        def set_f(self, newval):
+            if _debug:
+                print(f'set value @{ofs}/{high_ofs}: {newval}')
+
+            self.write_byte(ofs, newval & 0b1111111)
+            self.write_byte(high_ofs, (self._data[high_ofs] & ~1) | ((newval >> 7) & 1))
+            self.changed(set_f.field)
+
+        def get_f(self):
+            return ((self._data[high_ofs] & 1) << 7) | (self._data[ofs] & 0b1111111)
+
+        set_f.field = None      # set by name_setters
         return get_f, set_f
 
 
@@ -115,12 +409,16 @@ class K4Base(object):
             if b == self.id:
                 size = int.from_bytes(f.read(2))
                 if size == len(self._data):
-                    olddata = self._data
-                    self._data = bytearray(f.read(size))
+                    olddata = bytearray(self._data)
+                    # overwrite the data in place, since the data block
+                    # can be a view into a larger buffer
+                    self._data[:] = f.read(size)
                     check = self.verify_checksum()
                     if not check:
                         print('Checksum error while reading data from disk!')
-                        self._data = olddata    # restore old data if failing...
+                        self._data[:] = olddata    # restore old data if failing...
+                    else:
+                        self.changed('data')
                     return check
 
         return False
@@ -133,15 +431,19 @@ class K4Base(object):
 
 
     def copy(self):
-        return copy.copy(self._data)
+        return bytearray(self._data)
 
 
     def paste(self, data):
         if data is None: return
 
         if len(data) == len(self._data):
-            self._data = copy.copy(data)
-            self.update_data()
+            self._data[:] = data
+            if self._batch is None:
+                self.update_data()
+            else:
+                self._batch_update = True
+            self.changed('data')
 
 
 # k4BaseSection
@@ -152,9 +454,30 @@ class K4Base(object):
 # changes of a section property are directly reflected in the data block
 
 class K4BaseSection(object):
-    def __init__(self, data, ofs=0):
+    __slots__ = ('_data', '_ofs', '_parent', '_name')
+
+    # parent is the main class, which takes care of the checksum
+    # and the change notifications, the changed fields are reported
+    # to the parent as 'name.field'
+    def __init__(self, data, ofs=0, parent=None, name=''):
         self._data = data
         self._ofs = ofs
+        self._parent = parent
+        self._name = name
+
+
+    # the parameters of the section, the offsets are relative
+    # to the section
+    fields = ()
+    field_map = {}
+    field_names = ()
+    codec = ()
+
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        field_properties(cls)
+        name_setters(cls)
 
     def __len__(self):
         return 0
@@ -181,8 +504,46 @@ class K4BaseSection(object):
         if section is None: return
 
         # copy the section data into the data block
-        data = section.get_data()   # get binary data
-        self._data[self._ofs:self._ofs+len(self)] = data
+        data = bytes(section.get_data())   # get binary data
+        self.write_bytes(self._ofs, data)
+        self.changed('data')
+
+
+    def write_byte(self, ofs, value):
+        if self._parent is None:
+            # the data block is the one of the main class, so the
+            # checksum is its last byte
+            set_byte(self._data, ofs, value)
+        else:
+            self._parent.write_byte(ofs, value)
+
+
+    def write_bytes(self, ofs, values):
+        if self._parent is None:
+            set_bytes(self._data, ofs, values)
+        else:
+            self._parent.write_bytes(ofs, values)
+
+
+    def changed(self, field):
+        if self._parent is not None:
+            self._parent.changed(f'{self._name}.{field}')
+
+
+    def to_tuple(self):
+        return decode_fields(self._data, self._ofs, self.codec)
+
+
+    def to_dict(self):
+        return dict(zip(self.field_names, self.to_tuple()))
+
+
+    def from_dict(self, values):
+        if self._parent is None:
+            encode_fields(self, self._ofs, values)
+        else:
+            with self._parent.batch():
+                encode_fields(self, self._ofs, values)
 
         
     # func_template
@@ -208,7 +569,8 @@ class K4BaseSection(object):
             if _debug:                
                 print(f'newval={d:0b} {d}')
             # set the new data
-            self._data[self._ofs+ofs] = d
+            self.write_byte(self._ofs+ofs, d)
+            self.changed(set_f.field)
 
 
         def get_f(self):
@@ -218,5 +580,6 @@ class K4BaseSection(object):
                 print(f'mask={mask}, shift={shift} correct={correct} -> {b} {b:0b}')
             return b
 
+        set_f.field = None      # set by name_setters
         return get_f, set_f
     
\ No newline at end of file
@@ -0,0 +1,218 @@
+# k4cache.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import hashlib
+import os
+import struct
+import tempfile
+
+from collections import namedtuple
+
+from k4midi.k4dump import all_data_layout, all_data_patches, all_data_size, \
+                          dump_block
+from k4midi.k4base import checksum, decode_name
+
+_debug = False
+
+
+# the file format of a cache entry:
+#
+#   magic 'K4C2', is_midi, function, 7 header bytes, size of the bank
+#   the data block of the dump (0 bytes without patches)
+#
+# all data dumps (function 0x22) continue with
+#
+#   one bit per patch in the order of all_data_patches, set if the
+#   checksum is bad
+#   the names of the single and multi instruments, 10 bytes each
+#
+# the offsets of the patches are given by all_data_layout or by the
+# layout of the one data and block data dumps (see dump_layout), the
+# size of the bank is kept to detect entries of a different layout
+
+magic = b'K4C2'
+entry_header = struct.Struct('<4sBB7sI')
+
+name_keys = ('single_instruments', 'multi_instruments')
+name_count = sum(count for key, cls, count, name in all_data_layout if key in name_keys)
+bitmap_size = (len(all_data_patches) + 7) // 8
+
+# reference to the entry of a file: size, mtime and content hash
+ref_format = struct.Struct('<QQ20s')
+
+
+CacheEntry = namedtuple('CacheEntry', ['is_midi', 'function', 'header', 'bank',
+                                       'bad_checksums', 'names'])
+
+
+def pack_bits(bits):
+    data = bytearray(bitmap_size)
+    for nr, bit in enumerate(bits):
+        if bit:
+            data[nr >> 3] |= 1 << (nr & 7)
+    return bytes(data)
+
+
+def unpack_bits(data):
+    return [bool(data[nr >> 3] & (1 << (nr & 7))) for nr in range(len(all_data_patches))]
+
+
+# encode_entry, decode_entry
+#
+# converts a dump into the binary format of the cache and back
+def encode_entry(dump):
+    function = dump.data['function']
+    if dump.bank is not None:
+        bank = bytes(dump.bank)
+    elif function in (0x20, 0x21):
+        bank = dump_block(dump)
+    else:
+        bank = b''
+    parts = [entry_header.pack(magic, dump._is_midi, function,
+                               bytes(dump._header), len(bank))]
+    if bank:
+        parts.append(bank)
+        if function == 0x22:
+            parts.append(pack_bits(bank[ofs+cls.size-1] != checksum(bank[ofs:ofs+cls.size])
+                                   for key, nr, cls, ofs, name in all_data_patches))
+            parts.extend(bank[ofs:ofs+10] for key, nr, cls, ofs, name in all_data_patches
+                         if key in name_keys)
+
+    return b''.join(parts)
+
+
+def decode_entry(data):
+    tag, is_midi, function, header, size = entry_header.unpack_from(data)
+    if tag != magic:
+        raise ValueError('Not a cache entry')
+
+    bank = None
+    bad = []
+    names = {}
+    if size > 0 and function != 0x22:
+        ofs = entry_header.size
+        if len(data) != ofs + size:
+            raise ValueError('Cache entry is truncated')
+        bank = data[ofs:ofs+size]
+    elif size > 0:
+        if size != all_data_size:
+            raise ValueError(f'Wrong size of the data block ({size} != {all_data_size})')
+        ofs = entry_header.size
+        bank = data[ofs:ofs+size]
+        ofs += size
+        bad = unpack_bits(data[ofs:ofs+bitmap_size])
+        ofs += bitmap_size
+        if len(data) != ofs + name_count * 10:
+            raise ValueError('Cache entry is truncated')
+        for key, cls, count, name in all_data_layout:
+            if key in name_keys:
+                names[key] = [decode_name(data[ofs+nr*10:ofs+nr*10+10])
+                              for nr in range(count)]
+                ofs += count * 10
+
+    return CacheEntry(bool(is_midi), function, header, bank, bad, names)
+
+
+# K4Cache
+#
+# on-disk cache of parsed dumps, the entries are stored by the hash of
+# the file content, so identical files share an entry. For every file
+# a reference with its size and mtime points to the entry, a file with
+# the same size and mtime is not read again
+#
+#   cache = K4Cache()
+#   dump = K4Dump(filename, cache=cache)
+class K4Cache(object):
+    def __init__(self, directory=None):
+        if directory is None:
+            base = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+            directory = os.path.join(base, 'k4midi')
+        self._directory = directory
+
+        os.makedirs(os.path.join(directory, 'refs'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'entries'), exist_ok=True)
+
+
+    @property
+    def directory(self):
+        return self._directory
+
+
+    def ref_name(self, path):
+        h = hashlib.sha1(path.encode('utf8', 'surrogateescape')).hexdigest()
+        return os.path.join(self._directory, 'refs', h)
+
+
+    def entry_name(self, digest):
+        return os.path.join(self._directory, 'entries', digest.hex())
+
+
+    # key
+    #
+    # the key of a file is (path, size, mtime)
+    def key(self, filename):
+        st = os.stat(filename)
+        return os.path.abspath(os.fsdecode(filename)), st.st_size, st.st_mtime_ns
+
+
+    def _write(self, filename, data):
+        # write and rename, other processes may read the cache
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(filename))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmpname, filename)
+        except OSError:
+            os.unlink(tmpname)
+            raise
+
+
+    # get
+    #
+    # returns the CacheEntry of the file or None
+    def get(self, key):
+        path, size, mtime = key
+        try:
+            with open(self.ref_name(path), 'rb') as f:
+                ref_size, ref_mtime, digest = ref_format.unpack(f.read())
+            if (ref_size != size) or (ref_mtime != mtime):
+                return None
+            with open(self.entry_name(digest), 'rb') as f:
+                entry = decode_entry(f.read())
+        except (OSError, ValueError, struct.error) as e:
+            if _debug:
+                print(f'cache miss for {path}: {e}')
+            return None
+
+        if _debug:
+            print(f'cache hit for {path}')
+        return entry
+
+
+    # has_entry
+    #
+    # True if the entry exists in the current format, entries of an
+    # older format are written again
+    def has_entry(self, filename):
+        try:
+            with open(filename, 'rb') as f:
+                return f.read(len(magic)) == magic
+        except OSError:
+            return False
+
+
+    # put
+    #
+    # stores the parsed dump of the file
+    def put(self, key, dump):
+        path, size, mtime = key
+        digest = hashlib.sha1(dump._data).digest()
+        try:
+            entry = self.entry_name(digest)
+            if not self.has_entry(entry):
+                self._write(entry, encode_entry(dump))
+            self._write(self.ref_name(path), ref_format.pack(size, mtime, digest))
+        except OSError as e:
+            print(f'Cannot write cache entry for {path}: {e}')
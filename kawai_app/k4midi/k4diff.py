@@ -0,0 +1,151 @@
+# k4diff.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+from collections import namedtuple
+
+import numpy as np
+
+from k4midi.k4base import decode_fields, decode_name
+from k4midi.k4dump import all_data_patches, all_data_size
+
+_debug = False
+
+
+# a changed parameter, nr is the number of the patch (starting with 0)
+# or None for the drum common data, field is the name of the property
+# (sections[n].field for the sections of a multi), 'name', 'checksum'
+# or byte[ofs] for changed bits which belong to no field
+Change = namedtuple('Change', ['key', 'nr', 'field', 'old', 'new'])
+
+
+# the start offsets of the patches in the data block
+_patch_starts = np.array([entry[3] for entry in all_data_patches])
+
+# offset -> fields for every patch class
+_offset_fields = {}
+
+
+# offset_fields
+#
+# returns a dictionary which maps every byte offset of a patch class to
+# a list of (name, codec) for the fields using bits of this byte, the
+# high byte of the wave select belongs to the field as well
+def offset_fields(cls):
+    if cls in _offset_fields:
+        return _offset_fields[cls]
+
+    fields = [(field.name, field) for field in cls.fields]
+    section_class = getattr(cls, 'section_class', None)
+    if section_class is not None:
+        for nr in range(cls.section_count):
+            base = cls.section_ofs + nr * cls.section_size
+            fields += [(f'sections[{nr}].{field.name}',
+                        field._replace(ofs=base+field.ofs,
+                                       high_ofs=None if field.high_ofs is None
+                                                else base+field.high_ofs))
+                       for field in section_class.fields]
+
+    mapping = {}
+    for name, field in fields:
+        codec = (field.ofs, field.shift, field.mask, field.correct, field.high_ofs)
+        mapping.setdefault(field.ofs, []).append((name, codec))
+        if field.high_ofs is not None:
+            mapping.setdefault(field.high_ofs, []).append((name, codec))
+
+    _offset_fields[cls] = mapping
+    return mapping
+
+
+def has_name(cls):
+    return isinstance(getattr(cls, 'name', None), property)
+
+
+# patch_changes
+#
+# the changes of one patch, a and b are the data blocks of the patches,
+# offsets are the changed bytes relative to the patch
+def patch_changes(key, nr, cls, a, b, offsets, checksum=False):
+    mapping = offset_fields(cls)
+    changes = []
+    seen = set()
+    name_changed = False
+
+    for ofs in offsets:
+        if ofs == cls.size - 1:
+            if checksum:
+                changes.append(Change(key, nr, 'checksum', a[ofs], b[ofs]))
+            continue
+        if has_name(cls) and ofs < 10:
+            name_changed = True
+            continue
+
+        found = False
+        for name, codec in mapping.get(ofs, []):
+            old, = decode_fields(a, 0, (codec,))
+            new, = decode_fields(b, 0, (codec,))
+            if old != new:
+                found = True
+                if name not in seen:
+                    seen.add(name)
+                    changes.append(Change(key, nr, name, old, new))
+        if not found:
+            changes.append(Change(key, nr, f'byte[{ofs}]', a[ofs], b[ofs]))
+
+    if name_changed:
+        changes.insert(0, Change(key, nr, 'name',
+                                 decode_name(a), decode_name(b)))
+
+    return changes
+
+
+# diff_banks
+#
+# compares the data blocks of two all data dumps, returns the list of
+# changes, the bytes are compared in one pass and only the changed
+# bytes are decoded
+def diff_banks(bank_a, bank_b, checksum=False):
+    a = np.frombuffer(bank_a, dtype=np.uint8)
+    b = np.frombuffer(bank_b, dtype=np.uint8)
+    if (len(a) != all_data_size) or (len(b) != all_data_size):
+        raise ValueError(f'Wrong size of the data blocks ({len(a)}, {len(b)} != {all_data_size})')
+
+    changed = np.flatnonzero(a != b)
+    if len(changed) == 0:
+        return []
+
+    # group the offsets by patch
+    patch_nrs = np.searchsorted(_patch_starts, changed, side='right') - 1
+    splits = np.flatnonzero(np.diff(patch_nrs)) + 1
+
+    starts = np.concatenate(([0], splits))
+
+    changes = []
+    for first, offsets in zip(starts, np.split(changed, splits)):
+        key, nr, cls, ofs, name = all_data_patches[patch_nrs[first]]
+        end = ofs + cls.size
+        changes += patch_changes(key, nr, cls, bank_a[ofs:end], bank_b[ofs:end],
+                                 (offsets - ofs).tolist(), checksum)
+
+    return changes
+
+
+def diff_dumps(dump_a, dump_b, checksum=False):
+    if (dump_a.bank is None) or (dump_b.bank is None):
+        raise ValueError('Only all data dumps can be compared')
+    return diff_banks(dump_a.bank, dump_b.bank, checksum)
+
+
+# diff_patches
+#
+# compares two patches of the same class
+def diff_patches(patch_a, patch_b, checksum=False):
+    cls = type(patch_a)
+    if type(patch_b) is not cls:
+        raise ValueError(f'Cannot compare {cls.__name__} with {type(patch_b).__name__}')
+
+    a = patch_a._data
+    b = patch_b._data
+    offsets = np.flatnonzero(np.frombuffer(a, dtype=np.uint8) != np.frombuffer(b, dtype=np.uint8))
+    return patch_changes(None, None, cls, a, b, offsets.tolist(), checksum)
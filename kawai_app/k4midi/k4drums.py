@@ -1,16 +1,20 @@
 # k4drums.py
 #
 # written by: Oliver Cordes 2023-04-10
-# changed by: Oliver Cordes 2023-04-10
+# changed by: Oliver Cordes 2026-10-18
 
 from k4midi.k4base import K4Base
 
 
 class K4DrumCommon(K4Base):
+    __slots__ = ()
+
     id = 0x12
     size = 11
 
 
 class K4Drums(K4Base):
+    __slots__ = ()
+
     id = 0x13
     size = 11
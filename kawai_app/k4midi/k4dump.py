@@ -1,11 +1,20 @@
 # k4dump.py
 #
 # written by: Oliver Cordes 2023-01-29
-# changed by: Oliver Cordes 2023-05-06
+# changed by: Oliver Cordes 2026-10-18
 
 
+import os
+import shutil
+import tempfile
+import zipfile
+
+from collections.abc import Sequence
+
 from k4midi.midifile import MidiFile
 
+from k4midi.k4base import checksum, decode_name
+
 from k4midi.k4single import K4SingleInstrument
 from k4midi.k4multi import K4MultiInstrument
 from k4midi.k4drums import K4DrumCommon, K4Drums
@@ -13,40 +22,367 @@ from k4midi.k4effects import K4Effects
 
 _debug = False
 
-def read_delta(bytes):
+
+# extensions of the files which contain dumps
+dump_extensions = ('.mid', '.midi', '.syx')
+
+kawai_id = 0x40     # manufacturer id
+k4_id = 0x04        # machine id of the K4/K4r
+
+header_size = 7
+
+# function codes of the one data, block data and all data dumps
+k4_dump_functions = (0x20, 0x21, 0x22)
+
+
+# is_k4_dump
+#
+# checks the header of a sysex message (without 0xf0), other devices
+# and other K4 messages (e.g. parameter changes) are no dumps
+def is_k4_dump(data):
+    return (len(data) >= header_size and data[0] == kawai_id and data[4] == k4_id
+            and data[2] in k4_dump_functions)
+
+
+# read_delta
+#
+# reads a variable length quantity at offset ofs of data, returns
+# the value and the offset of the first byte behind the quantity
+def read_delta(data, ofs=0):
     delta = 0
-    rbytes = 0
 
     while True:
-        b = bytes[0]
-        #print('1', delta, b, b & 0x7f)
-        bytes = bytes[1:]
+        b = data[ofs]
+        ofs += 1
         delta = (delta << 7) | (b & 0x7f)
         if b < 0x80:
-            return delta, bytes
+            return delta, ofs
 
 
+# write_delta
+#
+# encodes value as a variable length quantity
+def write_delta(value):
+    data = bytearray([value & 0x7f])
+    value >>= 7
+    while value > 0:
+        data.insert(0, 0x80 | (value & 0x7f))
+        value >>= 7
+    return bytes(data)
+
+
+# number of data bytes of the MIDI channel messages 0x8n-0xEn
+channel_message_length = {0x80: 2, 0x90: 2, 0xa0: 2, 0xb0: 2,
+                          0xc0: 1, 0xd0: 1, 0xe0: 2}
+
+
+# all_data_layout
+#
+# the order of the patches of an all data dump (function 0x22) behind
+# the 7 header bytes: (key in the results, patch class, number of
+# patches or None for a single patch, name for messages)
+all_data_layout = [('single_instruments', K4SingleInstrument, 64, 'single instrument'),
+                   ('multi_instruments', K4MultiInstrument, 64, 'multi instrument'),
+                   ('drum_common', K4DrumCommon, None, 'drum common'),
+                   ('drums', K4Drums, 61, 'drums'),
+                   ('effects', K4Effects, 32, 'effects')]
+
+
+# layout_patches
+#
+# returns a list of (key, nr, patch class, offset, name) for every patch
+# of a layout and the total size of the data, nr is None for a single patch
+def layout_patches(layout):
+    patches = []
+    ofs = 0
+    for key, cls, count, name in layout:
+        if count is None:
+            patches.append((key, None, cls, ofs, name))
+            ofs += cls.size
+        else:
+            for nr in range(count):
+                patches.append((key, nr, cls, ofs, name))
+                ofs += cls.size
+
+    return patches, ofs
+
+
+all_data_patches, all_data_size = layout_patches(all_data_layout)
+
+# the entries of all_data_patches sorted by key
+all_data_entries = {key: [e for e in all_data_patches if e[0] == key]
+                        for key, cls, count, name in all_data_layout}
+
+
+# update_bank_checksums
+#
+# updates the checksums of all patches in the data block of an all
+# data dump
+def update_bank_checksums(bank):
+    for key, nr, cls, ofs, name in all_data_patches:
+        end = ofs + cls.size
+        bank[end-1] = checksum(bank[ofs:end])
+
+
+def checksum_message(entry):
+    key, nr, cls, ofs, name = entry
+    if nr is None:
+        print(f'Checksum mismatched for {name}!')
+    else:
+        print(f'Checksum mismatched for {name} nr. {nr+1}!')
+
+
+# the drum data as part of one data and block data dumps
+drum_layout = [('drum_common', K4DrumCommon, None, 'drum common'),
+               ('drums', K4Drums, 61, 'drums')]
+
+
+# dump_layout
+#
+# returns the layout and the number of the first patch of a one data
+# dump (function 0x20) or a block data dump (function 0x21), bit 0 of
+# sub status 1 selects singles and multis (0) or effects and drums (1),
+# bit 1 is set for the cartridge, sub status 2 is the patch number
+# (singles 0-63, multis 64-127, effects 0-31, drums 32) or the
+# first patch of the block (0x00 singles, 0x40 multis, 0x00 effects,
+# 0x20 drums), returns None for unknown dumps
+def dump_layout(function, sub_status1, sub_status2):
+    drums = sub_status1 & 1
+    if function == 0x20:
+        if not drums and sub_status2 < 64:
+            return [('single_instruments', K4SingleInstrument, 1, 'single instrument')], sub_status2
+        elif not drums and sub_status2 < 128:
+            return [('multi_instruments', K4MultiInstrument, 1, 'multi instrument')], sub_status2 - 64
+        elif drums and sub_status2 < 32:
+            return [('effects', K4Effects, 1, 'effects')], sub_status2
+        elif drums and sub_status2 == 32:
+            return drum_layout, 0
+    elif function == 0x21:
+        if not drums and sub_status2 == 0x00:
+            return all_data_layout[0:1], 0
+        elif not drums and sub_status2 == 0x40:
+            return all_data_layout[1:2], 0
+        elif drums and sub_status2 == 0x00:
+            return all_data_layout[4:5], 0
+        elif drums and sub_status2 == 0x20:
+            return drum_layout, 0
+
+    return None
+
+
+# make_patch
+#
+# creates the patch object for an entry of layout_patches from its data
+# and verifies the checksum if check is set
+def make_patch(entry, data, check=True):
+    i = entry[2](data)
+    if check and not i.verify_checksum():
+        checksum_message(entry)
+    return i
+
+
+# decode_patch
+#
+# creates the patch for an entry of layout_patches and stores it in
+# results, the patches of a list have to be decoded in order
+def decode_patch(results, entry, data, check=True):
+    i = make_patch(entry, data, check)
+    if entry[1] is None:
+        results[entry[0]] = i
+    else:
+        results.setdefault(entry[0], []).append(i)
 
-class K4Dump(MidiFile):
-    def __init__(self, filename):
-        MidiFile.__init__(self, filename)
 
+# decode_dump
+#
+# decodes the patches of a one data or block data dump into results,
+# 'nr' is the number of the (first) patch of the dump
+def decode_dump(results, function, sub_status1, sub_status2, data):
+    layout = dump_layout(function, sub_status1, sub_status2)
+    if layout is None:
+        print(f'Unknown dump 0x{function:x} {sub_status1:x} {sub_status2:x}!')
+        return results
+
+    layout, nr = layout
+    patches, size = layout_patches(layout)
+    if len(data) < size:
+        print(f'Dump is too short ({len(data)} of {size} bytes)!')
+        return results
+
+    data = memoryview(bytearray(data[:size]))
+    for entry in patches:
+        ofs = entry[3]
+        decode_patch(results, entry, data[ofs:ofs+entry[2].size])
+    results['nr'] = nr
+
+    return results
+
+
+# dump_block
+#
+# the data block of a one data or block data dump, collected from its
+# patches, empty for unknown or incomplete dumps
+def dump_block(dump):
+    header = dump._header
+    results = dump.data
+    layout = dump_layout(header[2], header[5], header[6])
+    if (layout is None) or ('nr' not in results):
+        return b''
+
+    patches, size = layout_patches(layout[0])
+    return b''.join(bytes((results[key] if nr is None else results[key][nr])._data)
+                    for key, nr, cls, ofs, name in patches)
+
+
+# K4PatchList
+#
+# list of patches which are created (and checked) on first access from
+# the data block of the dump, entries are the entries of layout_patches
+# for this list, names are the known names of the patches (e.g. from
+# the cache)
+class K4PatchList(Sequence):
+    def __init__(self, data, entries, check=True, names=None):
+        self._data = data
+        self._entries = entries
+        self._check = check
+        self._names = names
+        self._patches = [None] * len(entries)
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __getitem__(self, nr):
+        if isinstance(nr, slice):
+            return [self[i] for i in range(*nr.indices(len(self)))]
+
+        i = self._patches[nr]
+        if i is None:
+            entry = self._entries[nr]
+            ofs = entry[3]
+            i = make_patch(entry, self._data[ofs:ofs+entry[2].size], self._check)
+            self._patches[nr] = i
+        return i
+
+
+    # names
+    #
+    # returns the names of all patches, patches which are not
+    # created yet are not created for this, the created ones may
+    # have been renamed
+    def names(self):
+        names = []
+        for nr, (i, entry) in enumerate(zip(self._patches, self._entries)):
+            if i is None and self._names is not None:
+                names.append(self._names[nr])
+            elif i is None:
+                ofs = entry[3]
+                names.append(decode_name(self._data[ofs:ofs+10]))
+            else:
+                names.append(i.name)
+        return names
+
+
+
+class K4Dump(MidiFile):
+    # if lazy is set, the patches are created and checked on first
+    # access instead of reading the whole dump at once, filename can
+    # also be a file object or the data (see MidiFile)
+    #
+    # with a cache (see K4Cache) an unchanged file is not parsed again
+    def __init__(self, filename, use_mmap=False, lazy=False, cache=None):
         self._header = None
+        self._bank = None       # data block of all patches
+        self._lazy = lazy
+        self._names = {}        # key -> names of the patches from the cache
+
+        key = None
+        if (cache is not None) and isinstance(filename, (str, os.PathLike)):
+            key = cache.key(filename)
+            entry = cache.get(key)
+            if entry is not None:
+                self.from_cache(filename, entry)
+                return
+
+        MidiFile.__init__(self, filename, use_mmap=use_mmap)
 
         # read the dump data
         self._results = self.parse_midi_stream()
 
+        if (key is not None) and (self._header is not None):
+            cache.put(key, self)
+
+
+    # from_cache
+    #
+    # restores the dump from a cache entry instead of reading the file,
+    # the checksums of an all data dump are not verified again
+    def from_cache(self, filename, entry):
+        self._filename = filename
+        self._data = None
+        self._is_midi = entry.is_midi
+        self._chunks = []
+        self._track_chunks = []
+
+        self._header = bytearray(entry.header)
+        self._results = {'function': entry.function}
+        if entry.function == 0x22:
+            self._bank = memoryview(bytearray(entry.bank))
+            self._names = entry.names
+            for e, bad in zip(all_data_patches, entry.bad_checksums):
+                if bad:
+                    checksum_message(e)
+            self.decode_bank(self._results, check=False)
+        elif entry.bank is not None:
+            decode_dump(self._results, entry.function, self._header[5], self._header[6],
+                        entry.bank)
+
 
     @property
     def data(self):
         return self._results
 
+
+    # bank
+    #
+    # the data block of all patches of an all data dump
+    @property
+    def bank(self):
+        return self._bank
+
+
+    # channel
+    #
+    # the MIDI channel (0-15) of the device which sent the dump
+    @property
+    def channel(self):
+        if self._header is None:
+            return None
+        return self._header[1]
+
+
+    # names
+    #
+    # returns the names of the single or multi instruments, a lazy dump
+    # from the cache takes them from the cache entry
+    def names(self, key='single_instruments'):
+        patches = self._results[key]
+        if isinstance(patches, K4PatchList):
+            return patches.names()
+        return [i.name for i in patches]
+
         
+    # parse_midi_stream
+    #
+    # walks through all tracks of the file with an offset into a
+    # memoryview of the track, so no data is copied until a sysex
+    # message is handed over to k4_dump
     def parse_midi_stream(self):
         # if not MIDI file, then treat as sysex file
 
         if not self._is_midi:
-            results = self.k4_dump(self._data[1:])
+            results = self.k4_dump(memoryview(self._data)[1:])
             return results
 
         # assume data is a MIDI file
@@ -55,45 +391,60 @@ class K4Dump(MidiFile):
 
         midi_channel_prefix = 0
 
-        while (track_nr < self._tracks) and (results is None):
+        while (track_nr < len(self.tracks)) and (results is None):
             data = self.get_track(track_nr)
-        
-            while len(data) > 0:
-                delta, data = read_delta(data)
-                if data[0] == 0xff:
-                    tlen = data[2]
-
-                    if data[1] == 0x20:
-                        midi_channel_prefix = data[3]
+            ofs = 0
+            end = len(data)
+            status = 0      # running status
+
+            while ofs < end:
+                delta, ofs = read_delta(data, ofs)
+                b = data[ofs]
+                if b == 0xff:
+                    # meta event
+                    meta = data[ofs+1]
+                    tlen, ofs = read_delta(data, ofs+2)
+
+                    if meta == 0x20:
+                        midi_channel_prefix = data[ofs]
                         if _debug:
                             print(f'{delta:d} midi_channel_prefix={midi_channel_prefix}')
-                    elif data[1] in range(0x01, 0x08):
-                        # text events 
-                        text = data[3:3+tlen]
+                    elif meta in range(0x01, 0x08):
+                        # text events
                         if _debug:
+                            text = bytes(data[ofs:ofs+tlen])
                             print(f'{delta} text={text}')
-                    elif data[1] == 0x2f:
+                    elif meta == 0x2f:
                         if _debug:
                             print('End of track')
-                    elif data[1] == 0x51:
-                        # FF 51 03 tttttt Set Tempo
-                        tttttt = data[3:7]
-                    elif data[1] == 0x58:
-                        # 58 04 nn dd cc bb Time Signature
-                        nn = data[3]
-                        dd = data[4]
-                        cc = data[5]
-                        bb = data[6]                    
-                    else:
-                        raise ValueError(f'Unknown byte 0x{data[1]:x}')
-                    data = data[3+tlen:]
-                elif data[0] == 0xf0:
+                    # all other meta events (tempo, time signature, ...)
+                    # are simply skipped
+                    ofs += tlen
+                    status = 0
+                elif b == 0xf0:
                     # sysex message
-                    length, data = read_delta(data[1:])
-                    results = self.k4_dump(data)
-                    data = data[length:]
+                    length, ofs = read_delta(data, ofs+1)
+                    msg = data[ofs:ofs+length]
+                    if results is None and is_k4_dump(msg):
+                        results = self.k4_dump(msg)
+                    elif _debug:
+                        print(f'{delta} skipped sysex of {length} bytes')
+                    ofs += length
+                    status = 0
+                elif b == 0xf7:
+                    # sysex continuation/escape, not used by the K4
+                    length, ofs = read_delta(data, ofs+1)
+                    ofs += length
+                    status = 0
+                elif b >= 0x80:
+                    # channel message
+                    status = b
+                    ofs += 1 + channel_message_length[status & 0xf0]
+                elif status != 0:
+                    # channel message with running status
+                    ofs += channel_message_length[status & 0xf0]
                 else:
-                    raise ValueError(f'Unknown byte 0x{data[0]:x}')
+                    raise ValueError(f'Unknown byte 0x{b:x}')
 
             track_nr += 1
 
@@ -127,93 +478,104 @@ class K4Dump(MidiFile):
         results = {}
         results['function'] = function
         if function == 0x22:
-            # full dump
-
-            # 64 single instruments
-            single = []
-            size = K4SingleInstrument.size
-            for nr in range(64):
-                i = K4SingleInstrument(data[nr*size:(nr+1)*size])
-                if not i.verify_checksum():
-                    print(f'Checksum mismatched for single instrument nr. {nr+1}!')
-                single.append(i)
-            results['single_instruments'] = single
-            data = data[(size*64):]
-
-            # 64 multi instrumens
-            multi = []
-            size = K4MultiInstrument.size
-            for nr in range(64):
-                i = K4MultiInstrument(data[nr*size:(nr+1)*size])
-                if not i.verify_checksum():
-                    print(f'Checksum mismatched for multi instrument nr. {nr+1}!')
-                multi.append(i)
-            results['multi_instruments'] = multi
-            data = data[(size*64):]
-
-            # 1 drum common
-            size = K4DrumCommon.size
-            i = K4DrumCommon(data[:size])
-            if not i.verify_checksum():
-                print(f'Checksum mismatched for drum common!')
-            results['drum_common'] = i
-            data = data[size:]
-
-            # 61 drums
-            size = K4Drums.size
-            drums = []
-            for nr in range(61):
-                i = K4Drums(data[nr*size:(nr+1)*size])
-                if not i.verify_checksum():
-                    print(f'Checksum mismatched for drums nr. {nr+1}!')
-                drums.append(i)
-            results['drums'] = drums
-            data = data[(size*61):]
-            
-            # 32 effects
-            size = K4Effects.size
-            effects = []
-            for nr in range(32):
-                i = K4Effects(data[nr*size:(nr+1)*size])
-                if not i.verify_checksum():
-                    print(f'Checksum mismatched for effects nr. {nr+1}!')
-                effects.append(i)
-            results['effects'] = effects
-            data = data[(size*32):]
-
-            #print(f'Bytes left over: {len(data)}')
+            # the final 0xf7 is accepted in place of the last checksum,
+            # some dumps (e.g. k4.mid) are one byte short
+            if len(data) < all_data_size:
+                raise ValueError(f'All data dump is too short ({len(data)} of {all_data_size} bytes)')
+            # all patches share one data block and are views into it,
+            # a writable block (a mapped file) is used directly
+            if not (isinstance(data, memoryview) and not data.readonly):
+                data = memoryview(bytearray(data[:all_data_size]))
+            data = data[:all_data_size]
+            self._bank = data
+            self.decode_bank(results)
+        elif function in (0x20, 0x21):
+            decode_dump(results, function, sub_status1, sub_status2, data)
 
         return results
 
 
+    # decode_bank
+    #
+    # creates the patches of the data block of an all data dump
+    def decode_bank(self, results, check=True):
+        data = self._bank
+        if self._lazy:
+            # full dump, patches are created on access
+            for key, cls, count, name in all_data_layout:
+                entries = all_data_entries[key]
+                if count is None:
+                    ofs = entries[0][3]
+                    results[key] = make_patch(entries[0], data[ofs:ofs+cls.size], check)
+                else:
+                    results[key] = K4PatchList(data, entries, check,
+                                               self._names.get(key))
+        else:
+            # full dump
+            for entry in all_data_patches:
+                ofs = entry[3]
+                decode_patch(results, entry, data[ofs:ofs+entry[2].size], check)
+
+
+    # update_checksums
+    #
+    # updates the checksums of all patches in the data block
+    def update_checksums(self):
+        update_bank_checksums(self._bank)
+
+
+    # dump_data
+    #
+    # the header and the data block between start_header and end_header,
+    # the checksums of an all data dump are fixed, one data and block
+    # data dumps are collected from their patches
+    def dump_data(self, start_header=b'\xf0', end_header=b'\xf7'):
+        if self._bank is not None:
+            # fix any error made before ;-)
+            self.update_checksums()
+            block = self._bank
+        elif self._header is not None:
+            block = dump_block(self)
+        else:
+            block = b''
+        if len(block) == 0:
+            raise ValueError('No K4 dump to save')
+
+        return b''.join((start_header, self._header, block, end_header))
+
+
     def save_file(self, filename, start_header, end_header):
-        with open(filename, 'wb') as f:
-            # write start bytes
-            f.write(start_header)
-            
-            f.write(self._header)
-
-            for i in self._results['single_instruments']:
-                 i.raw_save(f)
-            for i in self._results['multi_instruments']:
-                i.raw_save(f)
-            self._results['drum_common'].raw_save(f)
-            for i in self._results['drums']:
-                i.raw_save(f)
-            for i in self._results['effects']:
-                i.raw_save(f)
-
-            # write ending bytes
-            f.write(end_header)
-        
-        
+        data = self.dump_data(start_header, end_header)
+
+        if self.maps_file(filename):
+            # the patches still refer to the pages of the mapped file,
+            # truncating it would take them away, so a new file replaces
+            # the old one, which stays alive as long as it is mapped
+            fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                shutil.copymode(filename, tmpname)
+                os.replace(tmpname, filename)
+            except OSError:
+                os.unlink(tmpname)
+                raise
+        else:
+            with open(filename, 'wb') as f:
+                f.write(data)
+
 
     def save_midifile(self, filename):
+        # the sysex event of the second track: 0xf0, its length and
+        # the message without 0xf0
+        size = len(self.dump_data(b'', b'\xf7'))
+        track_size = 1 + 1 + len(write_delta(size)) + size + 4
 
         midi_header = b'\x4d\x54\x68\x64\x00\x00\x00\x06\x00\x01\x00\x02\x01\xe0\x4d\x54' \
                         +  b'\x72\x6b\x00\x00\x00\x13\x00\xff\x58\x04\x04\x02\x18\x08\x00\xff' \
-                        +  b'\x51\x03\x07\xa1\x20\x00\xff\x2f\x00\x4d\x54\x72\x6b\x00\x00\x3b' \
-                        +  b'\x1a\x00\xf0\xf6\x12' 
+                        +  b'\x51\x03\x07\xa1\x20\x00\xff\x2f\x00\x4d\x54\x72\x6b' \
+                        +  track_size.to_bytes(4, 'big') \
+                        +  b'\x00\xf0' + write_delta(size)
         midi_end = b'\xf7\x00\xff\x2f\x00'
 
         self.save_file(filename, midi_header, midi_end)
@@ -221,3 +583,17 @@ class K4Dump(MidiFile):
 
     def save_sysexfile(self, filename):        
         self.save_file(filename, b'\xf0', b'\xf7')
+
+
+# read_zip
+#
+# yields (member, dump) for all dumps in a zip archive, the dumps are
+# read from the decompressed members without extracting them to disk
+def read_zip(filename, lazy=False):
+    with zipfile.ZipFile(filename) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(dump_extensions):
+                continue
+            with zf.open(info) as f:
+                dump = K4Dump(f, lazy=lazy)
+            yield info.filename, dump
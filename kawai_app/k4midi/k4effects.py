@@ -1,49 +1,29 @@
 # k4effects.py
 #
 # written by: Oliver Cordes 2023-04-10
-# changed by: Oliver Cordes 2023-05-06
+# changed by: Oliver Cordes 2026-10-18
 
-from k4midi.k4base import K4Base
+from k4midi.k4base import K4Base, Field
 
-class K4Effects(K4Base):
-    id = 0x14
-    size = 35
-
-    effect_type = property(*K4Base.func_template(00, mask=0b1111))
-    para1 = property(*K4Base.func_template(1, mask=0b111))
-    para2 = property(*K4Base.func_template(2, mask=0b111))
-    para3 = property(*K4Base.func_template(3, mask=0b11111))
-
-    pan_A = property(*K4Base.func_template(10, mask=0b11111, correct=-8))
-    send1_A = property(*K4Base.func_template(11, mask=0b1111111))
-    send2_A = property(*K4Base.func_template(12, mask=0b1111111))
-
-    pan_B = property(*K4Base.func_template(13, mask=0b11111, correct=-8))
-    send1_B = property(*K4Base.func_template(14, mask=0b1111111))
-    send2_B = property(*K4Base.func_template(15, mask=0b1111111))
 
-    pan_C = property(*K4Base.func_template(16, mask=0b11111, correct=-8))
-    send1_C = property(*K4Base.func_template(17, mask=0b1111111))
-    send2_C = property(*K4Base.func_template(18, mask=0b1111111))
+# pan and sends of the submix channel ch (A-H)
+def submix_fields(nr, ch):
+    ofs = 10 + nr*3
+    group = f'submix_{ch}'
+    return (Field(f'pan_{ch}', ofs, 0, 0b11111, -8, -7, 7, group),
+            Field(f'send1_{ch}', ofs+1, 0, 0b1111111, 0, 0, 100, group),
+            Field(f'send2_{ch}', ofs+2, 0, 0b1111111, 0, 0, 100, group))
 
-    pan_D = property(*K4Base.func_template(19, mask=0b11111, correct=-8))
-    send1_D = property(*K4Base.func_template(20, mask=0b1111111))
-    send2_D = property(*K4Base.func_template(21, mask=0b1111111))
 
-    pan_E = property(*K4Base.func_template(22, mask=0b11111, correct=-8))
-    send1_E = property(*K4Base.func_template(23, mask=0b1111111))
-    send2_E = property(*K4Base.func_template(24, mask=0b1111111))
-
-    pan_F = property(*K4Base.func_template(25, mask=0b11111, correct=-8))
-    send1_F = property(*K4Base.func_template(26, mask=0b1111111))
-    send2_F = property(*K4Base.func_template(27, mask=0b1111111))
-
-    pan_G = property(*K4Base.func_template(28, mask=0b11111, correct=-8))
-    send1_G = property(*K4Base.func_template(29, mask=0b1111111))
-    send2_G = property(*K4Base.func_template(30, mask=0b1111111))
-
-    pan_H = property(*K4Base.func_template(31, mask=0b11111, correct=-8))
-    send1_H = property(*K4Base.func_template(32, mask=0b1111111))
-    send2_H = property(*K4Base.func_template(33, mask=0b1111111))
+class K4Effects(K4Base):
+    __slots__ = ()
 
+    id = 0x14
+    size = 35
 
+    # name, ofs, shift, mask, correct, low, high, group
+    fields = (Field('effect_type', 0, 0, 0b1111, 0, 0, 15, 'effect'),
+              Field('para1', 1, 0, 0b111, 0, 0, 7, 'effect'),
+              Field('para2', 2, 0, 0b111, 0, 0, 7, 'effect'),
+              Field('para3', 3, 0, 0b11111, 0, 0, 31, 'effect')) \
+             + sum((submix_fields(nr, ch) for nr, ch in enumerate('ABCDEFGH')), ())
@@ -0,0 +1,298 @@
+# k4emulator.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import os
+import threading
+import time
+
+import mido
+
+from k4midi.k4base import checksum
+from k4midi.k4dump import all_data_entries, all_data_patches, all_data_size, \
+                          dump_layout, layout_patches
+from k4midi.k4io import sysex_message, wire_time, dump_functions, all_data_request, \
+                        parameter_send, one_data_dump, block_data_dump, all_data_dump, \
+                        write_complete, write_error, write_error_no_card
+from k4midi.k4param import single_params, mute_fields
+from k4midi.k4single import K4SingleInstrument
+from k4midi.k4sysex import kawai_id, k4_id, header_size
+
+_debug = False
+
+
+# (parameter number, source) -> fields
+_param_fields = {}
+for name, key in single_params.items():
+    _param_fields.setdefault(key, []).append(name)
+
+
+# bank_range
+#
+# the offset and size of the patches of a one data or block data
+# dump in the data block of an all data dump, None for unknown dumps
+def bank_range(function, sub_status1, sub_status2):
+    layout = dump_layout(function, sub_status1, sub_status2)
+    if layout is None:
+        return None
+    layout, nr = layout
+    patches, size = layout_patches(layout)
+    return all_data_entries[layout[0][0]][nr][3], size
+
+
+# check_bank
+#
+# the bank is sent in sysex messages, a byte above 127 (e.g. the 0xf7
+# of a truncated dump in place of the last checksum) cannot be sent
+def check_bank(bank):
+    if len(bank) != all_data_size:
+        raise ValueError(f'Wrong size of the bank ({len(bank)} != {all_data_size})')
+    for ofs, b in enumerate(bank):
+        if b > 127:
+            for key, nr, cls, pofs, name in all_data_patches:
+                if pofs <= ofs < pofs + cls.size:
+                    break
+            raise ValueError(f'Invalid byte 0x{b:x} at offset {ofs} ({name}), '
+                             'the checksums can be repaired with update_checksums()')
+
+
+# K4Emulator
+#
+# a K4 in memory, it answers the dump requests with the data of its
+# bank, stores received dumps and applies parameter changes to the
+# edit buffer, which holds the single instrument selected by the last
+# program change. The cartridge is not emulated. The bank of the seed
+# dump must be valid sysex data, i.e. no byte above 127
+#
+#   k4 = K4Emulator(dump)
+#   transport = K4Transport(k4.port())
+class K4Emulator(object):
+    def __init__(self, dump=None, channel=0):
+        self._channel = channel
+        if dump is None:
+            self._bank = bytearray(all_data_size)
+            for key, nr, cls, ofs, name in all_data_patches:
+                self._bank[ofs+cls.size-1] = checksum(self._bank[ofs:ofs+cls.size])
+        else:
+            self._bank = bytearray(dump.bank)
+            check_bank(self._bank)
+        self._lock = threading.Lock()
+        self.select(0)
+
+        self.requests = 0
+        self.dumps = 0
+        self.parameters = 0
+
+
+    @property
+    def bank(self):
+        return self._bank
+
+
+    @property
+    def edit(self):
+        return self._edit
+
+
+    # select
+    #
+    # copies single instrument nr into the edit buffer
+    def select(self, nr):
+        entry = all_data_entries['single_instruments'][nr]
+        ofs = entry[3]
+        self._program = nr
+        self._edit = K4SingleInstrument(self._bank[ofs:ofs+entry[2].size])
+
+
+    def reply(self, function, sub_status1=0, sub_status2=0, data=b''):
+        return [sysex_message(self._channel, function, sub_status1, sub_status2, data)]
+
+
+    # handle
+    #
+    # handles a complete sysex message (with 0xf0 and 0xf7), returns
+    # the list of messages sent back
+    def handle(self, msg):
+        data = msg[1:-1]
+        if (len(data) < header_size or data[0] != kawai_id or data[4] != k4_id
+                or data[1] != self._channel):
+            return []
+
+        function, sub_status1, sub_status2 = data[2], data[5], data[6]
+        data = data[header_size:]
+
+        with self._lock:
+            if function in dump_functions:
+                self.requests += 1
+                return self.request(function, sub_status1, sub_status2)
+            elif function in (one_data_dump, block_data_dump, all_data_dump):
+                self.dumps += 1
+                return self.store(function, sub_status1, sub_status2, data)
+            elif function == parameter_send:
+                self.parameters += 1
+                self.parameter(sub_status1, sub_status2, data)
+
+        return []
+
+
+    def request(self, function, sub_status1, sub_status2):
+        if sub_status1 & 2:
+            return self.reply(write_error_no_card, sub_status1, sub_status2)
+
+        if function == all_data_request:
+            return self.reply(all_data_dump, sub_status1, sub_status2, self._bank)
+
+        dump = dump_functions[function]
+        r = bank_range(dump, sub_status1, sub_status2)
+        if r is None:
+            return []
+        ofs, size = r
+        return self.reply(dump, sub_status1, sub_status2, self._bank[ofs:ofs+size])
+
+
+    # store
+    #
+    # stores a dump, the checksums of all patches must be correct
+    def store(self, function, sub_status1, sub_status2, data):
+        if sub_status1 & 2:
+            return self.reply(write_error_no_card, sub_status1, sub_status2)
+
+        if function == all_data_dump:
+            ofs, size = 0, all_data_size
+        else:
+            r = bank_range(function, sub_status1, sub_status2)
+            if r is None:
+                return self.reply(write_error, sub_status1, sub_status2)
+            ofs, size = r
+
+        data = bytes(data)
+        if len(data) != size:
+            return self.reply(write_error, sub_status1, sub_status2)
+        for key, nr, cls, pofs, name in all_data_patches:
+            if ofs <= pofs < ofs + size:
+                patch = data[pofs-ofs:pofs-ofs+cls.size]
+                if checksum(patch) != patch[-1]:
+                    return self.reply(write_error, sub_status1, sub_status2)
+
+        self._bank[ofs:ofs+size] = data
+        self.select(self._program)
+        return self.reply(write_complete, sub_status1, sub_status2)
+
+
+    # parameter
+    #
+    # applies a parameter change to the edit buffer
+    def parameter(self, number, sub_status2, data):
+        if len(data) < 1:
+            return
+        fields = _param_fields.get((number, sub_status2 >> 1))
+        if fields is None:
+            if _debug:
+                print(f'unknown parameter {number} {sub_status2:x}')
+            return
+
+        value = ((sub_status2 & 1) << 7) | data[0]
+        ins = self._edit
+        with ins.batch():
+            if fields[0] in mute_fields:
+                for nr, name in enumerate(mute_fields):
+                    setattr(ins, name, (value >> nr) & 1)
+            else:
+                for name in fields:
+                    setattr(ins, name, value + ins.field_map[name].correct)
+
+
+    # handle_message
+    #
+    # handles a mido message, returns the mido messages sent back
+    def handle_message(self, msg):
+        if msg.type == 'program_change' and msg.channel == self._channel:
+            if msg.program < 64:
+                with self._lock:
+                    self.select(msg.program)
+            return []
+        if msg.type != 'sysex':
+            return []
+
+        return [mido.Message('sysex', data=reply[1:-1])
+                for reply in self.handle(b'\xf0' + bytes(msg.data) + b'\xf7')]
+
+
+    # port
+    #
+    # a mido port connected to the emulator, with wire set the answers
+    # arrive after the time they need on the MIDI cable
+    def port(self, wire=False):
+        return K4EmulatorPort(self, wire)
+
+
+    # serve_pipe
+    #
+    # answers the messages read from read_fd on write_fd in a thread
+    # until the end of the input, e.g. for a PipePort on the other side
+    def serve_pipe(self, read_fd, write_fd):
+        thread = threading.Thread(target=self._serve, args=(read_fd, write_fd),
+                                  name='K4Emulator', daemon=True)
+        thread.start()
+        return thread
+
+
+    # _serve
+    #
+    # a message which cannot be handled is reported and skipped, the
+    # thread ends with the input or when the output is closed
+    def _serve(self, read_fd, write_fd):
+        parser = mido.Parser()
+        while True:
+            try:
+                data = os.read(read_fd, 65536)
+            except OSError:
+                return
+            if not data:
+                return
+            parser.feed(data)
+            for msg in parser:
+                try:
+                    replies = self.handle_message(msg)
+                except Exception as e:
+                    print(f'K4Emulator: cannot handle {msg.type} message: {type(e).__name__}: {e}')
+                    continue
+                try:
+                    for reply in replies:
+                        out = reply.bin()
+                        while out:
+                            out = out[os.write(write_fd, out):]
+                except OSError as e:
+                    print(f'K4Emulator: cannot send the answer: {e}')
+                    return
+
+
+# K4EmulatorPort
+#
+# mido port of the emulator, the answers are received after the
+# transfer time of the request and the answer if wire is set
+class K4EmulatorPort(mido.ports.BaseIOPort):
+    def __init__(self, emulator, wire=False, name='K4 emulator'):
+        self._emulator = emulator
+        self._wire = wire
+        self._delayed = []      # (time, message)
+        mido.ports.BaseIOPort.__init__(self, name)
+
+
+    def _send(self, msg):
+        replies = self._emulator.handle_message(msg)
+        if not self._wire:
+            self._messages.extend(replies)
+            return
+
+        due = time.monotonic() + wire_time(len(msg.bin()))
+        for reply in replies:
+            due += wire_time(len(reply.bin()))
+            self._delayed.append((due, reply))
+
+
+    def _receive(self, block=True):
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._messages.append(self._delayed.pop(0)[1])
@@ -0,0 +1,248 @@
+# k4io.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import os
+import threading
+import time
+
+import mido
+
+from k4midi.k4dump import K4Dump, all_data_size, dump_layout, layout_patches
+from k4midi.k4sysex import kawai_id, k4_id, header_size
+
+_debug = False
+
+
+# function codes of the K4 sysex messages
+one_data_request = 0x00
+block_data_request = 0x01
+all_data_request = 0x02
+parameter_send = 0x10
+one_data_dump = 0x20
+block_data_dump = 0x21
+all_data_dump = 0x22
+write_complete = 0x40
+write_error = 0x41
+write_error_protect = 0x42
+write_error_no_card = 0x43
+
+# the answer to a request
+dump_functions = {one_data_request: one_data_dump,
+                  block_data_request: block_data_dump,
+                  all_data_request: all_data_dump}
+
+# bits per byte on the wire (start, 8 data, stop) and the baud rate
+wire_bits = 10
+wire_baud = 31250
+
+
+# wire_time
+#
+# the time to transfer nbytes over a MIDI cable
+def wire_time(nbytes):
+    return nbytes * wire_bits / wire_baud
+
+
+# sysex_message
+#
+# a complete K4 sysex message including 0xf0 and 0xf7
+def sysex_message(channel, function, sub_status1=0, sub_status2=0, data=b''):
+    return bytes((0xf0, kawai_id, channel & 0x0f, function, 0x00, k4_id,
+                  sub_status1, sub_status2)) + bytes(data) + b'\xf7'
+
+
+# mido_message
+#
+# the mido message of a complete sysex message
+def mido_message(data):
+    return mido.Message('sysex', data=data[1:-1])
+
+
+# sub status of the requests for the kinds of patches, one data requests
+# add the patch number to sub status 2, bit 1 of sub status 1 selects
+# the cartridge
+_request_status = {'single_instruments': (0, 0x00),
+                   'multi_instruments': (0, 0x40),
+                   'effects': (1, 0x00),
+                   'drums': (1, 0x20)}
+
+
+def request_status(key, cartridge=False):
+    if key not in _request_status:
+        raise ValueError(f'Cannot request {key}')
+    sub_status1, sub_status2 = _request_status[key]
+    if cartridge:
+        sub_status1 |= 2
+    return sub_status1, sub_status2
+
+
+def request_all(channel=0, cartridge=False):
+    return sysex_message(channel, all_data_request, 2 if cartridge else 0, 0)
+
+
+def request_block(key, channel=0, cartridge=False):
+    return sysex_message(channel, block_data_request, *request_status(key, cartridge))
+
+
+def request_patch(key, nr, channel=0, cartridge=False):
+    sub_status1, sub_status2 = request_status(key, cartridge)
+    if key == 'drums':
+        nr = 0
+    count = {'single_instruments': 64, 'multi_instruments': 64, 'effects': 32, 'drums': 1}[key]
+    if not (0 <= nr < count):
+        raise ValueError(f'Invalid patch number {nr} for {key}')
+    return sysex_message(channel, one_data_request, sub_status1, sub_status2 + nr)
+
+
+# reply_size
+#
+# the expected size of the answer to a request message
+def reply_size(request):
+    function = dump_functions[request[3]]
+    if function == all_data_dump:
+        size = all_data_size
+    else:
+        layout, nr = dump_layout(function, request[6], request[7])
+        patches, size = layout_patches(layout)
+    return size + header_size + 2
+
+
+# FakePort
+#
+# a mido port without a MIDI device, all sent messages are given to
+# respond, which returns the messages to be received, without respond
+# the port is a loopback, every sent message is received again
+class FakePort(mido.ports.BaseIOPort):
+    def __init__(self, respond=None, name='fake'):
+        self._respond = respond
+        mido.ports.BaseIOPort.__init__(self, name)
+
+
+    def _send(self, msg):
+        if self._respond is None:
+            self._messages.append(msg)
+        else:
+            for reply in self._respond(msg):
+                self._messages.append(reply)
+
+
+# PipePort
+#
+# a mido port on a pair of file descriptors (an OS pipe, a socket or a
+# serial device), a thread reads the bytes and parses the messages
+class PipePort(mido.ports.BaseIOPort):
+    def __init__(self, read_fd, write_fd, name='pipe'):
+        self._read_fd = read_fd
+        self._write_fd = write_fd
+        mido.ports.BaseIOPort.__init__(self, name)
+
+        self._reader = threading.Thread(target=self._read, name='PipePort', daemon=True)
+        self._reader.start()
+
+
+    def _read(self):
+        while True:
+            try:
+                data = os.read(self._read_fd, 65536)
+            except OSError:
+                return
+            if not data:
+                return
+            with self._lock:
+                self._parser.feed(data)
+
+
+    def _send(self, msg):
+        data = msg.bin()
+        while data:
+            n = os.write(self._write_fd, data)
+            data = data[n:]
+
+
+# K4Transport
+#
+# requests dumps from a K4 with mido ports, input can be omitted for
+# an IO port, the answer of a request must arrive within the time for
+# the transfer plus timeout, otherwise the request is repeated
+#
+#   with mido.open_ioport('K4') as port:
+#       dump = K4Transport(port).fetch_all()
+class K4Transport(object):
+    def __init__(self, output, input=None, channel=0, timeout=2., retries=2):
+        self._output = output
+        self._input = output if input is None else input
+        self._channel = channel
+        self._timeout = timeout
+        self._retries = retries
+
+
+    @property
+    def channel(self):
+        return self._channel
+
+
+    # send
+    #
+    # sends a complete sysex message (with 0xf0 and 0xf7)
+    def send(self, data):
+        self._output.send(mido_message(data))
+
+
+    # receive
+    #
+    # waits for a K4 message of the channel with the function code
+    # until timeout, returns the message without 0xf0 and 0xf7 or None,
+    # all other messages are dropped
+    def receive(self, function, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            msg = self._input.poll()
+            if msg is None:
+                if time.monotonic() > deadline:
+                    return None
+                time.sleep(0.001)
+                continue
+
+            if msg.type != 'sysex':
+                continue
+            data = msg.data
+            if (len(data) >= header_size and data[0] == kawai_id and data[4] == k4_id
+                    and data[1] == self._channel and data[2] == function):
+                return bytes(data)
+            if _debug:
+                print(f'dropped message {msg}')
+
+
+    # request
+    #
+    # sends a request message and returns the answer as a K4Dump
+    def request(self, data):
+        function = dump_functions[data[3]]
+        timeout = wire_time(reply_size(data)) + self._timeout
+
+        for attempt in range(self._retries + 1):
+            # forget old messages
+            for msg in self._input.iter_pending():
+                pass
+
+            self.send(data)
+            answer = self.receive(function, timeout)
+            if answer is not None:
+                return K4Dump(b'\xf0' + answer + b'\xf7')
+            print(f'No answer from the K4 (attempt {attempt+1} of {self._retries+1})!')
+
+        raise TimeoutError('No answer from the K4')
+
+
+    def fetch_all(self, cartridge=False):
+        return self.request(request_all(self._channel, cartridge))
+
+
+    def fetch_block(self, key, cartridge=False):
+        return self.request(request_block(key, self._channel, cartridge))
+
+
+    def fetch_patch(self, key, nr, cartridge=False):
+        return self.request(request_patch(key, nr, self._channel, cartridge))
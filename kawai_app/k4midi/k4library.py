@@ -0,0 +1,273 @@
+# k4library.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+
+from k4midi.k4dump import K4Dump, all_data_entries
+from k4midi.k4bank import patch_vectors, nearest
+from k4midi.k4single import K4SingleInstrument
+from k4midi.k4multi import K4MultiInstrument
+from k4midi.k4effects import K4Effects
+
+_debug = False
+
+
+# the kinds of patches in the library
+library_classes = {'single_instruments': K4SingleInstrument,
+                   'multi_instruments': K4MultiInstrument,
+                   'effects': K4Effects}
+
+# the parameters which are indexed for each kind
+key_fields = {'single_instruments': ('volume', 'effect', 'source_mode', 'poly_mode',
+                                     's1_wave_select', 's2_wave_select',
+                                     's3_wave_select', 's4_wave_select'),
+              'multi_instruments': ('volume', 'effect'),
+              'effects': ('effect_type',)}
+
+
+schema = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    hash BLOB
+);
+CREATE TABLE IF NOT EXISTS patches (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    name TEXT,
+    data BLOB NOT NULL,
+    UNIQUE (kind, hash)
+);
+CREATE TABLE IF NOT EXISTS locations (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    patch_id INTEGER NOT NULL REFERENCES patches(id),
+    kind TEXT NOT NULL,
+    nr INTEGER NOT NULL,
+    PRIMARY KEY (file_id, kind, nr)
+);
+CREATE TABLE IF NOT EXISTS params (
+    patch_id INTEGER NOT NULL REFERENCES patches(id),
+    field TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (patch_id, field)
+);
+CREATE INDEX IF NOT EXISTS patches_name ON patches (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS locations_patch ON locations (patch_id);
+CREATE INDEX IF NOT EXISTS params_value ON params (field, value);
+'''
+
+
+# patch_hash
+#
+# the hash of the patch data without the checksum, the same patch
+# with a broken checksum is still the same patch
+def patch_hash(data):
+    return hashlib.sha1(bytes(data[:-1])).digest()
+
+
+# like_pattern
+#
+# converts a shell pattern (BRASS*) into a LIKE pattern
+def like_pattern(pattern):
+    pattern = pattern.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return pattern.replace('*', '%').replace('?', '_')
+
+
+# K4Library
+#
+# a library of single instruments, multi instruments and effects
+# collected from any number of dumps, identical patches are stored
+# once, for each patch the files and the positions in the banks
+# are known
+#
+#   with K4Library('library.db') as lib:
+#       lib.import_file('k4.mid')
+#       for row in lib.find_name('BRASS*'):
+#           print(row['name'], lib.files_with_patch(row['id']))
+class K4Library(object):
+    def __init__(self, filename=':memory:'):
+        self._db = sqlite3.connect(filename)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA foreign_keys = ON')
+        self._db.executescript(schema)
+
+        self._vectors = {}      # kind -> (ids, vectors) for similar()
+
+
+    def close(self):
+        self._db.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    @property
+    def db(self):
+        return self._db
+
+
+    # add_patch
+    #
+    # stores the patch if it is not in the library, returns its id
+    def add_patch(self, kind, data):
+        data = bytes(data)
+        h = patch_hash(data)
+        row = self._db.execute('SELECT id FROM patches WHERE kind = ? AND hash = ?',
+                               (kind, h)).fetchone()
+        if row is not None:
+            return row['id']
+
+        patch = library_classes[kind](data)
+        name = patch.name if kind != 'effects' else None
+        cur = self._db.execute('INSERT INTO patches (kind, hash, name, data) VALUES (?, ?, ?, ?)',
+                               (kind, h, name, data))
+        patch_id = cur.lastrowid
+
+        values = patch.to_dict()
+        self._db.executemany('INSERT INTO params (patch_id, field, value) VALUES (?, ?, ?)',
+                             [(patch_id, field, values[field]) for field in key_fields[kind]])
+        return patch_id
+
+
+    # import_dump
+    #
+    # imports all patches of an all data dump, path is the name of the
+    # file in the library, a file which is imported again replaces the
+    # old content, returns the number of new patches
+    def import_dump(self, dump, path):
+        if dump.bank is None:
+            raise ValueError(f'{path} contains no K4 all data dump')
+
+        bank = dump.bank
+        with self._db:
+            count = self._db.execute('SELECT count(*) FROM patches').fetchone()[0]
+
+            self._db.execute('DELETE FROM files WHERE path = ?', (path,))
+            cur = self._db.execute('INSERT INTO files (path, hash) VALUES (?, ?)',
+                                   (path, hashlib.sha1(bank).digest()))
+            file_id = cur.lastrowid
+
+            for kind in library_classes:
+                for key, nr, cls, ofs, name in all_data_entries[kind]:
+                    patch_id = self.add_patch(kind, bank[ofs:ofs+cls.size])
+                    self._db.execute('INSERT INTO locations (file_id, patch_id, kind, nr) VALUES (?, ?, ?, ?)',
+                                     (file_id, patch_id, kind, nr))
+
+            new = self._db.execute('SELECT count(*) FROM patches').fetchone()[0] - count
+            if new:
+                self._vectors.clear()
+
+        if _debug:
+            print(f'{path}: {new} new patches')
+        return new
+
+
+    def import_file(self, filename, cache=None):
+        dump = K4Dump(filename, lazy=True, cache=cache)
+        return self.import_dump(dump, os.path.abspath(filename))
+
+
+    # find_name
+    #
+    # all patches with a name matching the shell pattern, the case
+    # is ignored
+    def find_name(self, pattern, kind=None):
+        sql = "SELECT id, kind, name FROM patches WHERE name LIKE ? ESCAPE '\\'"
+        args = [like_pattern(pattern)]
+        if kind is not None:
+            sql += ' AND kind = ?'
+            args.append(kind)
+        return self._db.execute(sql + ' ORDER BY name', args).fetchall()
+
+
+    # find_param
+    #
+    # all patches with a value of an indexed parameter in low..high
+    def find_param(self, field, low, high=None):
+        if high is None:
+            high = low
+        return self._db.execute('SELECT p.id, p.kind, p.name, v.value FROM params v '
+                                'JOIN patches p ON p.id = v.patch_id '
+                                'WHERE v.field = ? AND v.value BETWEEN ? AND ? ORDER BY p.id',
+                                (field, low, high)).fetchall()
+
+
+    # find_patch
+    #
+    # the id of a patch given by its data or None
+    def find_patch(self, kind, data):
+        row = self._db.execute('SELECT id FROM patches WHERE kind = ? AND hash = ?',
+                               (kind, patch_hash(data))).fetchone()
+        return None if row is None else row['id']
+
+
+    # files_with_patch
+    #
+    # all files (and positions, starting with 0) containing the patch
+    def files_with_patch(self, patch_id):
+        return self._db.execute('SELECT f.path, l.kind, l.nr FROM locations l '
+                                'JOIN files f ON f.id = l.file_id '
+                                'WHERE l.patch_id = ? ORDER BY f.path, l.nr',
+                                (patch_id,)).fetchall()
+
+
+    # patch
+    #
+    # creates the patch object of a patch in the library
+    def patch(self, patch_id):
+        row = self._db.execute('SELECT kind, data FROM patches WHERE id = ?',
+                               (patch_id,)).fetchone()
+        if row is None:
+            raise ValueError(f'No patch with id {patch_id}')
+        return library_classes[row['kind']](row['data'])
+
+
+    # vectors
+    #
+    # the ids and the normalised parameter vectors of all patches of
+    # a kind, calculated once
+    def vectors(self, kind='single_instruments'):
+        if kind not in self._vectors:
+            rows = self._db.execute('SELECT id, data FROM patches WHERE kind = ? ORDER BY id',
+                                    (kind,)).fetchall()
+            cls = library_classes[kind]
+            ids = np.array([row['id'] for row in rows], dtype=np.int64)
+            patches = np.frombuffer(b''.join(row['data'] for row in rows),
+                                    dtype=np.uint8).reshape(len(rows), cls.size)
+            self._vectors[kind] = (ids, patch_vectors(patches, cls))
+        return self._vectors[kind]
+
+
+    # similar
+    #
+    # the k patches which are most similar to the patch, returns a list
+    # of (id, name, distance), the patch itself is not part of the list
+    def similar(self, patch_id, k=10):
+        row = self._db.execute('SELECT kind FROM patches WHERE id = ?', (patch_id,)).fetchone()
+        if row is None:
+            raise ValueError(f'No patch with id {patch_id}')
+
+        ids, vectors = self.vectors(row['kind'])
+        query = vectors[np.searchsorted(ids, patch_id)]
+        idx, dist = nearest(vectors, query, k+1)
+
+        results = []
+        for i, d in zip(idx, dist):
+            other = int(ids[i])
+            if other != patch_id:
+                name = self._db.execute('SELECT name FROM patches WHERE id = ?',
+                                        (other,)).fetchone()['name']
+                results.append((other, name, float(d)))
+        return results[:k]
@@ -1,64 +1,102 @@
 # k4multi.py
 #
 # written by: Oliver Cordes 2023-04-10
-# changed by: Oliver Cordes 2024-02-13
+# changed by: Oliver Cordes 2026-10-18
 
-from k4midi.k4base import K4Base, K4BaseSection
+from k4midi.k4base import K4Base, K4BaseSection, Field, decode_name, encode_name
 
 
 class K4MultiInstrumentSection(K4BaseSection):
-    single = property(*K4BaseSection.func_template(0))
-    zone_low = property(*K4BaseSection.func_template(1))
-    zone_high = property(*K4BaseSection.func_template(2))
-    rec_chan = property(
-        *K4BaseSection.func_template(3, correct=1, mask=0b1111))
-    vel_sw = property(*K4BaseSection.func_template(3, shift=4, mask=0b11))
-    mute = property(*K4BaseSection.func_template(3, shift=6, mask=0b1))
-    out_sel = property(*K4BaseSection.func_template(4, mask=0b111))
-    mode = property(*K4BaseSection.func_template(4, shift=3, mask=0b11))
-    level = property(*K4BaseSection.func_template(5))
-    transpose = property(*K4BaseSection.func_template(6, correct=-24))
-    tune = property(*K4BaseSection.func_template(7, correct=-50))
+    __slots__ = ()
+
+    # name, ofs, shift, mask, correct, low, high, group
+    fields = (Field('single', 0, 0, 255, 0, 0, 63, 'section'),
+              Field('zone_low', 1, 0, 255, 0, 0, 127, 'section'),
+              Field('zone_high', 2, 0, 255, 0, 0, 127, 'section'),
+              Field('rec_chan', 3, 0, 0b1111, 1, 1, 16, 'section'),
+              Field('vel_sw', 3, 4, 0b11, 0, 0, 2, 'section'),
+              Field('mute', 3, 6, 0b1, 0, 0, 1, 'section'),
+              Field('out_sel', 4, 0, 0b111, 0, 0, 7, 'section'),
+              Field('mode', 4, 3, 0b11, 0, 0, 2, 'section'),
+              Field('level', 5, 0, 255, 0, 0, 100, 'section'),
+              Field('transpose', 6, 0, 255, -24, -24, 24, 'section'),
+              Field('tune', 7, 0, 255, -50, -50, 50, 'section'))
 
     def __len__(self):
         return 8
 
 
 class K4MultiInstrument(K4Base):
+    __slots__ = ('_sections',)
+
     id = 0x11
     size = 77
 
+    # name, ofs, shift, mask, correct, low, high, group, the fields of
+    # the sections are defined in K4MultiInstrumentSection
+    fields = (Field('volume', 10, 0, 255, 0, 0, 100, 'common'),
+              Field('effect', 11, 0, 255, 1, 1, 32, 'common'))
+
+    # the sections are at 12, 20, ..., 68
+    section_class = K4MultiInstrumentSection
+    section_ofs = 12
+    section_size = 8
+    section_count = 8
+
     def __init__(self, data):
         super().__init__(data)  
 
-        self.sections = [K4MultiInstrumentSection(self._data, ofs=12),
-                         K4MultiInstrumentSection(self._data, ofs=20),
-                         K4MultiInstrumentSection(self._data, ofs=28),
-                         K4MultiInstrumentSection(self._data, ofs=36),
-                         K4MultiInstrumentSection(self._data, ofs=44),
-                         K4MultiInstrumentSection(self._data, ofs=52),
-                         K4MultiInstrumentSection(self._data, ofs=60),
-                         K4MultiInstrumentSection(self._data, ofs=68)]
+        self._sections = None
+
+
+    # sections
+    #
+    # the section objects are only views into the data block, they are
+    # created with the first access and kept afterwards
+    @property
+    def sections(self):
+        if self._sections is None:
+            self._sections = tuple(self.section_class(self._data,
+                                                      ofs=self.section_ofs+nr*self.section_size,
+                                                      parent=self,
+                                                      name=f'sections[{nr}]')
+                                   for nr in range(self.section_count))
+        return self._sections
 
 
     def update_data(self):
-        for s in self.sections:
-            s.update_data(self._data)
+        if self._sections is not None:
+            for s in self._sections:
+                s.update_data(self._data)
 
     @property
     def name(self):
-        return self._data[0:10].decode('utf8').strip()
+        return decode_name(self._data)
 
     @name.setter
     def name(self, val):
-        while len(val) < 10:
-            val = val + ' '
-        self._data[0:10] = bytearray(val, 'utf8')
-
-    # easy template definitions
-    volume      = property(*K4Base.func_template(10))
-    effect      = property(*K4Base.func_template(11, correct=1))
-    
+        self.write_bytes(0, encode_name(val))
+        self.changed('name')
+
+
+    # to_dict, from_dict
+    #
+    # the values of the sections are in the list 'sections'
+    def to_dict(self):
+        values = super().to_dict()
+        values['name'] = self.name
+        values['sections'] = [s.to_dict() for s in self.sections]
+        return values
+
+
+    def from_dict(self, values):
+        with self.batch():
+            if 'name' in values:
+                self.name = values['name']
+            super().from_dict(values)
+            for s, v in zip(self.sections, values.get('sections', [])):
+                s.from_dict(v)
+
     # section 1
     # the section defintions are moved into a subclass
 
@@ -0,0 +1,203 @@
+# k4param.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import threading
+import time
+
+from k4midi.k4io import sysex_message, parameter_send, wire_time
+
+_debug = False
+
+
+# the parameter numbers of the single instrument, the number is the
+# position in the lists, source parameters are sent with the number
+# of the source (0-3), the DCF/LFO parameters with 0-1
+
+common_params = ['volume', 'effect', 'out_select', 'source_mode', 'poly_mode',
+                 'am12', 'am34', 'mute', 'vib_shape', 'pitch_bend', 'wheel_assign',
+                 'vib_speed', 'wheel_dep', 'auto_bend_time', 'auto_bend_depth',
+                 'auto_bend_ks_time', 'auto_bend_vel_dep', 'vib_prs_vib', 'vibrato_dep',
+                 'lfo_shape', 'lfo_speed', 'lfo_delay', 'lfo_dep', 'lfo_prs_dep',
+                 'pres_freq']
+
+source_params = ['delay', 'wave_select', 'ks_curve', 'coarse', 'key_track', 'fix',
+                 'fine', 'prs_freq', 'vib_bend', 'vel_curve']
+
+dca_params = ['envelope_level', 'envelope_attack', 'envelope_decay',
+              'envelope_sustain', 'envelope_release', 'level_mod_vel',
+              'level_mod_prs', 'level_mod_ks', 'time_mod_on_vel',
+              'time_mod_off_vel', 'time_mod_ks']
+
+dcf_params = ['lfo{}_cutoff', 'lfo{}_resonance', 'lfo{}_switch', 'lfo{}_cutoff_mod_vel',
+              'lfo{}_cutoff_mod_prs', 'lfo{}_cutoff_mod_ks', 'dcf{}_env_dep',
+              'dcf{}_env_vel_dep', 'dcf{}_env_attack', 'dcf{}_env_decay',
+              'dcf{}_env_sustain', 'dcf{}_env_release', 'dcf{}_time_mod_on_vel',
+              'dcf{}_time_mod_off_vel', 'dcf{}_time_mod_ks']
+
+# the mutes of the four sources are sent as one parameter
+mute_fields = ('mute_s1', 'mute_s2', 'mute_s3', 'mute_s4')
+
+
+def make_single_params():
+    params = {}
+    for number, name in enumerate(common_params):
+        if name == 'mute':
+            for field in mute_fields:
+                params[field] = (number, 0)
+        else:
+            params[name] = (number, 0)
+
+    number = len(common_params)
+    for nr, name in enumerate(source_params + dca_params):
+        for source in range(4):
+            params[f's{source+1}_{name}'] = (number+nr, source)
+
+    number += len(source_params) + len(dca_params)
+    for nr, name in enumerate(dcf_params):
+        for source in range(2):
+            params[name.format(source+1)] = (number+nr, source)
+
+    return params
+
+
+# field name -> (parameter number, source)
+single_params = make_single_params()
+
+
+# parameter_value
+#
+# the value of a field as it is sent to the K4, i.e. without the
+# correction of the displayed value
+def parameter_value(patch, name):
+    if name in mute_fields:
+        return sum(getattr(patch, field) << nr for nr, field in enumerate(mute_fields))
+
+    field = patch.field_map[name]
+    return (getattr(patch, name) - field.correct) & 0xff
+
+
+# parameter_message
+#
+# the parameter send message, bit 7 of the value is sent in bit 0 of
+# sub status 2, the source in bits 1-2
+def parameter_message(channel, number, source, value):
+    return sysex_message(channel, parameter_send, number,
+                         (source << 1) | ((value >> 7) & 1),
+                         bytes((value & 0x7f,)))
+
+
+# K4ParameterSender
+#
+# sends parameter changes to the K4 in a background thread, send is
+# called with the complete sysex messages. Changes of the same parameter
+# within window seconds are sent once with the latest value, after each
+# message the sender waits until the message has passed the MIDI cable,
+# so there is never a queue of old values in front of the synth
+#
+#   sender = K4ParameterSender(K4Transport(port).send)
+#   ins.volume = 80
+#   sender.send_field(ins, 'volume')
+class K4ParameterSender(object):
+    def __init__(self, send, channel=0, window=0.02):
+        self._send = send
+        self._channel = channel
+        self._window = window
+
+        self._pending = {}          # (number, source) -> [message, time]
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.sent = 0
+        self.coalesced = 0
+
+        self._thread = threading.Thread(target=self._run, name='K4ParameterSender',
+                                        daemon=True)
+        self._thread.start()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    # send_field
+    #
+    # queues the current value of a field of a single instrument,
+    # returns False if the field cannot be sent
+    def send_field(self, patch, name):
+        if name not in single_params:
+            if _debug:
+                print(f'no parameter number for {name}')
+            return False
+
+        number, source = single_params[name]
+        self.send_parameter(number, source, parameter_value(patch, name))
+        return True
+
+
+    def send_parameter(self, number, source, value):
+        msg = parameter_message(self._channel, number, source, value)
+        key = (number, source)
+        with self._cond:
+            if self._closed:
+                raise ValueError('Sender is closed')
+            if key in self._pending:
+                self._pending[key][0] = msg
+                self.coalesced += 1
+            else:
+                self._pending[key] = [msg, time.monotonic()]
+                self._cond.notify_all()
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+
+                # the oldest parameter, wait for more changes
+                key = next(iter(self._pending))
+                msg, queued = self._pending[key]
+                delay = queued + self._window - time.monotonic()
+                if delay > 0 and not self._closed:
+                    self._cond.wait(delay)
+                    continue
+                del self._pending[key]
+                self._busy = True
+
+            try:
+                self._send(msg)
+                self.sent += 1
+                time.sleep(wire_time(len(msg)))
+            except Exception as e:
+                print(f'Cannot send parameter: {e}')
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+    # flush
+    #
+    # waits until all queued changes are sent
+    def flush(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+
+    # close
+    #
+    # sends the queued changes and stops the thread
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,192 @@
+# k4scan.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import contextlib
+import hashlib
+import io
+import os
+import time
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from k4midi.k4dump import K4Dump, all_data_patches, dump_extensions
+from k4midi.k4bank import verify_bank
+
+_debug = False
+
+
+def is_candidate(name):
+    return name.lower().endswith(dump_extensions)
+
+
+# candidate_files
+#
+# walks through the files and directories, yields (path, member) for
+# every dump file, member is the name inside of a zip archive or None
+def candidate_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield from candidate_files([os.path.join(root, name)])
+        elif path.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(path) as zf:
+                    members = [i.filename for i in zf.infolist()
+                               if not i.is_dir() and is_candidate(i.filename)]
+            except (OSError, zipfile.BadZipFile) as e:
+                print(f'Cannot read archive {path}: {e}')
+                continue
+            for member in members:
+                yield path, member
+        elif is_candidate(path):
+            yield path, None
+
+
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+# scan_dump
+#
+# the summary of a dump
+def scan_dump(dump):
+    results = dump.data
+    summary = {'format': 'mid' if dump._is_midi else 'syx',
+               'function': None}
+
+    # a MIDI file without K4 sysex has no results at all
+    if results is None:
+        return summary
+
+    summary['function'] = results.get('function')
+    if dump.bank is None:
+        return summary
+
+    bad = verify_bank(dump.bank)
+    summary['bad_checksums'] = {key: [int(nr)+1 for nr in mask.nonzero()[0]]
+                                for key, mask in bad.items() if mask.any()}
+    summary['single_names'] = dump.names('single_instruments')
+    summary['multi_names'] = dump.names('multi_instruments')
+    summary['hash'] = hash_bytes(dump.bank)
+    summary['patch_hashes'] = [hash_bytes(dump.bank[ofs:ofs+cls.size])
+                               for key, nr, cls, ofs, name in all_data_patches]
+
+    return summary
+
+
+# scan_file
+#
+# reads one dump and returns its summary, runs in the worker processes,
+# errors are reported in the summary. The data of a zip member can be
+# given, otherwise it is read from the archive
+def scan_file(path, member=None, data=None):
+    summary = {'path': path, 'member': member, 'size': 0}
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if member is None:
+                summary['size'] = os.path.getsize(path)
+                dump = K4Dump(path, lazy=True)
+            else:
+                if data is None:
+                    with zipfile.ZipFile(path) as zf:
+                        data = zf.read(member)
+                summary['size'] = len(data)
+                dump = K4Dump(data, lazy=True)
+            summary.update(scan_dump(dump))
+    except Exception as e:
+        summary['error'] = f'{type(e).__name__}: {e}'
+
+    return summary
+
+
+# scan
+#
+# scans all dump files in paths with a pool of processes, yields the
+# summaries in the order the files are finished. The zip members are
+# decompressed here, each archive is opened only once. Only a limited
+# number of files is submitted at once, so the first results arrive
+# immediately
+def scan(paths, workers=None):
+    window = 4 * (workers or os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        zf = None
+        try:
+            for path, member in candidate_files(paths):
+                data = None
+                if member is not None:
+                    try:
+                        if zf is None or zf.filename != path:
+                            if zf is not None:
+                                zf.close()
+                            zf = zipfile.ZipFile(path)
+                        data = zf.read(member)
+                    except Exception:
+                        # the worker tries again and reports the error
+                        data = None
+
+                pending.add(pool.submit(scan_file, path, member, data))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+        finally:
+            if zf is not None:
+                zf.close()
+
+        for future in as_completed(pending):
+            yield future.result()
+
+
+# Throughput
+#
+# counts files and bytes of the summaries
+class Throughput(object):
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.files = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def add(self, summary):
+        self.files += 1
+        self.bytes += summary['size']
+        if 'error' in summary:
+            self.errors += 1
+
+    def __str__(self):
+        t = time.perf_counter() - self._start
+        rate = self.files / t if t > 0 else 0.
+        mb = self.bytes / 1e6
+        return (f'{self.files} files ({self.errors} errors), {mb:.1f} MB in {t:.2f}s: '
+                f'{rate:.1f} files/s, {mb/t if t > 0 else 0.:.1f} MB/s')
+
+
+# summary_line
+#
+# one line description of a summary
+def summary_line(summary):
+    name = summary['path']
+    if summary['member'] is not None:
+        name += ':' + summary['member']
+
+    if 'error' in summary:
+        return f'{name}: {summary["error"]}'
+
+    function = summary['function']
+    line = f'{name}: {summary["format"]}'
+    if function is None:
+        return line + ' no K4 data'
+    line += f' function=0x{function:02x}'
+    if 'hash' in summary:
+        bad = sum(len(v) for v in summary['bad_checksums'].values())
+        line += f' bad_checksums={bad} sha1={summary["hash"]}'
+
+    return line
@@ -1,238 +1,122 @@
 # k4single.py
 #
 # written by: Oliver Cordes 2023-02-01
-# changed by: Oliver Cordes 2023-05_06
+# changed by: Oliver Cordes 2026-10-18
+
+from k4midi.k4base import K4Base, Field, decode_name, encode_name
+
+
+# fields of a source, DCA and DCF/LFO, nr starts with 1
+
+def source_fields(nr):
+    i = nr - 1
+    group = f'source{nr}'
+    return (Field(f's{nr}_delay', 30+i, 0, 255, 0, 0, 100, group),
+            Field(f's{nr}_wave_select', 38+i, 0, 0b1111111, 0, 0, 255, group, high_ofs=34+i),
+            Field(f's{nr}_ks_curve', 34+i, 4, 0b111, 1, 1, 8, group),
+            Field(f's{nr}_coarse', 42+i, 0, 0b111111, -24, -24, 24, group),
+            Field(f's{nr}_key_track', 42+i, 6, 0b1, 0, 0, 1, group),
+            Field(f's{nr}_fix', 46+i, 0, 255, 0, 0, 127, group),
+            Field(f's{nr}_fine', 50+i, 0, 255, -50, -50, 50, group),
+            Field(f's{nr}_prs_freq', 54+i, 0, 0b1, 0, 0, 1, group),
+            Field(f's{nr}_vib_bend', 54+i, 1, 0b1, 0, 0, 1, group),
+            Field(f's{nr}_vel_curve', 54+i, 2, 0b111, 0, 0, 7, group))
+
+
+def dca_fields(nr):
+    i = nr - 1
+    group = f'dca{nr}'
+    return (Field(f's{nr}_envelope_level', 58+i, 0, 255, 0, 0, 100, group),
+            Field(f's{nr}_envelope_attack', 62+i, 0, 255, 0, 0, 100, group),
+            Field(f's{nr}_envelope_decay', 66+i, 0, 255, 0, 0, 100, group),
+            Field(f's{nr}_envelope_sustain', 70+i, 0, 255, 0, 0, 100, group),
+            Field(f's{nr}_envelope_release', 74+i, 0, 255, 0, 0, 100, group),
+            Field(f's{nr}_level_mod_vel', 78+i, 0, 255, -50, -50, 50, group),
+            Field(f's{nr}_level_mod_prs', 82+i, 0, 255, -50, -50, 50, group),
+            Field(f's{nr}_level_mod_ks', 86+i, 0, 255, -50, -50, 50, group),
+            Field(f's{nr}_time_mod_on_vel', 90+i, 0, 255, -50, -50, 50, group),
+            Field(f's{nr}_time_mod_off_vel', 94+i, 0, 255, -50, -50, 50, group),
+            Field(f's{nr}_time_mod_ks', 98+i, 0, 255, -50, -50, 50, group))
+
+
+def dcf_fields(nr):
+    i = nr - 1
+    group = f'dcf{nr}'
+    return (Field(f'lfo{nr}_cutoff', 102+i, 0, 255, 0, 0, 100, group),
+            Field(f'lfo{nr}_resonance', 104+i, 0, 0b111, 1, 1, 8, group),
+            Field(f'lfo{nr}_switch', 104+i, 3, 0b1, 0, 0, 1, group),
+            Field(f'lfo{nr}_cutoff_mod_vel', 106+i, 0, 255, -50, -50, 50, group),
+            Field(f'lfo{nr}_cutoff_mod_prs', 108+i, 0, 255, -50, -50, 50, group),
+            Field(f'lfo{nr}_cutoff_mod_ks', 110+i, 0, 255, -50, -50, 50, group),
+            Field(f'dcf{nr}_env_dep', 112+i, 0, 255, -50, -50, 50, group),
+            Field(f'dcf{nr}_env_vel_dep', 114+i, 0, 255, -50, -50, 50, group),
+            Field(f'dcf{nr}_env_attack', 116+i, 0, 255, 0, 0, 100, group),
+            Field(f'dcf{nr}_env_decay', 118+i, 0, 255, 0, 0, 100, group),
+            Field(f'dcf{nr}_env_sustain', 120+i, 0, 255, 0, 0, 100, group),
+            Field(f'dcf{nr}_env_release', 122+i, 0, 255, 0, 0, 100, group),
+            Field(f'dcf{nr}_time_mod_on_vel', 124+i, 0, 255, -50, -50, 50, group),
+            Field(f'dcf{nr}_time_mod_off_vel', 126+i, 0, 255, -50, -50, 50, group),
+            Field(f'dcf{nr}_time_mod_ks', 128+i, 0, 255, -50, -50, 50, group))
 
-from k4midi.k4base import K4Base
 
 class K4SingleInstrument(K4Base):
+    __slots__ = ()
+
     id = 0x10
     size = 131
-    
+
+    # name, ofs, shift, mask, correct, low, high, group
+    fields = (Field('volume', 10, 0, 255, 0, 0, 100, 'common'),
+              Field('effect', 11, 0, 255, 1, 1, 32, 'common'),
+              Field('out_select', 12, 0, 255, 0, 0, 7, 'common'),
+              Field('source_mode', 13, 0, 0b11, 0, 0, 2, 'common'),
+              Field('poly_mode', 13, 2, 0b11, 0, 0, 2, 'common'),
+              Field('am12', 13, 4, 0b1, 0, 0, 1, 'common'),
+              Field('am34', 13, 5, 0b1, 0, 0, 1, 'common'),
+              Field('mute_s1', 14, 0, 0b1, 0, 0, 1, 'common'),
+              Field('mute_s2', 14, 1, 0b1, 0, 0, 1, 'common'),
+              Field('mute_s3', 14, 2, 0b1, 0, 0, 1, 'common'),
+              Field('mute_s4', 14, 3, 0b1, 0, 0, 1, 'common'),
+              Field('vib_shape', 14, 4, 0b11, 0, 0, 3, 'common'),
+              Field('pitch_bend', 15, 0, 0b1111, 0, 0, 12, 'common'),
+              Field('wheel_assign', 15, 4, 0b11, 0, 0, 2, 'common'),
+              Field('vib_speed', 16, 0, 255, 0, 0, 100, 'common'),
+              Field('wheel_dep', 17, 0, 255, -50, -50, 50, 'common'),
+              Field('auto_bend_time', 18, 0, 255, 0, 0, 100, 'common'),
+              Field('auto_bend_depth', 19, 0, 255, -50, -50, 50, 'common'),
+              Field('auto_bend_ks_time', 20, 0, 255, -50, -50, 50, 'common'),
+              Field('auto_bend_vel_dep', 21, 0, 255, -50, -50, 50, 'common'),
+              Field('vib_prs_vib', 22, 0, 255, -50, -50, 50, 'common'),
+              Field('vibrato_dep', 23, 0, 255, -50, -50, 50, 'common'),
+              Field('lfo_shape', 24, 0, 0b11, 0, 0, 3, 'common'),
+              Field('lfo_speed', 25, 0, 255, 0, 0, 100, 'common'),
+              Field('lfo_delay', 26, 0, 255, 0, 0, 100, 'common'),
+              Field('lfo_dep', 27, 0, 255, -50, -50, 50, 'common'),
+              Field('lfo_prs_dep', 28, 0, 255, -50, -50, 50, 'common'),
+              Field('pres_freq', 29, 0, 255, -50, -50, 50, 'common')) \
+             + source_fields(1) + source_fields(2) + source_fields(3) + source_fields(4) \
+             + dca_fields(1) + dca_fields(2) + dca_fields(3) + dca_fields(4) \
+             + dcf_fields(1) + dcf_fields(2)
+
 
     @property
     def name(self):
-        return self._data[0:10].decode('utf8').strip()
+        return decode_name(self._data)
 
     @name.setter
     def name(self, val):
-        while len(val) < 10: val = val + ' '
-        self._data[0:10] = bytearray(val, 'utf8')
-        self.update_checksum()
-
-    # easy template definitions
-    volume      = property(*K4Base.func_template(10))
-    effect      = property(*K4Base.func_template(11,correct=1))
-    out_select  = property(*K4Base.func_template(12))
-    source_mode = property(*K4Base.func_template(13, mask=0b11))
-    poly_mode = property(*K4Base.func_template(13, shift=2, mask=0b11))
-    am12 = property(*K4Base.func_template(13, shift=4, mask=0b1))
-    am34 = property(*K4Base.func_template(13, shift=5, mask=0b1))
-    mute_s1 = property(*K4Base.func_template(14, shift=0, mask=0b1))
-    mute_s2 = property(*K4Base.func_template(14, shift=1, mask=0b1))
-    mute_s3 = property(*K4Base.func_template(14, shift=2, mask=0b1))
-    mute_s4 = property(*K4Base.func_template(14, shift=3, mask=0b1))
-    vib_shape = property(*K4Base.func_template(14, shift=4, mask=0b11))
-    pitch_bend = property(*K4Base.func_template(15, shift=0, mask=0b1111))
-    wheel_assign = property(*K4Base.func_template(15, shift=4, mask=0b11))
-    vib_speed = property(*K4Base.func_template(16))
-    wheel_dep = property(*K4Base.func_template(17, correct=-50))
-    auto_bend_time = property(*K4Base.func_template(18))
-    auto_bend_depth = property(*K4Base.func_template(19, correct=-50))
-    auto_bend_ks_time = property(*K4Base.func_template(20, correct=-50))
-    auto_bend_vel_dep = property(*K4Base.func_template(21, correct=-50))
-    vib_prs_vib = property(*K4Base.func_template(22, correct=-50))
-    vibrato_dep = property(*K4Base.func_template(23, correct=-50))
-    lfo_shape = property(*K4Base.func_template(24, mask=0b11))
-    lfo_speed = property(*K4Base.func_template(25))
-    lfo_delay = property(*K4Base.func_template(26))
-    lfo_dep = property(*K4Base.func_template(27, correct=-50))
-    lfo_prs_dep = property(*K4Base.func_template(28, correct=-50))
-    pres_freq = property(*K4Base.func_template(29, correct=-50))
-
-
-    # Source 1
-    s1_delay = property(*K4Base.func_template(30))
-    
-    @property
-    def s1_wave_select(self):
-        return ((self._data[34] & 1)<<7 | (self._data[38]))
-
-    @s1_wave_select.setter
-    def s1_wave_select(self, val):
-        print(f's1_wave_select={val}')
-        self._data[38] = val & 0b1111111
-        self._data[34] = (val >> 7) & 1
-        self.update_checksum()
-
-
-    s1_ks_curve = property(*K4Base.func_template(34, shift=4, correct=1))
-    s1_coarse = property(*K4Base.func_template(42, mask=0b111111, correct=-24))
-    s1_key_track = property(*K4Base.func_template(42, shift=6, mask=0b1))
-    s1_fix = property(*K4Base.func_template(46))
-    s1_fine = property(*K4Base.func_template(50, correct=-50))
-    s1_prs_freq = property(*K4Base.func_template(54, mask=0b1))
-    s1_vib_bend = property(*K4Base.func_template(54, shift=1, mask=0b1))
-    s1_vel_curve = property(*K4Base.func_template(54, shift=2, mask=0b111))
-
-    # Source 2
-    s2_delay = property(*K4Base.func_template(31))
-
-    @property
-    def s2_wave_select(self):
-        return ((self._data[35] & 1) << 7 | (self._data[39]))
-
-    @s2_wave_select.setter
-    def s2_wave_select(self, val):
-        print(f's2_wave_select={val}')
-        self._data[39] = val & 0b1111111
-        self._data[35] = (val >> 7) & 1
-        self.update_checksum()
-
-    s2_ks_curve = property(*K4Base.func_template(35, shift=4, correct=1))
-    s2_coarse = property(*K4Base.func_template(43, mask=0b111111, correct=-24))
-    s2_key_track = property(*K4Base.func_template(43, shift=6, mask=0b1))
-    s2_fix = property(*K4Base.func_template(47))
-    s2_fine = property(*K4Base.func_template(51, correct=-50))
-    s2_prs_freq = property(*K4Base.func_template(55, mask=0b1))
-    s2_vib_bend = property(*K4Base.func_template(55, shift=1, mask=0b1))
-    s2_vel_curve = property(*K4Base.func_template(55, shift=2, mask=0b111))
+        self.write_bytes(0, encode_name(val))
+        self.changed('name')
 
 
-    # Source 3
-    s3_delay = property(*K4Base.func_template(31))
-
-    @property
-    def s3_wave_select(self):
-        return ((self._data[36] & 1) << 7 | (self._data[40]))
+    def to_dict(self):
+        values = super().to_dict()
+        values['name'] = self.name
+        return values
 
-    @s3_wave_select.setter
-    def s3_wave_select(self, val):
-        print(f's3_wave_select={val}')
-        self._data[40] = val & 0b1111111
-        self._data[36] = (val >> 7) & 1
-        self.update_checksum()
 
-    s3_ks_curve = property(*K4Base.func_template(36, shift=4, correct=1))
-    s3_coarse = property(*K4Base.func_template(44, mask=0b111111, correct=-24))
-    s3_key_track = property(*K4Base.func_template(44, shift=6, mask=0b1))
-    s3_fix = property(*K4Base.func_template(48))
-    s3_fine = property(*K4Base.func_template(52, correct=-50))
-    s3_prs_freq = property(*K4Base.func_template(56, mask=0b1))
-    s3_vib_bend = property(*K4Base.func_template(56, shift=1, mask=0b1))
-    s3_vel_curve = property(*K4Base.func_template(56, shift=2, mask=0b111))
-
-
-    # Source 4
-    s4_delay = property(*K4Base.func_template(31))
-
-    @property
-    def s4_wave_select(self):
-        return ((self._data[37] & 1) << 7 | (self._data[41]))
-
-    @s4_wave_select.setter
-    def s4_wave_select(self, val):
-        print(f's4_wave_select={val}')
-        self._data[41] = val & 0b1111111
-        self._data[37] = (val >> 7) & 1
-        self.update_checksum()
-
-    s4_ks_curve = property(*K4Base.func_template(37, shift=4, correct=1))
-    s4_coarse = property(*K4Base.func_template(45, mask=0b111111, correct=-24))
-    s4_key_track = property(*K4Base.func_template(45, shift=6, mask=0b1))
-    s4_fix = property(*K4Base.func_template(49))
-    s4_fine = property(*K4Base.func_template(53, correct=-50))
-    s4_prs_freq = property(*K4Base.func_template(57, mask=0b1))
-    s4_vib_bend = property(*K4Base.func_template(57, shift=1, mask=0b1))
-    s4_vel_curve = property(*K4Base.func_template(57, shift=2, mask=0b111))
-
-
-    # DCA 1
-    s1_envelope_level = property(*K4Base.func_template(58))
-    s1_envelope_attack = property(*K4Base.func_template(62))
-    s1_envelope_decay = property(*K4Base.func_template(66))
-    s1_envelope_sustain = property(*K4Base.func_template(70))
-    s1_envelope_release = property(*K4Base.func_template(74))
-    s1_level_mod_vel = property(*K4Base.func_template(78, correct=-50))
-    s1_level_mod_prs = property(*K4Base.func_template(82, correct=-50))
-    s1_level_mod_ks = property(*K4Base.func_template(86, correct=-50))
-    s1_time_mod_on_vel = property(*K4Base.func_template(90, correct=-50))
-    s1_time_mod_off_vel = property(*K4Base.func_template(94, correct=-50))
-    s1_time_mod_ks = property(*K4Base.func_template(98, correct=-50))
-
-
-    # DCA 2
-    s2_envelope_level = property(*K4Base.func_template(59))
-    s2_envelope_attack = property(*K4Base.func_template(63))
-    s2_envelope_decay = property(*K4Base.func_template(67))
-    s2_envelope_sustain = property(*K4Base.func_template(71))
-    s2_envelope_release = property(*K4Base.func_template(75))
-    s2_level_mod_vel = property(*K4Base.func_template(79, correct=-50))
-    s2_level_mod_prs = property(*K4Base.func_template(83, correct=-50))
-    s2_level_mod_ks = property(*K4Base.func_template(87, correct=-50))
-    s2_time_mod_on_vel = property(*K4Base.func_template(91, correct=-50))
-    s2_time_mod_off_vel = property(*K4Base.func_template(95, correct=-50))
-    s2_time_mod_ks = property(*K4Base.func_template(99, correct=-50))
-
-
-    # DCA 3
-    s3_envelope_level = property(*K4Base.func_template(60))
-    s3_envelope_attack = property(*K4Base.func_template(64))
-    s3_envelope_decay = property(*K4Base.func_template(68))
-    s3_envelope_sustain = property(*K4Base.func_template(72))
-    s3_envelope_release = property(*K4Base.func_template(76))
-    s3_level_mod_vel = property(*K4Base.func_template(80, correct=-50))
-    s3_level_mod_prs = property(*K4Base.func_template(84, correct=-50))
-    s3_level_mod_ks = property(*K4Base.func_template(88, correct=-50))
-    s3_time_mod_on_vel = property(*K4Base.func_template(92, correct=-50))
-    s3_time_mod_off_vel = property(*K4Base.func_template(96, correct=-50))
-    s3_time_mod_ks = property(*K4Base.func_template(100, correct=-50))
-    
-
-    # DCA 4
-    s4_envelope_level = property(*K4Base.func_template(61))
-    s4_envelope_attack = property(*K4Base.func_template(65))
-    s4_envelope_decay = property(*K4Base.func_template(69))
-    s4_envelope_sustain = property(*K4Base.func_template(73))
-    s4_envelope_release = property(*K4Base.func_template(77))
-    s4_level_mod_vel = property(*K4Base.func_template(81, correct=-50))
-    s4_level_mod_prs = property(*K4Base.func_template(85, correct=-50))
-    s4_level_mod_ks = property(*K4Base.func_template(89, correct=-50))
-    s4_time_mod_on_vel = property(*K4Base.func_template(93, correct=-50))
-    s4_time_mod_off_vel = property(*K4Base.func_template(97, correct=-50))
-    s4_time_mod_ks = property(*K4Base.func_template(101, correct=-50))
-    
-
-    # LFO1/DCF1
-    lfo1_cutoff = property(*K4Base.func_template(102))
-    lfo1_resonance = property(*K4Base.func_template(104, mask=0b111, correct=1))
-    lfo1_switch = property(*K4Base.func_template(104, shift=3, mask=0b1))
-    lfo1_cutoff_mod_vel = property(*K4Base.func_template(106, correct=-50))
-    lfo1_cutoff_mod_prs = property(*K4Base.func_template(108, correct=-50))
-    lfo1_cutoff_mod_ks = property(*K4Base.func_template(110, correct=-50))
-    dcf1_env_dep = property(*K4Base.func_template(112, correct=-50))
-    dcf1_env_vel_dep = property(*K4Base.func_template(114, correct=-50))
-    dcf1_env_attack = property(*K4Base.func_template(116))
-    dcf1_env_decay = property(*K4Base.func_template(118))
-    dcf1_env_sustain = property(*K4Base.func_template(120))
-    dcf1_env_release = property(*K4Base.func_template(122))
-    dcf1_time_mod_on_vel = property(*K4Base.func_template(124, correct=-50))
-    dcf1_time_mod_off_vel = property(*K4Base.func_template(126, correct=-50))
-    dcf1_time_mod_ks = property(*K4Base.func_template(128, correct = -50))
-
-    # LFO2/DCF2
-    lfo2_cutoff = property(*K4Base.func_template(103))
-    lfo2_resonance = property(*K4Base.func_template(105, mask=0b111, correct=1))
-    lfo2_switch = property(*K4Base.func_template(105, shift=3, mask=0b1))
-    lfo2_cutoff_mod_vel = property(*K4Base.func_template(107, correct=-50))
-    lfo2_cutoff_mod_prs = property(*K4Base.func_template(109, correct=-50))
-    lfo2_cutoff_mod_ks = property(*K4Base.func_template(111, correct=-50))
-    dcf2_env_dep = property(*K4Base.func_template(113, correct=-50))
-    dcf2_env_vel_dep = property(*K4Base.func_template(115, correct=-50))
-    dcf2_env_attack = property(*K4Base.func_template(117))
-    dcf2_env_decay = property(*K4Base.func_template(119))
-    dcf2_env_sustain = property(*K4Base.func_template(121))
-    dcf2_env_release = property(*K4Base.func_template(123))
-    dcf2_time_mod_on_vel = property(*K4Base.func_template(125, correct=-50))
-    dcf2_time_mod_off_vel = property(*K4Base.func_template(127, correct=-50))
-    dcf2_time_mod_ks = property(*K4Base.func_template(129, correct=-50))
+    def from_dict(self, values):
+        with self.batch():
+            if 'name' in values:
+                self.name = values['name']
+            super().from_dict(values)
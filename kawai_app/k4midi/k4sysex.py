@@ -0,0 +1,207 @@
+# k4sysex.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import re
+
+from k4midi.k4dump import all_data_patches, all_data_size, decode_patch, decode_dump, \
+                          kawai_id, k4_id, header_size
+
+_debug = False
+
+# matches all status bytes
+_status_byte = re.compile(rb'[\x80-\xff]')
+
+
+# K4Message
+#
+# a complete K4 sysex message, the header bytes are decoded in the same
+# way as K4Dump.k4_dump does, data holds the decoded patches
+class K4Message(object):
+    def __init__(self, header, data, raw):
+        self._header = header
+        self._results = data
+        self._raw = raw
+
+
+    @property
+    def data(self):
+        return self._results
+
+    @property
+    def channel(self):
+        return self._header[1]
+
+    @property
+    def function(self):
+        return self._header[2]
+
+    @property
+    def group(self):
+        return self._header[3]
+
+    @property
+    def machine(self):
+        return self._header[4]
+
+    @property
+    def sub_status1(self):
+        return self._header[5]
+
+    @property
+    def sub_status2(self):
+        return self._header[6]
+
+
+    # raw
+    #
+    # the bytes of the message without the leading 0xf0 and the final 0xf7
+    @property
+    def raw(self):
+        return self._raw
+
+
+    # sysex
+    #
+    # the complete sysex message
+    @property
+    def sysex(self):
+        return b'\xf0' + self._raw + b'\xf7'
+
+
+
+# K4SysexParser
+#
+# push parser for a stream of MIDI bytes, the data can be fed in any
+# pieces, e.g. as they arrive from a MIDI port, a pipe or a socket,
+#
+#   parser = K4SysexParser()
+#   for chunk in stream:
+#       for msg in parser.feed(chunk):
+#           ...
+#
+# the patches of an all data dump are decoded as soon as their bytes have
+# arrived, so only the decoding of the last patch is left, when the
+# message is complete. Bytes outside of sysex messages, realtime
+# messages and sysex messages of other devices are ignored
+class K4SysexParser(object):
+    def __init__(self):
+        self.reset()
+
+
+    # reset
+    #
+    # forget a partially received message
+    def reset(self):
+        self._buffer = None     # header and data of the current message
+        self._is_k4 = None      # unknown until the header is complete
+        self._results = None
+        self._next_patch = 0
+
+
+    def _start(self):
+        self.reset()
+        self._buffer = bytearray()
+
+
+    # _decode
+    #
+    # checks the header and decodes all patches which are complete
+    def _decode(self):
+        buffer = self._buffer
+        if self._is_k4 is None:
+            if len(buffer) < header_size:
+                return
+            self._is_k4 = (buffer[0] == kawai_id) and (buffer[4] == k4_id)
+            self._results = {'function': buffer[2]}
+            if not self._is_k4:
+                # not interested in the rest of the message
+                buffer.clear()
+                return
+
+        if not self._is_k4 or self._results['function'] != 0x22:
+            return
+
+        size = len(buffer) - header_size
+        while self._next_patch < len(all_data_patches):
+            entry = all_data_patches[self._next_patch]
+            ofs = entry[3]
+            end = ofs + entry[2].size
+            if end > size:
+                break
+            decode_patch(self._results, entry,
+                         buffer[header_size+ofs:header_size+end])
+            self._next_patch += 1
+
+
+    # _finish
+    #
+    # called with the final 0xf7, returns the message or None
+    def _finish(self):
+        buffer = self._buffer
+        is_k4 = self._is_k4
+        results = self._results
+        complete = self._next_patch == len(all_data_patches)
+        self.reset()
+
+        if not is_k4:
+            return None
+
+        if (results['function'] == 0x22) and not complete:
+            print(f'All data dump is incomplete ({len(buffer)-header_size} of {all_data_size} bytes)!')
+            return None
+
+        if results['function'] in (0x20, 0x21):
+            decode_dump(results, results['function'], buffer[5], buffer[6],
+                        buffer[header_size:])
+
+        if _debug:
+            print(f'K4 message function={results["function"]:x} size={len(buffer)}')
+
+        return K4Message(bytearray(buffer[:header_size]), results, bytes(buffer))
+
+
+    # feed
+    #
+    # feeds a piece of the stream into the parser, yields all messages
+    # which are completed by the data
+    def feed(self, chunk):
+        if not isinstance(chunk, (bytes, bytearray)):
+            chunk = bytes(chunk)
+
+        ofs = 0
+        size = len(chunk)
+        while ofs < size:
+            if self._buffer is None:
+                # outside of a sysex message, search the next start
+                ofs = chunk.find(b'\xf0', ofs)
+                if ofs < 0:
+                    return
+                self._start()
+                ofs += 1
+                continue
+
+            m = _status_byte.search(chunk, ofs)
+            end = size if m is None else m.start()
+            if self._is_k4 is not False:
+                self._buffer += chunk[ofs:end]
+                self._decode()
+            if m is None:
+                return
+
+            b = chunk[end]
+            ofs = end + 1
+            if b >= 0xf8:
+                # realtime messages can be sent at any time
+                continue
+            elif b == 0xf7:
+                msg = self._finish()
+                if msg is not None:
+                    yield msg
+            else:
+                # any other status byte terminates the message
+                if _debug:
+                    print(f'sysex message aborted by 0x{b:x}')
+                self.reset()
+                ofs = end
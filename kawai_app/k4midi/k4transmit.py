@@ -0,0 +1,174 @@
+# k4transmit.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import asyncio
+import threading
+
+from k4midi.k4dump import all_data_entries, update_bank_checksums
+from k4midi.k4io import sysex_message, one_data_dump, block_data_dump, all_data_dump, \
+                        wire_time
+
+_debug = False
+
+
+# the blocks of the block data dumps: (sub status 1, sub status 2, keys)
+dump_blocks = [(0, 0x00, ('single_instruments',)),
+               (0, 0x40, ('multi_instruments',)),
+               (1, 0x00, ('effects',)),
+               (1, 0x20, ('drum_common', 'drums'))]
+
+
+def block_range(keys):
+    entries = [entry for key in keys for entry in all_data_entries[key]]
+    first, last = entries[0], entries[-1]
+    return first[3], last[3] + last[2].size
+
+
+# dump_messages
+#
+# splits an all data dump into sysex messages, mode is
+#   'all'    one all data dump, the same data as save_sysexfile
+#   'block'  block data dumps of singles, multis, effects and drums
+#   'patch'  one data dumps of every single patch (the drums as one)
+# the channel is taken from the dump if not given, the checksums are
+# fixed in the messages, the dump itself is not changed
+def dump_messages(dump, mode='block', channel=None, cartridge=False):
+    if dump.bank is None:
+        raise ValueError('Only all data dumps can be sent')
+
+    bank = bytearray(dump.bank)
+    update_bank_checksums(bank)
+    if channel is None:
+        channel = dump.channel
+    ext = 2 if cartridge else 0
+
+    if mode == 'all':
+        header = dump._header
+        return [sysex_message(channel, all_data_dump, (header[5] & ~2) | ext, header[6], bank)]
+
+    messages = []
+    for sub_status1, sub_status2, keys in dump_blocks:
+        if mode == 'block':
+            start, end = block_range(keys)
+            messages.append(sysex_message(channel, block_data_dump, sub_status1 | ext,
+                                          sub_status2, bank[start:end]))
+        elif mode == 'patch':
+            if keys[0] == 'drum_common':
+                start, end = block_range(keys)
+                messages.append(sysex_message(channel, one_data_dump, sub_status1 | ext,
+                                              sub_status2, bank[start:end]))
+                continue
+            for key, nr, cls, ofs, name in all_data_entries[keys[0]]:
+                messages.append(sysex_message(channel, one_data_dump, sub_status1 | ext,
+                                              sub_status2 + nr, bank[ofs:ofs+cls.size]))
+        else:
+            raise ValueError(f'Unknown mode {mode}')
+
+    return messages
+
+
+# K4TransmitScheduler
+#
+# sends a list of sysex messages with pauses, after each message the
+# scheduler waits for the time the message needs on the MIDI cable
+# plus gap seconds, so the synth can store the data. progress is
+# called with (bytes sent, total bytes) after every message. The
+# transfer runs in a thread (start) or as asyncio task (run_async) and
+# can be cancelled at any time
+#
+#   scheduler = K4TransmitScheduler(K4Transport(port).send, dump_messages(dump))
+#   scheduler.start()
+#   ...
+#   scheduler.cancel()
+class K4TransmitScheduler(object):
+    def __init__(self, send, messages, gap=0.05, progress=None):
+        self._send = send
+        self._messages = list(messages)
+        self._gap = gap
+        self._progress = progress
+
+        self._cancel = threading.Event()
+        self._thread = None
+
+        self.total = sum(len(msg) for msg in self._messages)
+        self.sent = 0
+        self.finished = False
+
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+    # pause
+    #
+    # the time to wait after a message
+    def pause(self, msg):
+        return wire_time(len(msg)) + self._gap
+
+
+    def _sent(self, msg):
+        self.sent += len(msg)
+        if self._progress is not None:
+            self._progress(self.sent, self.total)
+
+
+    # run
+    #
+    # sends all messages and waits in between, returns False if the
+    # transfer was cancelled
+    def run(self):
+        for msg in self._messages:
+            if self._cancel.is_set():
+                return False
+            self._send(msg)
+            self._sent(msg)
+            if self._cancel.wait(self.pause(msg)):
+                return False
+
+        self.finished = True
+        return True
+
+
+    async def run_async(self):
+        try:
+            for msg in self._messages:
+                if self._cancel.is_set():
+                    return False
+                self._send(msg)
+                self._sent(msg)
+                await asyncio.sleep(self.pause(msg))
+        except asyncio.CancelledError:
+            self._cancel.set()
+            raise
+
+        self.finished = True
+        return True
+
+
+    # start
+    #
+    # runs the transfer in a background thread
+    def start(self):
+        if self._thread is not None:
+            raise ValueError('Transfer is already started')
+        self._thread = threading.Thread(target=self.run, name='K4TransmitScheduler',
+                                        daemon=True)
+        self._thread.start()
+
+
+    def cancel(self):
+        self._cancel.set()
+
+
+    # wait
+    #
+    # waits for the end of the transfer in the thread, returns True
+    # when the transfer has ended
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
@@ -1,7 +1,10 @@
 # midifile.py
 #
 # written by: Oliver Cordes 2023-01-29
-# changed by: Oliver Cordes 2023-02-19
+# changed by: Oliver Cordes 2026-10-18
+
+import mmap
+import os
 
 
 def chunk_size(bytes):
@@ -21,19 +24,35 @@ def two_bytes(bytes):
 
 
 class MidiFile(object):
-    def __init__(self, filename):
-        self._filename = filename
-
+    # if use_mmap is set, the file is not read into memory but mapped
+    # copy-on-write, all data views refer to the mapped pages and
+    # changes are never written back into the file
+    #
+    # instead of a filename a file object (e.g. a member of a zip
+    # archive) or the data itself (bytes, bytearray, memoryview) can be
+    # given, a writable buffer is used directly like a mapped file
+    def __init__(self, filename, use_mmap=False):
         self._data = None
-        with open(filename, 'rb') as f:
-            self._data = f.read()
+        if isinstance(filename, (bytes, bytearray, memoryview)):
+            self._filename = '<data>'
+            self._data = filename
+        elif hasattr(filename, 'read'):
+            self._filename = getattr(filename, 'name', '<stream>')
+            self._data = filename.read()
+        else:
+            self._filename = filename
+            with open(filename, 'rb') as f:
+                if use_mmap:
+                    self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                else:
+                    self._data = f.read()
 
         if self._data is None:
-            raise ValueError(f'Cannot read MIDI file \'{filename}\'')
+            raise ValueError(f'Cannot read MIDI file \'{self._filename}\'')
 
         self._is_midi = self._data[0:4] == b'MThd'
 
-        print(f'FILE {filename} is MIDI: {self._is_midi}')
+        print(f'FILE {self._filename} is MIDI: {self._is_midi}')
 
         if self._is_midi:
             self._header_length = chunk_size(self._data[4:8])
@@ -49,30 +68,79 @@ class MidiFile(object):
         else:
             self._header_offset = 0
 
+        self._chunks = self.read_chunks()
+        self._track_chunks = [(ofs, length) for ofs, length, type in self._chunks
+                                if type == b'MTrk']
 
-    def get_track(self, nr):
-        # skip to the correct track number
+
+    # read_chunks
+    #
+    # walks once through all chunks behind the header and returns
+    # a list of (offset, length, type), the offset points to the
+    # data of the chunk
+    def read_chunks(self):
+        chunks = []
+        if not self._is_midi:
+            return chunks
 
         ofs = self._header_offset
+        size = len(self._data)
+        while ofs + 8 <= size:
+            type = bytes(self._data[ofs:ofs+4])
+            length = chunk_size(self._data[ofs+4:ofs+8])
+
+            if ofs + 8 + length > size:
+                print(f'Chunk {type} is truncated!')
+                length = size - ofs - 8
+
+            chunks.append((ofs+8, length, type))
+            ofs += 8 + length
+
+        return chunks
 
-        # simply walk through all tracks
-        for tnr in range(nr+1):
-            # ofs is at the beginning of a track
-            is_track = self._data[ofs:ofs+4] == b'MTrk'
 
-            if not is_track:
-                raise ValueError(f'Not a valid track #{tnr}')
-            
-            track_length = chunk_size(self._data[ofs+4:ofs+8])
+    # maps_file
+    #
+    # True if the data is mapped from filename, such a file must not be
+    # truncated or overwritten in place while the dump is used
+    def maps_file(self, filename):
+        if not isinstance(self._data, mmap.mmap):
+            return False
+        try:
+            return os.path.samefile(filename, self._filename)
+        except OSError:
+            return False
 
-            start_track = ofs + 8
-            end_track = start_track + track_length
 
-            ofs += 8 + track_length
+    @property
+    def chunks(self):
+        return self._chunks
 
-        # if the loop stops, some variables indicate
-        # the data positions of the last track!
 
-        data = self._data[start_track:end_track]
+    # tracks
+    #
+    # the list of (offset, length) of all MTrk chunks, unknown chunk
+    # types are not part of the list
+    @property
+    def tracks(self):
+        return self._track_chunks
+
+
+    # track_span
+    #
+    # returns the start and end offset of the data of track nr
+    def track_span(self, nr):
+        if nr >= len(self._track_chunks):
+            raise ValueError(f'Not a valid track #{nr}')
+
+        ofs, length = self._track_chunks[nr]
+        return ofs, ofs + length
+
+
+    def get_track(self, nr):
+        start_track, end_track = self.track_span(nr)
+
+        # return a view into the file data, not a copy
+        data = memoryview(self._data)[start_track:end_track]
         return data
 
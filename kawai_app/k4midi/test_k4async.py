@@ -0,0 +1,27 @@
+# test_k4async.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import asyncio
+
+from k4midi.k4async import K4Capture, K4Device
+from k4midi.k4dump import K4Dump
+from k4midi.k4emulator import K4Emulator
+
+
+def test_concurrent_patches(all_data):
+    dump = K4Dump(all_data)
+    device = K4Device(K4Emulator(dump).port(wire=True), 0)
+
+    async def fetch():
+        async with K4Capture([device], timeout=0.5, retries=0) as capture:
+            return await asyncio.gather(*(capture.fetch_patch(device, 'single_instruments', nr)
+                                          for nr in (5, 9, 17)))
+
+    answers = asyncio.run(fetch())
+    assert [answer.data['nr'] for answer in answers] == [5, 9, 17]
+    for answer in answers:
+        nr = answer.data['nr']
+        assert bytes(answer.data['single_instruments'][0]._data) == \
+               bytes(dump.data['single_instruments'][nr]._data)
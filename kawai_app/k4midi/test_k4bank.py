@@ -0,0 +1,40 @@
+# test_k4bank.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+from k4midi.k4base import checksum
+from k4midi.k4bank import patch_array, write_patch_array, array_names
+from k4midi.k4dump import K4Dump
+
+
+def test_write_unchanged(k4_mid):
+    dump = K4Dump(k4_mid)
+    singles = dump.data['single_instruments']
+    singles[0]._data[0:10] = b' LEAD     '          # leading space, bad checksum
+    bank = bytes(dump.bank)
+
+    for key in ('single_instruments', 'multi_instruments', 'effects'):
+        changed = write_patch_array(dump, patch_array(dump, key), key)
+        assert not changed.any()
+    assert bytes(dump.bank) == bank
+
+    assert array_names(patch_array(dump))[0] == ' LEAD'
+
+
+def test_write_changed(k4_mid):
+    dump = K4Dump(k4_mid)
+    singles = dump.data['single_instruments']
+    singles[0]._data[10] ^= 1                           # bad checksum
+
+    values = patch_array(dump)
+    values['name'][1] = b'NEW'
+    values['volume'][2] = 77
+    changed = write_patch_array(dump, values)
+
+    assert list(changed.nonzero()[0]) == [1, 2]
+    assert bytes(singles[1]._data[0:10]) == b'NEW       '
+    assert singles[2].volume == 77
+    for ins in singles[1:3]:
+        assert ins._data[-1] == checksum(ins._data)
+    assert not singles[0].verify_checksum()
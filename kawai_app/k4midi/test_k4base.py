@@ -0,0 +1,64 @@
+# test_k4base.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import random
+
+import pytest
+
+from k4midi.k4base import checksum, set_byte, set_bytes
+from k4midi.k4single import K4SingleInstrument
+from k4midi.k4multi import K4MultiInstrument
+
+
+# properties of a single instrument with their range
+properties = [('volume', 0, 100), ('effect', 1, 32), ('poly_mode', 0, 3),
+              ('mute_s3', 0, 1), ('vib_shape', 0, 3), ('wheel_dep', -50, 50),
+              ('s2_delay', 0, 100), ('s1_wave_select', 0, 255), ('s4_wave_select', 0, 255),
+              ('s3_ks_curve', 1, 8), ('s3_coarse', -24, 24), ('s4_key_track', 0, 1),
+              ('s2_vel_curve', 0, 7), ('s1_envelope_attack', 0, 100)]
+
+
+def test_checksum_random(bank):
+    rnd = random.Random(8)
+    ins = K4SingleInstrument(bytearray(bank[:K4SingleInstrument.size]))
+    data = ins._data
+    assert data[-1] == checksum(data)
+
+    for i in range(1000):
+        ofs = rnd.randrange(len(data) - 1)
+        if rnd.random() < 0.5:
+            set_byte(data, ofs, rnd.randrange(128))
+        else:
+            values = bytes(rnd.randrange(128) for i in range(rnd.randrange(1, 8)))
+            set_bytes(data, ofs, values[:len(data)-1-ofs])
+        assert data[-1] == checksum(data)
+
+    for i in range(1000):
+        name, low, high = rnd.choice(properties)
+        value = rnd.randint(low, high)
+        setattr(ins, name, value)
+        assert getattr(ins, name) == value
+        assert data[-1] == checksum(data)
+
+    # an invalid write changes neither the data nor the checksum
+    old = bytes(data)
+    with pytest.raises(ValueError):
+        set_byte(data, 5, 256)
+    with pytest.raises(ValueError):
+        ins.volume = 1000
+    assert bytes(data) == old
+
+
+def test_name(bank):
+    for cls, ofs in ((K4SingleInstrument, 0), (K4MultiInstrument, 64 * K4SingleInstrument.size)):
+        ins = cls(bytearray(bank[ofs:ofs+cls.size]))
+
+        ins.name = 'A very long name'
+        assert bytes(ins._data[0:10]) == b'A very lon'
+        ins.name = 'Bläser'
+        assert bytes(ins._data[0:10]) == b'Bl?ser    '
+        assert ins.name == 'Bl?ser'
+        assert ins._data[-1] == checksum(ins._data)
+        assert len(ins._data) == cls.size
@@ -0,0 +1,70 @@
+# test_k4cache.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+from k4midi.k4cache import K4Cache
+from k4midi.k4dump import K4Dump
+
+
+# patch_data
+#
+# the data of all patches of a dump, to compare dumps
+def patch_data(dump):
+    data = {}
+    for key, value in dump.data.items():
+        if isinstance(value, int):
+            data[key] = value
+        elif hasattr(value, '_data'):
+            data[key] = bytes(value._data)
+        else:
+            data[key] = [bytes(i._data) for i in value]
+    return data
+
+
+# check_cache
+#
+# reads filename without and with the entry in the cache
+def check_cache(cache, filename):
+    miss = K4Dump(filename, cache=cache)
+    assert cache.get(cache.key(filename)) is not None
+    hit = K4Dump(filename, cache=cache)
+    assert len(miss.data) > 1
+    assert patch_data(hit) == patch_data(miss)
+    assert bytes(hit._header) == bytes(miss._header)
+    return miss
+
+
+def test_all_data(tmp_path, all_data):
+    cache = K4Cache(str(tmp_path / 'cache'))
+    filename = str(tmp_path / 'all.syx')
+    with open(filename, 'wb') as f:
+        f.write(all_data)
+
+    miss = check_cache(cache, filename)
+    lazy = K4Dump(filename, lazy=True, cache=cache)
+    assert lazy.names() == miss.names()
+    assert lazy.names('multi_instruments') == miss.names('multi_instruments')
+
+
+def test_dumps(tmp_path, fake_port):
+    from k4midi.k4io import K4Transport
+
+    cache = K4Cache(str(tmp_path / 'cache'))
+    transport = K4Transport(fake_port, timeout=0.5, retries=0)
+    dumps = {'one.syx': transport.fetch_patch('single_instruments', 9),
+             'multi.mid': transport.fetch_patch('multi_instruments', 3),
+             'drums.syx': transport.fetch_patch('drums', 0),
+             'block.mid': transport.fetch_block('effects'),
+             'block_drums.syx': transport.fetch_block('drums')}
+
+    for name, dump in dumps.items():
+        filename = str(tmp_path / name)
+        if name.endswith('.mid'):
+            dump.save_midifile(filename)
+        else:
+            dump.save_sysexfile(filename)
+
+        read = check_cache(cache, filename)
+        assert 'nr' in read.data
+        assert patch_data(read) == patch_data(dump)
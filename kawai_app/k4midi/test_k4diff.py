@@ -0,0 +1,49 @@
+# test_k4diff.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+from k4midi.k4diff import Change, diff_dumps, diff_patches
+from k4midi.k4dump import K4Dump
+from k4midi.k4single import K4SingleInstrument
+
+
+# unmapped_bit
+#
+# the offset and the mask of the first bit of a single which belongs
+# to no field
+def unmapped_bit():
+    used = [0] * K4SingleInstrument.size
+    for field in K4SingleInstrument.fields:
+        used[field.ofs] |= field.mask << field.shift
+        if field.high_ofs is not None:
+            used[field.high_ofs] |= 1
+    for ofs in range(10, K4SingleInstrument.size - 1):
+        for bit in range(7):
+            if not used[ofs] & (1 << bit):
+                return ofs, 1 << bit
+
+
+def test_diff(k4_mid):
+    a = K4Dump(k4_mid)
+    b = K4Dump(k4_mid)
+    singles = b.data['single_instruments']
+
+    b.data['multi_instruments'][3].sections[2].level = 17
+    singles[4].s1_wave_select ^= 128
+    singles[7].name = 'TEST'
+    ofs, bit = unmapped_bit()
+    singles[9].write_byte(ofs, singles[9]._data[ofs] ^ bit)
+
+    old = a.data['single_instruments']
+    assert diff_dumps(a, b) == [
+        Change('single_instruments', 4, 's1_wave_select',
+               old[4].s1_wave_select, old[4].s1_wave_select ^ 128),
+        Change('single_instruments', 7, 'name', old[7].name, 'TEST'),
+        Change('single_instruments', 9, f'byte[{ofs}]', old[9]._data[ofs], old[9]._data[ofs] ^ bit),
+        Change('multi_instruments', 3, 'sections[2].level',
+               a.data['multi_instruments'][3].sections[2].level, 17)]
+
+    changes = diff_patches(old[4], singles[4], checksum=True)
+    assert [change.field for change in changes] == ['s1_wave_select', 'checksum']
+    assert diff_dumps(a, a) == []
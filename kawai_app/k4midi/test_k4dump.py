@@ -0,0 +1,81 @@
+# test_k4dump.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import pytest
+
+from k4midi.k4dump import K4Dump
+
+
+# sysex_events
+#
+# a MIDI file with one track of sysex events at delta time 0
+def sysex_events(filename, *messages):
+    track = b''
+    for msg in messages:
+        body = msg[1:]
+        size = bytearray([len(body) & 0x7f])
+        value = len(body) >> 7
+        while value > 0:
+            size.insert(0, 0x80 | (value & 0x7f))
+            value >>= 7
+        track += b'\x00\xf0' + bytes(size) + body
+    track += b'\x00\xff\x2f\x00'
+
+    with open(filename, 'wb') as f:
+        f.write(b'MThd\x00\x00\x00\x06\x00\x00\x00\x01\x01\xe0')
+        f.write(b'MTrk' + len(track).to_bytes(4, 'big') + track)
+
+
+# k4_message
+#
+# the sysex message of the dump in k4.mid
+def k4_message(k4_mid):
+    with open(k4_mid, 'rb') as f:
+        data = f.read()
+    return b'\xf0' + data[data.index(b'\x40\x00\x22\x00\x04'):data.rindex(b'\xf7')+1]
+
+
+def test_foreign_sysex(tmp_path, k4_mid):
+    filename = str(tmp_path / 'gm.mid')
+    # GM reset, a Roland message and a K4 parameter change first
+    sysex_events(filename, b'\xf0\x7e\x7f\x09\x01\xf7',
+                 b'\xf0\x41\x10\x42\x12\x40\x00\x7f\x00\x41\xf7',
+                 b'\xf0\x40\x00\x10\x00\x04\x01\x00\x05\xf7',
+                 k4_message(k4_mid))
+
+    dump = K4Dump(filename)
+    ref = K4Dump(k4_mid)
+    assert dump.data['function'] == 0x22
+    for key in ('single_instruments', 'multi_instruments', 'effects'):
+        assert [bytes(i._data) for i in dump.data[key]] == \
+               [bytes(i._data) for i in ref.data[key]]
+
+
+def test_save_mapped(tmp_path, k4_mid):
+    dump = K4Dump(k4_mid, use_mmap=True)
+    ins = dump.data['single_instruments'][3]
+    ins.volume = 42
+
+    dump.save_midifile(k4_mid)
+    dump.save_sysexfile(str(tmp_path / 'k4.syx'))
+
+    # the patches of the mapped dump are still there
+    assert ins.volume == 42
+    for name in (k4_mid, str(tmp_path / 'k4.syx')):
+        assert K4Dump(name).data['single_instruments'][3].volume == 42
+
+
+def test_truncated(tmp_path, all_data):
+    filename = str(tmp_path / 'short.syx')
+
+    # one byte short, the 0xf7 stands in place of the last checksum
+    with open(filename, 'wb') as f:
+        f.write(all_data[:-2] + b'\xf7')
+    assert len(K4Dump(filename).data['effects']) == 32
+
+    with open(filename, 'wb') as f:
+        f.write(all_data[:-100] + b'\xf7')
+    with pytest.raises(ValueError):
+        K4Dump(filename)
@@ -0,0 +1,62 @@
+# test_k4emulator.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+import os
+
+import pytest
+
+from k4midi.k4dump import K4Dump
+from k4midi.k4emulator import K4Emulator
+from k4midi.k4io import K4Transport, PipePort
+
+
+def patches(dump, key):
+    return [bytes(i._data) for i in dump.data[key]]
+
+
+def test_fetch_all(all_data):
+    dump = K4Dump(all_data)
+    k4 = K4Emulator(dump)
+    transport = K4Transport(k4.port(), timeout=0.5, retries=0)
+
+    answer = transport.fetch_all()
+    assert answer.data['function'] == 0x22
+    assert bytes(answer.bank) == bytes(dump.bank)
+    assert k4.requests == 1
+
+
+def test_fetch_patch_and_block(all_data):
+    dump = K4Dump(all_data)
+    transport = K4Transport(K4Emulator(dump).port(wire=True), timeout=0.5, retries=0)
+
+    answer = transport.fetch_patch('single_instruments', 5)
+    assert answer.data['nr'] == 5
+    assert patches(answer, 'single_instruments') == patches(dump, 'single_instruments')[5:6]
+
+    answer = transport.fetch_block('effects')
+    assert patches(answer, 'effects') == patches(dump, 'effects')
+
+
+def test_fetch_all_pipe(all_data):
+    dump = K4Dump(all_data)
+    k4 = K4Emulator(dump)
+
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    k4.serve_pipe(r1, w2)
+    port = PipePort(r2, w1)
+    try:
+        answer = K4Transport(port, timeout=2., retries=0).fetch_all()
+        assert bytes(answer.bank) == bytes(dump.bank)
+    finally:
+        os.close(w1)
+        port.close()
+
+
+def test_invalid_seed(all_data):
+    data = bytearray(all_data)
+    data[20] = 0x80
+    with pytest.raises(ValueError):
+        K4Emulator(K4Dump(bytes(data)))
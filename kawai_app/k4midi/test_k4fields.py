@@ -0,0 +1,162 @@
+# test_k4fields.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+#
+# the fields of the patches against the hand-written properties of
+# the first version, name: (ofs, shift, mask, correct) or
+# ('split', ofs of bit 7, ofs of bits 0-6) for the wave select.
+# Intended differences: s3_delay and s4_delay were both read from
+# byte 31 (the s2_delay), the KS curves were masked with 255
+
+import random
+
+from k4midi.k4dump import K4Dump
+
+
+old_single = {
+    'volume': (10, 0, 255, 0), 'effect': (11, 0, 255, 1), 'out_select': (12, 0, 255, 0),
+    'source_mode': (13, 0, 3, 0), 'poly_mode': (13, 2, 3, 0), 'am12': (13, 4, 1, 0),
+    'am34': (13, 5, 1, 0), 'mute_s1': (14, 0, 1, 0), 'mute_s2': (14, 1, 1, 0),
+    'mute_s3': (14, 2, 1, 0), 'mute_s4': (14, 3, 1, 0), 'vib_shape': (14, 4, 3, 0),
+    'pitch_bend': (15, 0, 15, 0), 'wheel_assign': (15, 4, 3, 0),
+    'vib_speed': (16, 0, 255, 0), 'wheel_dep': (17, 0, 255, -50),
+    'auto_bend_time': (18, 0, 255, 0), 'auto_bend_depth': (19, 0, 255, -50),
+    'auto_bend_ks_time': (20, 0, 255, -50), 'auto_bend_vel_dep': (21, 0, 255, -50),
+    'vib_prs_vib': (22, 0, 255, -50), 'vibrato_dep': (23, 0, 255, -50),
+    'lfo_shape': (24, 0, 3, 0), 'lfo_speed': (25, 0, 255, 0), 'lfo_delay': (26, 0, 255, 0),
+    'lfo_dep': (27, 0, 255, -50), 'lfo_prs_dep': (28, 0, 255, -50),
+    'pres_freq': (29, 0, 255, -50), 's1_delay': (30, 0, 255, 0),
+    's1_ks_curve': (34, 4, 255, 1), 's1_coarse': (42, 0, 63, -24),
+    's1_key_track': (42, 6, 1, 0), 's1_fix': (46, 0, 255, 0), 's1_fine': (50, 0, 255, -50),
+    's1_prs_freq': (54, 0, 1, 0), 's1_vib_bend': (54, 1, 1, 0),
+    's1_vel_curve': (54, 2, 7, 0), 's2_delay': (31, 0, 255, 0),
+    's2_ks_curve': (35, 4, 255, 1), 's2_coarse': (43, 0, 63, -24),
+    's2_key_track': (43, 6, 1, 0), 's2_fix': (47, 0, 255, 0), 's2_fine': (51, 0, 255, -50),
+    's2_prs_freq': (55, 0, 1, 0), 's2_vib_bend': (55, 1, 1, 0),
+    's2_vel_curve': (55, 2, 7, 0), 's3_delay': (31, 0, 255, 0),
+    's3_ks_curve': (36, 4, 255, 1), 's3_coarse': (44, 0, 63, -24),
+    's3_key_track': (44, 6, 1, 0), 's3_fix': (48, 0, 255, 0), 's3_fine': (52, 0, 255, -50),
+    's3_prs_freq': (56, 0, 1, 0), 's3_vib_bend': (56, 1, 1, 0),
+    's3_vel_curve': (56, 2, 7, 0), 's4_delay': (31, 0, 255, 0),
+    's4_ks_curve': (37, 4, 255, 1), 's4_coarse': (45, 0, 63, -24),
+    's4_key_track': (45, 6, 1, 0), 's4_fix': (49, 0, 255, 0), 's4_fine': (53, 0, 255, -50),
+    's4_prs_freq': (57, 0, 1, 0), 's4_vib_bend': (57, 1, 1, 0),
+    's4_vel_curve': (57, 2, 7, 0), 's1_envelope_level': (58, 0, 255, 0),
+    's1_envelope_attack': (62, 0, 255, 0), 's1_envelope_decay': (66, 0, 255, 0),
+    's1_envelope_sustain': (70, 0, 255, 0), 's1_envelope_release': (74, 0, 255, 0),
+    's1_level_mod_vel': (78, 0, 255, -50), 's1_level_mod_prs': (82, 0, 255, -50),
+    's1_level_mod_ks': (86, 0, 255, -50), 's1_time_mod_on_vel': (90, 0, 255, -50),
+    's1_time_mod_off_vel': (94, 0, 255, -50), 's1_time_mod_ks': (98, 0, 255, -50),
+    's2_envelope_level': (59, 0, 255, 0), 's2_envelope_attack': (63, 0, 255, 0),
+    's2_envelope_decay': (67, 0, 255, 0), 's2_envelope_sustain': (71, 0, 255, 0),
+    's2_envelope_release': (75, 0, 255, 0), 's2_level_mod_vel': (79, 0, 255, -50),
+    's2_level_mod_prs': (83, 0, 255, -50), 's2_level_mod_ks': (87, 0, 255, -50),
+    's2_time_mod_on_vel': (91, 0, 255, -50), 's2_time_mod_off_vel': (95, 0, 255, -50),
+    's2_time_mod_ks': (99, 0, 255, -50), 's3_envelope_level': (60, 0, 255, 0),
+    's3_envelope_attack': (64, 0, 255, 0), 's3_envelope_decay': (68, 0, 255, 0),
+    's3_envelope_sustain': (72, 0, 255, 0), 's3_envelope_release': (76, 0, 255, 0),
+    's3_level_mod_vel': (80, 0, 255, -50), 's3_level_mod_prs': (84, 0, 255, -50),
+    's3_level_mod_ks': (88, 0, 255, -50), 's3_time_mod_on_vel': (92, 0, 255, -50),
+    's3_time_mod_off_vel': (96, 0, 255, -50), 's3_time_mod_ks': (100, 0, 255, -50),
+    's4_envelope_level': (61, 0, 255, 0), 's4_envelope_attack': (65, 0, 255, 0),
+    's4_envelope_decay': (69, 0, 255, 0), 's4_envelope_sustain': (73, 0, 255, 0),
+    's4_envelope_release': (77, 0, 255, 0), 's4_level_mod_vel': (81, 0, 255, -50),
+    's4_level_mod_prs': (85, 0, 255, -50), 's4_level_mod_ks': (89, 0, 255, -50),
+    's4_time_mod_on_vel': (93, 0, 255, -50), 's4_time_mod_off_vel': (97, 0, 255, -50),
+    's4_time_mod_ks': (101, 0, 255, -50), 'lfo1_cutoff': (102, 0, 255, 0),
+    'lfo1_resonance': (104, 0, 7, 1), 'lfo1_switch': (104, 3, 1, 0),
+    'lfo1_cutoff_mod_vel': (106, 0, 255, -50), 'lfo1_cutoff_mod_prs': (108, 0, 255, -50),
+    'lfo1_cutoff_mod_ks': (110, 0, 255, -50), 'dcf1_env_dep': (112, 0, 255, -50),
+    'dcf1_env_vel_dep': (114, 0, 255, -50), 'dcf1_env_attack': (116, 0, 255, 0),
+    'dcf1_env_decay': (118, 0, 255, 0), 'dcf1_env_sustain': (120, 0, 255, 0),
+    'dcf1_env_release': (122, 0, 255, 0), 'dcf1_time_mod_on_vel': (124, 0, 255, -50),
+    'dcf1_time_mod_off_vel': (126, 0, 255, -50), 'dcf1_time_mod_ks': (128, 0, 255, -50),
+    'lfo2_cutoff': (103, 0, 255, 0), 'lfo2_resonance': (105, 0, 7, 1),
+    'lfo2_switch': (105, 3, 1, 0), 'lfo2_cutoff_mod_vel': (107, 0, 255, -50),
+    'lfo2_cutoff_mod_prs': (109, 0, 255, -50), 'lfo2_cutoff_mod_ks': (111, 0, 255, -50),
+    'dcf2_env_dep': (113, 0, 255, -50), 'dcf2_env_vel_dep': (115, 0, 255, -50),
+    'dcf2_env_attack': (117, 0, 255, 0), 'dcf2_env_decay': (119, 0, 255, 0),
+    'dcf2_env_sustain': (121, 0, 255, 0), 'dcf2_env_release': (123, 0, 255, 0),
+    'dcf2_time_mod_on_vel': (125, 0, 255, -50),
+    'dcf2_time_mod_off_vel': (127, 0, 255, -50), 'dcf2_time_mod_ks': (129, 0, 255, -50),
+    's1_wave_select': ('split', 34, 38), 's2_wave_select': ('split', 35, 39),
+    's3_wave_select': ('split', 36, 40), 's4_wave_select': ('split', 37, 41)}
+
+old_multi = {
+    'volume': (10, 0, 255, 0), 'effect': (11, 0, 255, 1)}
+
+old_section = {
+    'single': (0, 0, 255, 0), 'zone_low': (1, 0, 255, 0), 'zone_high': (2, 0, 255, 0),
+    'rec_chan': (3, 0, 15, 1), 'vel_sw': (3, 4, 3, 0), 'mute': (3, 6, 1, 0),
+    'out_sel': (4, 0, 7, 0), 'mode': (4, 3, 3, 0), 'level': (5, 0, 255, 0),
+    'transpose': (6, 0, 255, -24), 'tune': (7, 0, 255, -50)}
+
+fixed = {'s3_delay': (32, 0, 255, 0), 's4_delay': (33, 0, 255, 0)}
+
+
+def old_get(data, ofs, field):
+    if field[0] == 'split':
+        return ((data[ofs+field[1]] & 1) << 7) | data[ofs+field[2]]
+    o, shift, mask, correct = field
+    return ((data[ofs+o] >> shift) & mask) + correct
+
+
+def old_set(data, ofs, field, value):
+    if field[0] == 'split':
+        # the first version cleared the other bits of the high byte
+        data[ofs+field[2]] = value & 0b1111111
+        data[ofs+field[1]] = (data[ofs+field[1]] & ~1) | ((value >> 7) & 1)
+        return
+    o, shift, mask, correct = field
+    data[ofs+o] = (data[ofs+o] & ~(mask << shift)) | ((value - correct) << shift)
+
+
+# check_fields
+#
+# compares get and set of all fields of obj (a patch or a section at
+# ofs of the data block) with the old properties
+def check_fields(rnd, obj, data, ofs, old):
+    assert set(obj.field_names) == set(old)
+    for field in obj.fields:
+        ref = fixed.get(field.name, old[field.name])
+        assert getattr(obj, field.name) == old_get(data, ofs, ref), field.name
+
+        value = rnd.randint(field.low, field.high)
+        expected = bytearray(data)
+        old_set(expected, ofs, ref, value)
+        setattr(obj, field.name, value)
+        assert getattr(obj, field.name) == value, field.name
+        assert data[:-1] == expected[:-1], field.name
+
+
+def test_fields(k4_mid):
+    rnd = random.Random(10)
+    dump = K4Dump(k4_mid)
+
+    for ins in dump.data['single_instruments']:
+        check_fields(rnd, ins, ins._data, 0, old_single)
+    for ins in dump.data['multi_instruments']:
+        check_fields(rnd, ins, ins._data, 0, old_multi)
+        for nr, section in enumerate(ins.sections):
+            check_fields(rnd, section, ins._data, 12 + nr * 8, old_section)
+
+
+def test_dict_round_trip(k4_mid):
+    dump = K4Dump(k4_mid)
+
+    for key in ('single_instruments', 'multi_instruments', 'effects'):
+        patches = dump.data[key]
+        for nr, ins in enumerate(patches):
+            values = ins.to_dict()
+            assert all(values[name] == getattr(ins, name) for name in ins.field_names)
+
+            # overwrite all fields with another patch and back, the
+            # checksum is calculated again (the last effect of k4.mid
+            # has none)
+            copy = type(ins)(bytearray(ins._data))
+            copy.from_dict(patches[nr-1].to_dict())
+            copy.from_dict(values)
+            assert bytes(copy._data[:-1]) == bytes(ins._data[:-1]), f'{key} {nr}'
+            assert copy.verify_checksum()
+            assert copy.to_dict() == values
@@ -0,0 +1,54 @@
+# test_k4io.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+from k4midi.k4dump import K4Dump
+from k4midi.k4io import K4Transport
+
+
+# patch_data
+#
+# the data of all patches of the results of a dump, to compare dumps
+def patch_data(results):
+    data = {}
+    for key, value in results.items():
+        if isinstance(value, int):
+            data[key] = value
+        elif hasattr(value, '_data'):
+            data[key] = bytes(value._data)
+        else:
+            data[key] = [bytes(i._data) for i in value]
+    return data
+
+
+def test_fetch_save(tmp_path, fake_port, bank):
+    transport = K4Transport(fake_port, timeout=0.5, retries=0)
+
+    answer = transport.fetch_all()
+    assert answer.data['function'] == 0x22
+    assert bytes(answer.bank) == bytes(bank)
+
+    answers = [transport.fetch_patch('single_instruments', 5),
+               transport.fetch_patch('multi_instruments', 63),
+               transport.fetch_patch('drums', 0),
+               transport.fetch_block('effects'),
+               transport.fetch_block('drums')]
+    assert answers[0].data['nr'] == 5
+    answers[0].data['single_instruments'][0].volume = 77
+
+    for nr, answer in enumerate(answers):
+        for ext in ('syx', 'mid'):
+            filename = str(tmp_path / f'{nr}.{ext}')
+            if ext == 'syx':
+                answer.save_sysexfile(filename)
+            else:
+                answer.save_midifile(filename)
+
+            dump = K4Dump(filename)
+            assert dump.data['function'] == answer.data['function']
+            assert bytes(dump._header) == bytes(answer._header)
+            assert patch_data(dump.data) == patch_data(answer.data)
+
+    ins = K4Dump(str(tmp_path / '0.syx')).data['single_instruments'][0]
+    assert ins.volume == 77 and ins.verify_checksum()
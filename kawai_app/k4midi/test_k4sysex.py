@@ -0,0 +1,33 @@
+# test_k4sysex.py
+#
+# written by: Oliver Cordes 2026-10-18
+# changed by: Oliver Cordes 2026-10-18
+
+from k4midi.k4dump import all_data_patches
+from k4midi.k4sysex import K4SysexParser
+
+
+def test_parser_chunks(bank, all_data):
+    # a parameter change of the K4
+    parameter = b'\xf0\x40\x00\x10\x00\x04\x01\x00\x05\xf7'
+
+    # a foreign sysex message, noise and a realtime message (clock) in
+    # the middle of the dump
+    half = len(all_data) // 2
+    stream = (b'\xf0\x7e\x7f\x09\x01\xf7\x00\x12' + all_data[:half] + b'\xf8'
+              + all_data[half:] + parameter)
+
+    for size in (1, 7, 100, 4096, len(stream)):
+        parser = K4SysexParser()
+        messages = []
+        for ofs in range(0, len(stream), size):
+            messages.extend(parser.feed(stream[ofs:ofs+size]))
+
+        assert [msg.function for msg in messages] == [0x22, 0x10]
+        assert messages[0].sysex == all_data
+        assert messages[1].sysex == parameter
+
+        results = messages[0].data
+        for key, nr, cls, ofs, name in all_data_patches:
+            patch = results[key] if nr is None else results[key][nr]
+            assert bytes(patch._data) == bytes(bank[ofs:ofs+cls.size])
@@ -1,7 +1,7 @@
 # mainform.py
 #
 # written by: Oliver Cordes 2023-01-30
-# changed by: Oliver Cordes 2024-02-12
+# changed by: Oliver Cordes 2026-10-18
 
 import os
 
@@ -91,6 +91,66 @@ class MainUI(Ui_MainWindow):
         self._has_changed     = False
         self._read_only       = True
 
+        self._param_sender    = None   # sends the changes to the K4
+
+
+    # set_midi_output
+    #
+    # the changes of the single instrument are sent to the K4 with the
+    # function send (or not with None), a previous sender sends its
+    # queued changes first. The sender needs mido, which is only
+    # imported with a MIDI output
+    def set_midi_output(self, send, channel=0):
+        if self._param_sender is not None:
+            self._param_sender.close()
+            self._param_sender = None
+        if send is not None:
+            from k4midi.k4param import K4ParameterSender
+            self._param_sender = K4ParameterSender(send, channel=channel)
+
+
+    # send_parameter
+    #
+    # sends a changed parameter of the single instrument, the values set
+    # by select_instrument are not sent
+    def send_parameter(self, funcname):
+        if (self._param_sender is not None) and self._edit_mode:
+            self._param_sender.send_field(self._ins, funcname)
+
+
+    # observe_patches
+    #
+    # registers an observer on all patches of the dump, a batch of
+    # changes (paste, load, the reset buttons) refreshes the widgets of
+    # the shown patch once at its end, the changes made by the widgets
+    # are not batched and need no refresh
+    def observe_patches(self):
+        for key, select in (('single_instruments', self.refresh_instrument),
+                            ('multi_instruments', self.refresh_multi),
+                            ('effects', self.refresh_effect)):
+            for patch in self._mf.data[key]:
+                patch.observe(lambda fields, patch=patch, select=select: select(patch),
+                              batches=True)
+
+
+    # refresh_instrument, refresh_multi, refresh_effect
+    #
+    # show the changed patch again, the select functions set the
+    # widgets in a batch of their own, which is ignored here
+    def refresh_instrument(self, ins):
+        if self._edit_mode and (ins is self._ins):
+            self.select_instrument(self._si_nr)
+
+
+    def refresh_multi(self, multi):
+        if self._edit_mode and (multi is self._multi):
+            self.select_multi(self._mi_nr)
+
+
+    def refresh_effect(self, effect):
+        if self._edit_mode and (effect is self._effect):
+            self.select_effect(self._eff_nr)
+
 
     def get_working_dir(self):
         if self._lastdir is None:
@@ -665,6 +725,7 @@ class MainUI(Ui_MainWindow):
                func(self._ins, val)
 
             self.update_status()
+            self.send_parameter(funcname)
 
             if funcname == 'name':
                 if self._ins_item is not None:
@@ -758,6 +819,7 @@ class MainUI(Ui_MainWindow):
                 func(self._ins, id)
 
             self.update_status()
+            self.send_parameter(funcname)
 
         return buttonclicked
 
@@ -828,6 +890,7 @@ class MainUI(Ui_MainWindow):
                 func(self._ins, val)
 
             self.update_status()
+            self.send_parameter(funcname)
 
         return statechanged
 
@@ -849,6 +912,7 @@ class MainUI(Ui_MainWindow):
                 func(self._ins, checked)
 
             self.update_status()
+            self.send_parameter(funcname)
 
         return toggled
 
@@ -902,156 +966,162 @@ class MainUI(Ui_MainWindow):
         # selects the si_nr'th instrument
         ins = self._mf.data['single_instruments'][si_nr]
         self._ins = ins
-        # fill the single instrument data
-        self.si_name.setText(ins.name)
-        self.si_volume.setValue(ins.volume)
-        self.si_effect.setValue(ins.effect)
-        self.si_out_select.setValue(ins.out_select)
-        self.si_source_mode.children()[ins.source_mode].setChecked(True)
-        self.si_poly_mode.children()[ins.poly_mode].setChecked(True)
-        self.si_am_s12.setChecked(ins.am12)
-        self.si_am_s34.setChecked(ins.am34)
-        self.si_mute_s1.setChecked(ins.mute_s1)
-        self.si_mute_s2.setChecked(ins.mute_s2)
-        self.si_mute_s3.setChecked(ins.mute_s3)
-        self.si_mute_s4.setChecked(ins.mute_s4)
-        self.si_vib_shape.children()[ins.vib_shape].setChecked(True)
-        self.si_pitch_bend.setValue(ins.pitch_bend)
-        self.si_wheel_assign.children()[ins.wheel_assign].setChecked(True)
-        self.si_vib_speed.setValue(ins.vib_speed)
-        self.si_wheel_dep.setValue(ins.wheel_dep)
-        self.si_auto_bend_time.setValue(ins.auto_bend_time)
-        self.si_auto_bend_depth.setValue(ins.auto_bend_depth)
-        self.si_auto_bend_ks_time.setValue(ins.auto_bend_ks_time)
-        self.si_auto_bend_vel_dep.setValue(ins.auto_bend_vel_dep)
-        self.si_vib_prs_vib.setValue(ins.vib_prs_vib)
-        self.si_vibrato_dep.setValue(ins.vibrato_dep)
-        self.si_lfo_shape.children()[ins.lfo_shape].setChecked(True)
-        self.si_lfo_speed.setValue(ins.lfo_speed)
-        self.si_lfo_delay.setValue(ins.lfo_delay)
-        self.si_lfo_dep.setValue(ins.lfo_dep)
-        self.si_lfo_prs_dep.setValue(ins.lfo_prs_dep)
-        self.si_pres_freq.setValue(ins.pres_freq)
-
-        self.s1_wave.setValue(ins.s1_wave_select)
-        self.s1_ks_curve.setValue(ins.s1_ks_curve)
-        self.s1_delay.setValue(ins.s1_delay)
-        self.s1_coarse.setValue(ins.s1_coarse)
-        self.s1_fix.setValue(ins.s1_fix)
-        self.s1_fine.setValue(ins.s1_fine)
-        self.s1_key_track.setChecked(ins.s1_key_track)
-        self.s1_prs_freq.setChecked(ins.s1_prs_freq)
-        self.s1_vib_bend.setChecked(ins.s1_vib_bend)
-        self.s1_vel_curve.setValue(ins.s1_vel_curve)
-        self.s2_wave.setValue(ins.s2_wave_select)
-        self.s2_ks_curve.setValue(ins.s2_ks_curve)
-        self.s2_delay.setValue(ins.s2_delay)
-        self.s2_coarse.setValue(ins.s2_coarse)
-        self.s2_fix.setValue(ins.s2_fix)
-        self.s2_fine.setValue(ins.s2_fine)
-        self.s2_key_track.setChecked(ins.s2_key_track)
-        self.s2_prs_freq.setChecked(ins.s2_prs_freq)
-        self.s2_vib_bend.setChecked(ins.s2_vib_bend)
-        self.s2_vel_curve.setValue(ins.s2_vel_curve)
-        self.s3_wave.setValue(ins.s3_wave_select)
-        self.s3_ks_curve.setValue(ins.s3_ks_curve)
-        self.s3_delay.setValue(ins.s3_delay)
-        self.s3_coarse.setValue(ins.s3_coarse)
-        self.s3_fix.setValue(ins.s3_fix)
-        self.s3_fine.setValue(ins.s3_fine)
-        self.s3_key_track.setChecked(ins.s3_key_track)
-        self.s3_prs_freq.setChecked(ins.s3_prs_freq)
-        self.s3_vib_bend.setChecked(ins.s3_vib_bend)
-        self.s3_vel_curve.setValue(ins.s3_vel_curve)
-        self.s4_wave.setValue(ins.s4_wave_select)
-        self.s4_ks_curve.setValue(ins.s4_ks_curve)
-        self.s4_delay.setValue(ins.s4_delay)
-        self.s4_coarse.setValue(ins.s4_coarse)
-        self.s4_fix.setValue(ins.s4_fix)
-        self.s4_fine.setValue(ins.s4_fine)
-        self.s4_key_track.setChecked(ins.s4_key_track)
-        self.s4_prs_freq.setChecked(ins.s4_prs_freq)
-        self.s4_vib_bend.setChecked(ins.s4_vib_bend)
-        self.s4_vel_curve.setValue(ins.s4_vel_curve)
-
-        self.s1_env_level.setValue(ins.s1_envelope_level)
-        self.s1_env_attack.setValue(ins.s1_envelope_attack)
-        self.s1_env_decay.setValue(ins.s1_envelope_decay)
-        self.s1_env_sustain.setValue(ins.s1_envelope_sustain)
-        self.s1_env_release.setValue(ins.s1_envelope_release)
-        self.s1_level_mod_vel.setValue(ins.s1_level_mod_vel)
-        self.s1_level_mod_prs.setValue(ins.s1_level_mod_prs)
-        self.s1_level_mod_ks.setValue(ins.s1_level_mod_ks)
-        self.s1_time_mod_on_vel.setValue(ins.s1_time_mod_on_vel)
-        self.s1_time_mod_off_vel.setValue(ins.s1_time_mod_off_vel)
-        self.s1_time_mod_ks.setValue(ins.s1_time_mod_ks)
-        self.s2_env_level.setValue(ins.s2_envelope_level)
-        self.s2_env_attack.setValue(ins.s2_envelope_attack)
-        self.s2_env_decay.setValue(ins.s2_envelope_decay)
-        self.s2_env_sustain.setValue(ins.s2_envelope_sustain)
-        self.s2_env_release.setValue(ins.s2_envelope_release)
-        self.s2_level_mod_vel.setValue(ins.s2_level_mod_vel)
-        self.s2_level_mod_prs.setValue(ins.s2_level_mod_prs)
-        self.s2_level_mod_ks.setValue(ins.s2_level_mod_ks)
-        self.s2_time_mod_on_vel.setValue(ins.s2_time_mod_on_vel)
-        self.s2_time_mod_off_vel.setValue(ins.s2_time_mod_off_vel)
-        self.s2_time_mod_ks.setValue(ins.s2_time_mod_ks)
-        self.s3_env_level.setValue(ins.s3_envelope_level)
-        self.s3_env_attack.setValue(ins.s3_envelope_attack)
-        self.s3_env_decay.setValue(ins.s3_envelope_decay)
-        self.s3_env_sustain.setValue(ins.s3_envelope_sustain)
-        self.s3_env_release.setValue(ins.s3_envelope_release)
-        self.s3_level_mod_vel.setValue(ins.s3_level_mod_vel)
-        self.s3_level_mod_prs.setValue(ins.s3_level_mod_prs)
-        self.s3_level_mod_ks.setValue(ins.s3_level_mod_ks)
-        self.s3_time_mod_on_vel.setValue(ins.s3_time_mod_on_vel)
-        self.s3_time_mod_off_vel.setValue(ins.s3_time_mod_off_vel)
-        self.s3_time_mod_ks.setValue(ins.s3_time_mod_ks)
-        self.s4_env_level.setValue(ins.s4_envelope_level)
-        self.s4_env_attack.setValue(ins.s4_envelope_attack)
-        self.s4_env_decay.setValue(ins.s4_envelope_decay)
-        self.s4_env_sustain.setValue(ins.s4_envelope_sustain)
-        self.s4_env_release.setValue(ins.s4_envelope_release)
-        self.s4_level_mod_vel.setValue(ins.s4_level_mod_vel)
-        self.s4_level_mod_prs.setValue(ins.s4_level_mod_prs)
-        self.s4_level_mod_ks.setValue(ins.s4_level_mod_ks)
-        self.s4_time_mod_on_vel.setValue(ins.s4_time_mod_on_vel)
-        self.s4_time_mod_off_vel.setValue(ins.s4_time_mod_off_vel)
-        self.s4_time_mod_ks.setValue(ins.s4_time_mod_ks)
-
-        # LFO 1
-        self.si_lfo1_cutoff.setValue(ins.lfo1_cutoff)
-        self.si_lfo1_resonance.setValue(ins.lfo1_resonance)
-        self.si_lfo1_switch.setChecked(ins.lfo1_switch)
-        self.si_lfo1_cutoff_mod_vel.setValue(ins.lfo1_cutoff_mod_vel)
-        self.si_lfo1_cutoff_mod_prs.setValue(ins.lfo1_cutoff_mod_prs)
-        self.si_lfo1_cutoff_mod_ks.setValue(ins.lfo1_cutoff_mod_ks)
-        self.si_dcf1_env_dep.setValue(ins.dcf1_env_dep)
-        self.si_dcf1_env_vel_dep.setValue(ins.dcf1_env_vel_dep)
-        self.si_dcf1_env_attack.setValue(ins.dcf1_env_attack)
-        self.si_dcf1_env_decay.setValue(ins.dcf1_env_decay)
-        self.si_dcf1_env_sustain.setValue(ins.dcf1_env_sustain)
-        self.si_dcf1_env_release.setValue(ins.dcf1_env_release)
-        self.si_dcf1_time_mod_on_vel.setValue(ins.dcf1_time_mod_on_vel)
-        self.si_dcf1_time_mod_off_vel.setValue(ins.dcf1_time_mod_off_vel)
-        self.si_dcf1_time_mod_ks.setValue(ins.dcf1_time_mod_ks)
-
-        # LFO 2
-        self.si_lfo2_cutoff.setValue(ins.lfo2_cutoff)
-        self.si_lfo2_resonance.setValue(ins.lfo2_resonance)
-        self.si_lfo2_switch.setChecked(ins.lfo2_switch)
-        self.si_lfo2_cutoff_mod_vel.setValue(ins.lfo2_cutoff_mod_vel)
-        self.si_lfo2_cutoff_mod_prs.setValue(ins.lfo2_cutoff_mod_prs)
-        self.si_lfo2_cutoff_mod_ks.setValue(ins.lfo2_cutoff_mod_ks)
-        self.si_dcf2_env_dep.setValue(ins.dcf2_env_dep)
-        self.si_dcf2_env_vel_dep.setValue(ins.dcf2_env_vel_dep)
-        self.si_dcf2_env_attack.setValue(ins.dcf2_env_attack)
-        self.si_dcf2_env_decay.setValue(ins.dcf2_env_decay)
-        self.si_dcf2_env_sustain.setValue(ins.dcf2_env_sustain)
-        self.si_dcf2_env_release.setValue(ins.dcf2_env_release)
-        self.si_dcf2_time_mod_on_vel.setValue(ins.dcf2_time_mod_on_vel)
-        self.si_dcf2_time_mod_off_vel.setValue(ins.dcf2_time_mod_off_vel)
-        self.si_dcf2_time_mod_ks.setValue(ins.dcf2_time_mod_ks)
+
+        # decode all values at once
+        v = ins.to_dict()
+
+        # one checksum update for all fields set by the widgets
+        with ins.batch():
+            # fill the single instrument data
+            self.si_name.setText(v['name'])
+            self.si_volume.setValue(v['volume'])
+            self.si_effect.setValue(v['effect'])
+            self.si_out_select.setValue(v['out_select'])
+            self.si_source_mode.children()[v['source_mode']].setChecked(True)
+            self.si_poly_mode.children()[v['poly_mode']].setChecked(True)
+            self.si_am_s12.setChecked(v['am12'])
+            self.si_am_s34.setChecked(v['am34'])
+            self.si_mute_s1.setChecked(v['mute_s1'])
+            self.si_mute_s2.setChecked(v['mute_s2'])
+            self.si_mute_s3.setChecked(v['mute_s3'])
+            self.si_mute_s4.setChecked(v['mute_s4'])
+            self.si_vib_shape.children()[v['vib_shape']].setChecked(True)
+            self.si_pitch_bend.setValue(v['pitch_bend'])
+            self.si_wheel_assign.children()[v['wheel_assign']].setChecked(True)
+            self.si_vib_speed.setValue(v['vib_speed'])
+            self.si_wheel_dep.setValue(v['wheel_dep'])
+            self.si_auto_bend_time.setValue(v['auto_bend_time'])
+            self.si_auto_bend_depth.setValue(v['auto_bend_depth'])
+            self.si_auto_bend_ks_time.setValue(v['auto_bend_ks_time'])
+            self.si_auto_bend_vel_dep.setValue(v['auto_bend_vel_dep'])
+            self.si_vib_prs_vib.setValue(v['vib_prs_vib'])
+            self.si_vibrato_dep.setValue(v['vibrato_dep'])
+            self.si_lfo_shape.children()[v['lfo_shape']].setChecked(True)
+            self.si_lfo_speed.setValue(v['lfo_speed'])
+            self.si_lfo_delay.setValue(v['lfo_delay'])
+            self.si_lfo_dep.setValue(v['lfo_dep'])
+            self.si_lfo_prs_dep.setValue(v['lfo_prs_dep'])
+            self.si_pres_freq.setValue(v['pres_freq'])
+
+            self.s1_wave.setValue(v['s1_wave_select'])
+            self.s1_ks_curve.setValue(v['s1_ks_curve'])
+            self.s1_delay.setValue(v['s1_delay'])
+            self.s1_coarse.setValue(v['s1_coarse'])
+            self.s1_fix.setValue(v['s1_fix'])
+            self.s1_fine.setValue(v['s1_fine'])
+            self.s1_key_track.setChecked(v['s1_key_track'])
+            self.s1_prs_freq.setChecked(v['s1_prs_freq'])
+            self.s1_vib_bend.setChecked(v['s1_vib_bend'])
+            self.s1_vel_curve.setValue(v['s1_vel_curve'])
+            self.s2_wave.setValue(v['s2_wave_select'])
+            self.s2_ks_curve.setValue(v['s2_ks_curve'])
+            self.s2_delay.setValue(v['s2_delay'])
+            self.s2_coarse.setValue(v['s2_coarse'])
+            self.s2_fix.setValue(v['s2_fix'])
+            self.s2_fine.setValue(v['s2_fine'])
+            self.s2_key_track.setChecked(v['s2_key_track'])
+            self.s2_prs_freq.setChecked(v['s2_prs_freq'])
+            self.s2_vib_bend.setChecked(v['s2_vib_bend'])
+            self.s2_vel_curve.setValue(v['s2_vel_curve'])
+            self.s3_wave.setValue(v['s3_wave_select'])
+            self.s3_ks_curve.setValue(v['s3_ks_curve'])
+            self.s3_delay.setValue(v['s3_delay'])
+            self.s3_coarse.setValue(v['s3_coarse'])
+            self.s3_fix.setValue(v['s3_fix'])
+            self.s3_fine.setValue(v['s3_fine'])
+            self.s3_key_track.setChecked(v['s3_key_track'])
+            self.s3_prs_freq.setChecked(v['s3_prs_freq'])
+            self.s3_vib_bend.setChecked(v['s3_vib_bend'])
+            self.s3_vel_curve.setValue(v['s3_vel_curve'])
+            self.s4_wave.setValue(v['s4_wave_select'])
+            self.s4_ks_curve.setValue(v['s4_ks_curve'])
+            self.s4_delay.setValue(v['s4_delay'])
+            self.s4_coarse.setValue(v['s4_coarse'])
+            self.s4_fix.setValue(v['s4_fix'])
+            self.s4_fine.setValue(v['s4_fine'])
+            self.s4_key_track.setChecked(v['s4_key_track'])
+            self.s4_prs_freq.setChecked(v['s4_prs_freq'])
+            self.s4_vib_bend.setChecked(v['s4_vib_bend'])
+            self.s4_vel_curve.setValue(v['s4_vel_curve'])
+
+            self.s1_env_level.setValue(v['s1_envelope_level'])
+            self.s1_env_attack.setValue(v['s1_envelope_attack'])
+            self.s1_env_decay.setValue(v['s1_envelope_decay'])
+            self.s1_env_sustain.setValue(v['s1_envelope_sustain'])
+            self.s1_env_release.setValue(v['s1_envelope_release'])
+            self.s1_level_mod_vel.setValue(v['s1_level_mod_vel'])
+            self.s1_level_mod_prs.setValue(v['s1_level_mod_prs'])
+            self.s1_level_mod_ks.setValue(v['s1_level_mod_ks'])
+            self.s1_time_mod_on_vel.setValue(v['s1_time_mod_on_vel'])
+            self.s1_time_mod_off_vel.setValue(v['s1_time_mod_off_vel'])
+            self.s1_time_mod_ks.setValue(v['s1_time_mod_ks'])
+            self.s2_env_level.setValue(v['s2_envelope_level'])
+            self.s2_env_attack.setValue(v['s2_envelope_attack'])
+            self.s2_env_decay.setValue(v['s2_envelope_decay'])
+            self.s2_env_sustain.setValue(v['s2_envelope_sustain'])
+            self.s2_env_release.setValue(v['s2_envelope_release'])
+            self.s2_level_mod_vel.setValue(v['s2_level_mod_vel'])
+            self.s2_level_mod_prs.setValue(v['s2_level_mod_prs'])
+            self.s2_level_mod_ks.setValue(v['s2_level_mod_ks'])
+            self.s2_time_mod_on_vel.setValue(v['s2_time_mod_on_vel'])
+            self.s2_time_mod_off_vel.setValue(v['s2_time_mod_off_vel'])
+            self.s2_time_mod_ks.setValue(v['s2_time_mod_ks'])
+            self.s3_env_level.setValue(v['s3_envelope_level'])
+            self.s3_env_attack.setValue(v['s3_envelope_attack'])
+            self.s3_env_decay.setValue(v['s3_envelope_decay'])
+            self.s3_env_sustain.setValue(v['s3_envelope_sustain'])
+            self.s3_env_release.setValue(v['s3_envelope_release'])
+            self.s3_level_mod_vel.setValue(v['s3_level_mod_vel'])
+            self.s3_level_mod_prs.setValue(v['s3_level_mod_prs'])
+            self.s3_level_mod_ks.setValue(v['s3_level_mod_ks'])
+            self.s3_time_mod_on_vel.setValue(v['s3_time_mod_on_vel'])
+            self.s3_time_mod_off_vel.setValue(v['s3_time_mod_off_vel'])
+            self.s3_time_mod_ks.setValue(v['s3_time_mod_ks'])
+            self.s4_env_level.setValue(v['s4_envelope_level'])
+            self.s4_env_attack.setValue(v['s4_envelope_attack'])
+            self.s4_env_decay.setValue(v['s4_envelope_decay'])
+            self.s4_env_sustain.setValue(v['s4_envelope_sustain'])
+            self.s4_env_release.setValue(v['s4_envelope_release'])
+            self.s4_level_mod_vel.setValue(v['s4_level_mod_vel'])
+            self.s4_level_mod_prs.setValue(v['s4_level_mod_prs'])
+            self.s4_level_mod_ks.setValue(v['s4_level_mod_ks'])
+            self.s4_time_mod_on_vel.setValue(v['s4_time_mod_on_vel'])
+            self.s4_time_mod_off_vel.setValue(v['s4_time_mod_off_vel'])
+            self.s4_time_mod_ks.setValue(v['s4_time_mod_ks'])
+
+            # LFO 1
+            self.si_lfo1_cutoff.setValue(v['lfo1_cutoff'])
+            self.si_lfo1_resonance.setValue(v['lfo1_resonance'])
+            self.si_lfo1_switch.setChecked(v['lfo1_switch'])
+            self.si_lfo1_cutoff_mod_vel.setValue(v['lfo1_cutoff_mod_vel'])
+            self.si_lfo1_cutoff_mod_prs.setValue(v['lfo1_cutoff_mod_prs'])
+            self.si_lfo1_cutoff_mod_ks.setValue(v['lfo1_cutoff_mod_ks'])
+            self.si_dcf1_env_dep.setValue(v['dcf1_env_dep'])
+            self.si_dcf1_env_vel_dep.setValue(v['dcf1_env_vel_dep'])
+            self.si_dcf1_env_attack.setValue(v['dcf1_env_attack'])
+            self.si_dcf1_env_decay.setValue(v['dcf1_env_decay'])
+            self.si_dcf1_env_sustain.setValue(v['dcf1_env_sustain'])
+            self.si_dcf1_env_release.setValue(v['dcf1_env_release'])
+            self.si_dcf1_time_mod_on_vel.setValue(v['dcf1_time_mod_on_vel'])
+            self.si_dcf1_time_mod_off_vel.setValue(v['dcf1_time_mod_off_vel'])
+            self.si_dcf1_time_mod_ks.setValue(v['dcf1_time_mod_ks'])
+
+            # LFO 2
+            self.si_lfo2_cutoff.setValue(v['lfo2_cutoff'])
+            self.si_lfo2_resonance.setValue(v['lfo2_resonance'])
+            self.si_lfo2_switch.setChecked(v['lfo2_switch'])
+            self.si_lfo2_cutoff_mod_vel.setValue(v['lfo2_cutoff_mod_vel'])
+            self.si_lfo2_cutoff_mod_prs.setValue(v['lfo2_cutoff_mod_prs'])
+            self.si_lfo2_cutoff_mod_ks.setValue(v['lfo2_cutoff_mod_ks'])
+            self.si_dcf2_env_dep.setValue(v['dcf2_env_dep'])
+            self.si_dcf2_env_vel_dep.setValue(v['dcf2_env_vel_dep'])
+            self.si_dcf2_env_attack.setValue(v['dcf2_env_attack'])
+            self.si_dcf2_env_decay.setValue(v['dcf2_env_decay'])
+            self.si_dcf2_env_sustain.setValue(v['dcf2_env_sustain'])
+            self.si_dcf2_env_release.setValue(v['dcf2_env_release'])
+            self.si_dcf2_time_mod_on_vel.setValue(v['dcf2_time_mod_on_vel'])
+            self.si_dcf2_time_mod_off_vel.setValue(v['dcf2_time_mod_off_vel'])
+            self.si_dcf2_time_mod_ks.setValue(v['dcf2_time_mod_ks'])
 
         self.unlock_status()
 
@@ -1063,114 +1133,120 @@ class MainUI(Ui_MainWindow):
         multi = self._mf.data['multi_instruments'][mi_nr]
         self._multi = multi
 
-        # basic information
-        self.mi_name.setText(multi.name)
-        self.mi_volume.setValue(multi.volume)
-        self.mi_effect.setValue(multi.effect)
-
-        # section1
-        self.mi_s1_single.setValue(multi.sections[0].single)
-        self.mi_s1_zone_low.setValue(multi.sections[0].zone_low)
-        self.mi_s1_zone_high.setValue(multi.sections[0].zone_high)
-        self.mi_s1_level.setValue(multi.sections[0].level)
-        self.mi_s1_transpose.setValue(multi.sections[0].transpose)
-        self.mi_s1_tune.setValue(multi.sections[0].tune)
-        self.mi_s1_channel.setValue(multi.sections[0].rec_chan)
-        self.mi_s1_outsel.setValue(multi.sections[0].out_sel)
-        self.mi_s1_velsw.children()[multi.sections[0].vel_sw].setChecked(True)
-        self.mi_s1_mode.children()[multi.sections[0].mode].setChecked(True)
-        self.mi_s1_mute.setChecked(multi.sections[0].mute)
-
-        # section2
-        self.mi_s2_single.setValue(multi.sections[1].single)
-        self.mi_s2_zone_low.setValue(multi.sections[1].zone_low)
-        self.mi_s2_zone_high.setValue(multi.sections[1].zone_high)
-        self.mi_s2_level.setValue(multi.sections[1].level)
-        self.mi_s2_transpose.setValue(multi.sections[1].transpose)
-        self.mi_s2_tune.setValue(multi.sections[1].tune)
-        self.mi_s2_channel.setValue(multi.sections[1].rec_chan)
-        self.mi_s2_outsel.setValue(multi.sections[1].out_sel)
-        self.mi_s2_velsw.children()[multi.sections[1].vel_sw].setChecked(True)
-        self.mi_s2_mode.children()[multi.sections[1].mode].setChecked(True)
-        self.mi_s2_mute.setChecked(multi.sections[1].mute)
-
-        # section3
-        self.mi_s3_single.setValue(multi.sections[2].single)
-        self.mi_s3_zone_low.setValue(multi.sections[2].zone_low)
-        self.mi_s3_zone_high.setValue(multi.sections[2].zone_high)
-        self.mi_s3_level.setValue(multi.sections[2].level)
-        self.mi_s3_transpose.setValue(multi.sections[2].transpose)
-        self.mi_s3_tune.setValue(multi.sections[2].tune)
-        self.mi_s3_channel.setValue(multi.sections[2].rec_chan)
-        self.mi_s3_outsel.setValue(multi.sections[2].out_sel)
-        self.mi_s3_velsw.children()[multi.sections[2].vel_sw].setChecked(True)
-        self.mi_s3_mode.children()[multi.sections[2].mode].setChecked(True)
-        self.mi_s3_mute.setChecked(multi.sections[2].mute)
-
-        # section4
-        self.mi_s4_single.setValue(multi.sections[3].single)
-        self.mi_s4_zone_low.setValue(multi.sections[3].zone_low)
-        self.mi_s4_zone_high.setValue(multi.sections[3].zone_high)
-        self.mi_s4_level.setValue(multi.sections[3].level)
-        self.mi_s4_transpose.setValue(multi.sections[3].transpose)
-        self.mi_s4_tune.setValue(multi.sections[3].tune)
-        self.mi_s4_channel.setValue(multi.sections[3].rec_chan)
-        self.mi_s4_outsel.setValue(multi.sections[3].out_sel)
-        self.mi_s4_velsw.children()[multi.sections[3].vel_sw].setChecked(True)
-        self.mi_s4_mode.children()[multi.sections[3].mode].setChecked(True)
-        self.mi_s4_mute.setChecked(multi.sections[3].mute)
-
-        # section5
-        self.mi_s5_single.setValue(multi.sections[4].single)
-        self.mi_s5_zone_low.setValue(multi.sections[4].zone_low)
-        self.mi_s5_zone_high.setValue(multi.sections[4].zone_high)
-        self.mi_s5_level.setValue(multi.sections[4].level)
-        self.mi_s5_transpose.setValue(multi.sections[4].transpose)
-        self.mi_s5_tune.setValue(multi.sections[4].tune)
-        self.mi_s5_channel.setValue(multi.sections[4].rec_chan)
-        self.mi_s5_outsel.setValue(multi.sections[4].out_sel)
-        self.mi_s5_velsw.children()[multi.sections[4].vel_sw].setChecked(True)
-        self.mi_s5_mode.children()[multi.sections[4].mode].setChecked(True)
-        self.mi_s5_mute.setChecked(multi.sections[4].mute)
-
-        # section6
-        self.mi_s6_single.setValue(multi.sections[5].single)
-        self.mi_s6_zone_low.setValue(multi.sections[5].zone_low)
-        self.mi_s6_zone_high.setValue(multi.sections[5].zone_high)
-        self.mi_s6_level.setValue(multi.sections[5].level)
-        self.mi_s6_transpose.setValue(multi.sections[5].transpose)
-        self.mi_s6_tune.setValue(multi.sections[5].tune)
-        self.mi_s6_channel.setValue(multi.sections[5].rec_chan)
-        self.mi_s6_outsel.setValue(multi.sections[5].out_sel)
-        self.mi_s6_velsw.children()[multi.sections[5].vel_sw].setChecked(True)
-        self.mi_s6_mode.children()[multi.sections[5].mode].setChecked(True)
-        self.mi_s6_mute.setChecked(multi.sections[5].mute)
-
-        # section7
-        self.mi_s7_single.setValue(multi.sections[6].single)
-        self.mi_s7_zone_low.setValue(multi.sections[6].zone_low)
-        self.mi_s7_zone_high.setValue(multi.sections[6].zone_high)
-        self.mi_s7_level.setValue(multi.sections[6].level)
-        self.mi_s7_transpose.setValue(multi.sections[6].transpose)
-        self.mi_s7_tune.setValue(multi.sections[6].tune)
-        self.mi_s7_channel.setValue(multi.sections[6].rec_chan)
-        self.mi_s7_outsel.setValue(multi.sections[6].out_sel)
-        self.mi_s7_velsw.children()[multi.sections[6].vel_sw].setChecked(True)
-        self.mi_s7_mode.children()[multi.sections[6].mode].setChecked(True)
-        self.mi_s7_mute.setChecked(multi.sections[6].mute)
-
-        # section8
-        self.mi_s8_single.setValue(multi.sections[7].single)
-        self.mi_s8_zone_low.setValue(multi.sections[7].zone_low)
-        self.mi_s8_zone_high.setValue(multi.sections[7].zone_high)
-        self.mi_s8_level.setValue(multi.sections[7].level)
-        self.mi_s8_transpose.setValue(multi.sections[7].transpose)
-        self.mi_s8_tune.setValue(multi.sections[7].tune)
-        self.mi_s8_channel.setValue(multi.sections[7].rec_chan)
-        self.mi_s8_outsel.setValue(multi.sections[7].out_sel)
-        self.mi_s8_velsw.children()[multi.sections[7].vel_sw].setChecked(True)
-        self.mi_s8_mode.children()[multi.sections[7].mode].setChecked(True)
-        self.mi_s8_mute.setChecked(multi.sections[7].mute)
+        # decode all values at once
+        v = multi.to_dict()
+        sections = v['sections']
+
+        # one checksum update for all fields set by the widgets
+        with multi.batch():
+            # basic information
+            self.mi_name.setText(v['name'])
+            self.mi_volume.setValue(v['volume'])
+            self.mi_effect.setValue(v['effect'])
+
+            # section1
+            self.mi_s1_single.setValue(sections[0]['single'])
+            self.mi_s1_zone_low.setValue(sections[0]['zone_low'])
+            self.mi_s1_zone_high.setValue(sections[0]['zone_high'])
+            self.mi_s1_level.setValue(sections[0]['level'])
+            self.mi_s1_transpose.setValue(sections[0]['transpose'])
+            self.mi_s1_tune.setValue(sections[0]['tune'])
+            self.mi_s1_channel.setValue(sections[0]['rec_chan'])
+            self.mi_s1_outsel.setValue(sections[0]['out_sel'])
+            self.mi_s1_velsw.children()[sections[0]['vel_sw']].setChecked(True)
+            self.mi_s1_mode.children()[sections[0]['mode']].setChecked(True)
+            self.mi_s1_mute.setChecked(sections[0]['mute'])
+
+            # section2
+            self.mi_s2_single.setValue(sections[1]['single'])
+            self.mi_s2_zone_low.setValue(sections[1]['zone_low'])
+            self.mi_s2_zone_high.setValue(sections[1]['zone_high'])
+            self.mi_s2_level.setValue(sections[1]['level'])
+            self.mi_s2_transpose.setValue(sections[1]['transpose'])
+            self.mi_s2_tune.setValue(sections[1]['tune'])
+            self.mi_s2_channel.setValue(sections[1]['rec_chan'])
+            self.mi_s2_outsel.setValue(sections[1]['out_sel'])
+            self.mi_s2_velsw.children()[sections[1]['vel_sw']].setChecked(True)
+            self.mi_s2_mode.children()[sections[1]['mode']].setChecked(True)
+            self.mi_s2_mute.setChecked(sections[1]['mute'])
+
+            # section3
+            self.mi_s3_single.setValue(sections[2]['single'])
+            self.mi_s3_zone_low.setValue(sections[2]['zone_low'])
+            self.mi_s3_zone_high.setValue(sections[2]['zone_high'])
+            self.mi_s3_level.setValue(sections[2]['level'])
+            self.mi_s3_transpose.setValue(sections[2]['transpose'])
+            self.mi_s3_tune.setValue(sections[2]['tune'])
+            self.mi_s3_channel.setValue(sections[2]['rec_chan'])
+            self.mi_s3_outsel.setValue(sections[2]['out_sel'])
+            self.mi_s3_velsw.children()[sections[2]['vel_sw']].setChecked(True)
+            self.mi_s3_mode.children()[sections[2]['mode']].setChecked(True)
+            self.mi_s3_mute.setChecked(sections[2]['mute'])
+
+            # section4
+            self.mi_s4_single.setValue(sections[3]['single'])
+            self.mi_s4_zone_low.setValue(sections[3]['zone_low'])
+            self.mi_s4_zone_high.setValue(sections[3]['zone_high'])
+            self.mi_s4_level.setValue(sections[3]['level'])
+            self.mi_s4_transpose.setValue(sections[3]['transpose'])
+            self.mi_s4_tune.setValue(sections[3]['tune'])
+            self.mi_s4_channel.setValue(sections[3]['rec_chan'])
+            self.mi_s4_outsel.setValue(sections[3]['out_sel'])
+            self.mi_s4_velsw.children()[sections[3]['vel_sw']].setChecked(True)
+            self.mi_s4_mode.children()[sections[3]['mode']].setChecked(True)
+            self.mi_s4_mute.setChecked(sections[3]['mute'])
+
+            # section5
+            self.mi_s5_single.setValue(sections[4]['single'])
+            self.mi_s5_zone_low.setValue(sections[4]['zone_low'])
+            self.mi_s5_zone_high.setValue(sections[4]['zone_high'])
+            self.mi_s5_level.setValue(sections[4]['level'])
+            self.mi_s5_transpose.setValue(sections[4]['transpose'])
+            self.mi_s5_tune.setValue(sections[4]['tune'])
+            self.mi_s5_channel.setValue(sections[4]['rec_chan'])
+            self.mi_s5_outsel.setValue(sections[4]['out_sel'])
+            self.mi_s5_velsw.children()[sections[4]['vel_sw']].setChecked(True)
+            self.mi_s5_mode.children()[sections[4]['mode']].setChecked(True)
+            self.mi_s5_mute.setChecked(sections[4]['mute'])
+
+            # section6
+            self.mi_s6_single.setValue(sections[5]['single'])
+            self.mi_s6_zone_low.setValue(sections[5]['zone_low'])
+            self.mi_s6_zone_high.setValue(sections[5]['zone_high'])
+            self.mi_s6_level.setValue(sections[5]['level'])
+            self.mi_s6_transpose.setValue(sections[5]['transpose'])
+            self.mi_s6_tune.setValue(sections[5]['tune'])
+            self.mi_s6_channel.setValue(sections[5]['rec_chan'])
+            self.mi_s6_outsel.setValue(sections[5]['out_sel'])
+            self.mi_s6_velsw.children()[sections[5]['vel_sw']].setChecked(True)
+            self.mi_s6_mode.children()[sections[5]['mode']].setChecked(True)
+            self.mi_s6_mute.setChecked(sections[5]['mute'])
+
+            # section7
+            self.mi_s7_single.setValue(sections[6]['single'])
+            self.mi_s7_zone_low.setValue(sections[6]['zone_low'])
+            self.mi_s7_zone_high.setValue(sections[6]['zone_high'])
+            self.mi_s7_level.setValue(sections[6]['level'])
+            self.mi_s7_transpose.setValue(sections[6]['transpose'])
+            self.mi_s7_tune.setValue(sections[6]['tune'])
+            self.mi_s7_channel.setValue(sections[6]['rec_chan'])
+            self.mi_s7_outsel.setValue(sections[6]['out_sel'])
+            self.mi_s7_velsw.children()[sections[6]['vel_sw']].setChecked(True)
+            self.mi_s7_mode.children()[sections[6]['mode']].setChecked(True)
+            self.mi_s7_mute.setChecked(sections[6]['mute'])
+
+            # section8
+            self.mi_s8_single.setValue(sections[7]['single'])
+            self.mi_s8_zone_low.setValue(sections[7]['zone_low'])
+            self.mi_s8_zone_high.setValue(sections[7]['zone_high'])
+            self.mi_s8_level.setValue(sections[7]['level'])
+            self.mi_s8_transpose.setValue(sections[7]['transpose'])
+            self.mi_s8_tune.setValue(sections[7]['tune'])
+            self.mi_s8_channel.setValue(sections[7]['rec_chan'])
+            self.mi_s8_outsel.setValue(sections[7]['out_sel'])
+            self.mi_s8_velsw.children()[sections[7]['vel_sw']].setChecked(True)
+            self.mi_s8_mode.children()[sections[7]['mode']].setChecked(True)
+            self.mi_s8_mute.setChecked(sections[7]['mute'])
 
         self.unlock_status()
 
@@ -1182,45 +1258,50 @@ class MainUI(Ui_MainWindow):
         effect = self._mf.data['effects'][eff_nr]
         self._effect = effect
 
-        self.eff_number.setText(f'{eff_nr+1}')
+        # decode all values at once
+        v = effect.to_dict()
+
+        # one checksum update for all fields set by the widgets
+        with effect.batch():
+            self.eff_number.setText(f'{eff_nr+1}')
 
-        self.eff_type.setValue(effect.effect_type)
+            self.eff_type.setValue(v['effect_type'])
 
-        self.eff_para1.setValue(effect.para1)
-        self.eff_para2.setValue(effect.para2)
-        self.eff_para3.setValue(effect.para3)
+            self.eff_para1.setValue(v['para1'])
+            self.eff_para2.setValue(v['para2'])
+            self.eff_para3.setValue(v['para3'])
 
-        self.eff_pan_a.setValue(effect.pan_A)
-        self.eff_send1_a.setValue(effect.send1_A)
-        self.eff_send2_a.setValue(effect.send2_A)
+            self.eff_pan_a.setValue(v['pan_A'])
+            self.eff_send1_a.setValue(v['send1_A'])
+            self.eff_send2_a.setValue(v['send2_A'])
 
-        self.eff_pan_b.setValue(effect.pan_B)
-        self.eff_send1_b.setValue(effect.send1_B)
-        self.eff_send2_b.setValue(effect.send2_B)
+            self.eff_pan_b.setValue(v['pan_B'])
+            self.eff_send1_b.setValue(v['send1_B'])
+            self.eff_send2_b.setValue(v['send2_B'])
 
-        self.eff_pan_c.setValue(effect.pan_C)
-        self.eff_send1_c.setValue(effect.send1_C)
-        self.eff_send2_c.setValue(effect.send2_C)
+            self.eff_pan_c.setValue(v['pan_C'])
+            self.eff_send1_c.setValue(v['send1_C'])
+            self.eff_send2_c.setValue(v['send2_C'])
 
-        self.eff_pan_d.setValue(effect.pan_D)
-        self.eff_send1_d.setValue(effect.send1_D)
-        self.eff_send2_d.setValue(effect.send2_D)
+            self.eff_pan_d.setValue(v['pan_D'])
+            self.eff_send1_d.setValue(v['send1_D'])
+            self.eff_send2_d.setValue(v['send2_D'])
 
-        self.eff_pan_e.setValue(effect.pan_E)
-        self.eff_send1_e.setValue(effect.send1_E)
-        self.eff_send2_e.setValue(effect.send2_E)
+            self.eff_pan_e.setValue(v['pan_E'])
+            self.eff_send1_e.setValue(v['send1_E'])
+            self.eff_send2_e.setValue(v['send2_E'])
 
-        self.eff_pan_f.setValue(effect.pan_F)
-        self.eff_send1_f.setValue(effect.send1_F)
-        self.eff_send2_f.setValue(effect.send2_F)
+            self.eff_pan_f.setValue(v['pan_F'])
+            self.eff_send1_f.setValue(v['send1_F'])
+            self.eff_send2_f.setValue(v['send2_F'])
 
-        self.eff_pan_g.setValue(effect.pan_G)
-        self.eff_send1_g.setValue(effect.send1_G)
-        self.eff_send2_g.setValue(effect.send2_G)
+            self.eff_pan_g.setValue(v['pan_G'])
+            self.eff_send1_g.setValue(v['send1_G'])
+            self.eff_send2_g.setValue(v['send2_G'])
 
-        self.eff_pan_h.setValue(effect.pan_H)
-        self.eff_send1_h.setValue(effect.send1_H)
-        self.eff_send2_h.setValue(effect.send2_H)
+            self.eff_pan_h.setValue(v['pan_H'])
+            self.eff_send1_h.setValue(v['send1_H'])
+            self.eff_send2_h.setValue(v['send2_H'])
 
         self.unlock_status()
 
@@ -1279,8 +1360,9 @@ class MainUI(Ui_MainWindow):
 
             if filename[0] != '':
                 self.set_working_dir(filename[0])
-                if self._ins.load(filename[0]):
-                    self.select_instrument(self._si_nr)
+                with self._ins.batch():
+                    loaded = self._ins.load(filename[0])
+                if loaded:
                     s = self._ins_item.text(0).split()[0]+' - '+self._ins.name
                     self._ins_item.setText(0, s)
 
@@ -1308,8 +1390,8 @@ class MainUI(Ui_MainWindow):
 
     def paste_instrument(self):
         print('Paste instrument')
-        self._ins.paste(self._copy_instrument)
-        self.select_instrument(self._si_nr)
+        with self._ins.batch():
+            self._ins.paste(self._copy_instrument)
         s = self._ins_item.text(0).split()[0]+' - '+self._ins.name
         self._ins_item.setText(0, s)
 
@@ -1328,8 +1410,9 @@ class MainUI(Ui_MainWindow):
 
             if filename[0] != '':
                 self.set_working_dir(filename[0])
-                if self._multi.load(filename[0]):
-                    self.select_multi(self._mi_nr)
+                with self._multi.batch():
+                    loaded = self._multi.load(filename[0])
+                if loaded:
                     s = self._multi_item.text(0).split()[0]+' - '+self._multi.name
                     self._multi_item.setText(0, s)
                 else:
@@ -1359,8 +1442,8 @@ class MainUI(Ui_MainWindow):
     # paste a multi instrument
     def paste_multi_instrument(self):
         if self._mf.data is not None:
-            self._multi.paste(self._copy_multi)
-            self.select_multi(self._mi_nr)
+            with self._multi.batch():
+                self._multi.paste(self._copy_multi)
             s = self._multi_item.text(0).split()[0]+' - '+self._multi.name
             self._multi_item.setText(0, s)
 
@@ -1381,8 +1464,8 @@ class MainUI(Ui_MainWindow):
             ret = dialog.exec()
             if ret == 1:
                 sect = dialog.getdata()
-                self._multi.sections[sect-1].paste(self._copy_multi_sect)
-                self.select_multi(self._mi_nr)
+                with self._multi.batch():
+                    self._multi.sections[sect-1].paste(self._copy_multi_sect)
 
 
     # effects button functions
@@ -1397,9 +1480,9 @@ class MainUI(Ui_MainWindow):
             print(filename)
             if filename[0] != '':
                 self.set_working_dir(filename[0])
-                if self._effect.load(filename[0]):
-                    self.select_effect(self._eff_nr)
-                else:
+                with self._effect.batch():
+                    loaded = self._effect.load(filename[0])
+                if not loaded:
                     self.dialog_failed_data_loading('effect')
 
 
@@ -1420,43 +1503,43 @@ class MainUI(Ui_MainWindow):
 
 
     def paste_effect(self):
-        self._effect.paste(self._copy_effect)
-        self.select_effect(self._eff_nr)
+        with self._effect.batch():
+            self._effect.paste(self._copy_effect)
 
 
     def effect_pan_zero(self):
-        self._effect.pan_A = 0
-        self._effect.pan_B = 0
-        self._effect.pan_C = 0
-        self._effect.pan_D = 0
-        self._effect.pan_E = 0
-        self._effect.pan_F = 0
-        self._effect.pan_G = 0
-        self._effect.pan_H = 0
-        self.select_effect(self._eff_nr)
+        with self._effect.batch():
+            self._effect.pan_A = 0
+            self._effect.pan_B = 0
+            self._effect.pan_C = 0
+            self._effect.pan_D = 0
+            self._effect.pan_E = 0
+            self._effect.pan_F = 0
+            self._effect.pan_G = 0
+            self._effect.pan_H = 0
 
     def effect_send1_zero(self):
-        self._effect.send1_A = 0
-        self._effect.send1_B = 0
-        self._effect.send1_C = 0
-        self._effect.send1_D = 0
-        self._effect.send1_E = 0
-        self._effect.send1_F = 0
-        self._effect.send1_G = 0
-        self._effect.send1_H = 0
-        self.select_effect(self._eff_nr)
+        with self._effect.batch():
+            self._effect.send1_A = 0
+            self._effect.send1_B = 0
+            self._effect.send1_C = 0
+            self._effect.send1_D = 0
+            self._effect.send1_E = 0
+            self._effect.send1_F = 0
+            self._effect.send1_G = 0
+            self._effect.send1_H = 0
 
 
     def effect_send2_zero(self):
-        self._effect.send2_A = 0
-        self._effect.send2_B = 0
-        self._effect.send2_C = 0
-        self._effect.send2_D = 0
-        self._effect.send2_E = 0
-        self._effect.send2_F = 0
-        self._effect.send2_G = 0
-        self._effect.send2_H = 0
-        self.select_effect(self._eff_nr)
+        with self._effect.batch():
+            self._effect.send2_A = 0
+            self._effect.send2_B = 0
+            self._effect.send2_C = 0
+            self._effect.send2_D = 0
+            self._effect.send2_E = 0
+            self._effect.send2_F = 0
+            self._effect.send2_G = 0
+            self._effect.send2_H = 0
 
 
     def file_open(self):
@@ -1495,6 +1578,7 @@ class MainUI(Ui_MainWindow):
 
         self._has_changed = False
 
+        self.observe_patches()
         self.select_instrument(0)
         self._ins_item = self.treeWidget.topLevelItem(0).child(0)
 
@@ -1,9 +1,10 @@
 # This Python file uses the following encoding: utf-8
 
 # written by: Oliver Cordes 2023-01-30
-# changed by: Oliver Cordes 2023-05-06
+# changed by: Oliver Cordes 2026-10-18
 
 import sys, os
+import argparse
 
 from PySide6.QtCore import QCoreApplication
 from PySide6.QtWidgets import QApplication, QMainWindow , QFileDialog
@@ -25,6 +26,7 @@ class MainWindow(QMainWindow):
     def __init__(self, app, parent=None):
         super().__init__(parent)
         self._app = app
+        self._midi_port = None      # set by open_midi_output
         #self.ui = Ui_MainWindow()
         self.ui = MainUI(app, self)
         self.ui.setupUi(self)
@@ -35,8 +37,18 @@ class MainWindow(QMainWindow):
         self.ui.actionSave_As.triggered.connect(self.file_saveas)
 
     def prg_quit(self):
+        # the close event sends the queued changes
+        self.close()
         self._app.quit()
 
+    def closeEvent(self, event):
+        # the sender flushes the queued changes before the port is closed
+        self.ui.set_midi_output(None)
+        if self._midi_port is not None:
+            self._midi_port.close()
+            self._midi_port = None
+        super().closeEvent(event)
+
     def file_open(self):
         self.ui.file_open()
         #print('File Open')
@@ -58,8 +70,33 @@ class MainWindow(QMainWindow):
         self.ui.file_saveas()
 
 
+# open_midi_output
+#
+# opens the MIDI port for sending the changes to the K4
+def open_midi_output(widget, name, channel):
+    import mido
+    from k4midi.k4io import K4Transport
+
+    try:
+        port = mido.open_output(name)
+    except (OSError, IOError) as e:
+        print(f'Cannot open MIDI port {name}: {e}')
+        return None
+
+    widget.ui.set_midi_output(K4Transport(port, channel=channel).send, channel=channel)
+    widget._midi_port = port
+    return port
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--midi-out', help='MIDI port of the K4, the changes are sent')
+    parser.add_argument('--channel', type=int, default=1, help='MIDI channel of the K4 (1-16)')
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     widget = MainWindow(app)
+    if args.midi_out is not None:
+        open_midi_output(widget, args.midi_out, args.channel - 1)
     widget.show()
     sys.exit(app.exec())